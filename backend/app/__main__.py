@@ -0,0 +1,73 @@
+"""
+Batch analysis from the command line, without the API:
+
+    cd backend
+    python -m app analyze transactions.parquet -o result.json
+    python -m app analyze transactions.csv -o out/ --format parquet
+    python -m app analyze transactions.csv -o snapshots/<id> --format snapshot
+
+The input may be CSV, Parquet, Arrow IPC or Feather (see app.ingest).
+JSON output is the /analyze response; Parquet output is a directory with
+accounts.parquet, rings.parquet, cases.parquet and summary.json. Snapshot
+output is a memory-mapped snapshot directory (see app.snapshot); put it
+under RIFT_SNAPSHOT_DIR and the API serves it by its directory name.
+"""
+import argparse
+import json
+import sys
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from app.output_formatter import write_result_parquet
+from app.pipeline import run_analysis
+
+
+def analyze(path, out=None, fmt="json", use_cache=False):
+    """ Analyze ``path`` and write the result; returns what was written """
+    if fmt == "snapshot":
+        out = out or "analysis"
+        run_analysis(path, use_cache=use_cache, snapshot=out)
+        return out
+    result = run_analysis(path, use_cache=use_cache)
+
+    if fmt == "parquet":
+        paths = write_result_parquet(result, out or "analysis")
+        return ", ".join(paths.values())
+
+    if out is None:
+        _write_json(result, sys.stdout.buffer)
+        return None
+    with open(out, "wb") as f:
+        _write_json(result, f)
+    return out
+
+
+def _write_json(result, f):
+    if orjson is not None:
+        f.write(orjson.dumps(result))
+    else:
+        f.write(json.dumps(result).encode())
+    f.write(b"\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("analyze", help="analyze a transactions file")
+    run.add_argument("path", help="CSV, Parquet, Arrow IPC or Feather file")
+    run.add_argument("-o", "--out", help="output file (json) or directory (parquet, snapshot); json defaults to stdout")
+    run.add_argument("--format", choices=("json", "parquet", "snapshot"), default="json")
+    run.add_argument("--cache", action="store_true", help="use the analysis cache (RIFT_CACHE_*)")
+    args = parser.parse_args(argv)
+
+    written = analyze(args.path, args.out, args.format, args.cache)
+    if written:
+        print(f"results -> {written}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
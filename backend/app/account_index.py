@@ -0,0 +1,97 @@
+import numpy as np
+
+
+class AccountIndex:
+    """
+    Every transfer grouped by account and sorted by time, once by sender
+    and once by receiver, built with one vectorized argsort per direction.
+
+        out_order[out_offsets[a]:out_offsets[a+1]]   rows sent by a, oldest first
+        in_order[in_offsets[a]:in_offsets[a+1]]      rows received by a, oldest first
+
+    Rows are positions in the flat transfer arrays (``tg.transfer_arrays()``
+    order); ties in time keep row order. Timestamps are replaced by dense
+    ranks into ``times`` so (account, time) is one sortable int64 key, which
+    makes time-range queries a binary search, for one account or many.
+    """
+
+    def __init__(self, senders, receivers, amounts, timestamps, n_accounts):
+        self.senders = senders
+        self.receivers = receivers
+        self.amounts = amounts
+        self.timestamps = timestamps
+        self.n_accounts = n_accounts
+
+        self.times = np.unique(timestamps)
+        self.ranks = np.searchsorted(self.times, timestamps)
+        self._stride = len(self.times) + 1
+
+        self.out_order, self.out_offsets, self._out_keys = self._group(senders)
+        self.in_order, self.in_offsets, self._in_keys = self._group(receivers)
+
+    @classmethod
+    def from_graph(cls, tg):
+        return cls(*tg.transfer_arrays(), tg.number_of_nodes())
+
+    def _group(self, accounts):
+        keys = accounts.astype(np.int64) * self._stride + self.ranks
+        order = np.argsort(keys, kind="stable")
+        offsets = np.zeros(self.n_accounts + 1, dtype=np.int64)
+        np.cumsum(np.bincount(accounts, minlength=self.n_accounts), out=offsets[1:])
+        return order, offsets, keys[order]
+
+    # -----------------------------
+    # Range queries
+    # -----------------------------
+    def _span(self, keys, accounts, t0, t1):
+        base = np.asarray(accounts, dtype=np.int64) * self._stride
+        lo = 0 if t0 is None else np.searchsorted(self.times, t0, side="left")
+        hi = len(self.times) if t1 is None else np.searchsorted(self.times, t1, side="right")
+        return (
+            np.searchsorted(keys, base + lo, side="left"),
+            np.searchsorted(keys, base + hi, side="left"),
+        )
+
+    def out_span(self, accounts, t0=None, t1=None):
+        """
+        (lo, hi) into ``out_order`` for transfers sent by ``accounts`` (a
+        code or an array of codes) with t0 <= timestamp <= t1; None = open.
+        """
+        return self._span(self._out_keys, accounts, t0, t1)
+
+    def in_span(self, accounts, t0=None, t1=None):
+        """ Same as out_span, for transfers received (positions into ``in_order``) """
+        return self._span(self._in_keys, accounts, t0, t1)
+
+    def outgoing(self, accounts, t0=None, t1=None):
+        """
+        Rows sent by ``accounts`` between t0 and t1 (scalars or one per
+        account), grouped in the given account order, oldest first.
+        """
+        return gather(self.out_order, *self.out_span(accounts, t0, t1))
+
+    def incoming(self, accounts, t0=None, t1=None):
+        """ Same as outgoing, for rows received """
+        return gather(self.in_order, *self.in_span(accounts, t0, t1))
+
+    def nbytes(self):
+        return sum(
+            a.nbytes for a in (
+                self.times, self.ranks, self.out_order, self.out_offsets, self._out_keys,
+                self.in_order, self.in_offsets, self._in_keys,
+            )
+        )
+
+
+def gather(order, lo, hi):
+    """ order[lo:hi], or the concatenation of order[lo[i]:hi[i]] for arrays """
+    if np.ndim(lo) == 0:
+        return order[lo:hi]
+    return order[spans(lo, hi)]
+
+
+def spans(lo, hi):
+    """ The concatenation of range(lo[i], hi[i]), as one array """
+    lengths = hi - lo
+    shift = np.repeat(lo - (np.cumsum(lengths) - lengths), lengths)
+    return np.arange(lengths.sum()) + shift
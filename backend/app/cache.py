@@ -0,0 +1,241 @@
+import hashlib
+import os
+import pickle
+import stat
+import tempfile
+import threading
+import warnings
+from collections import OrderedDict
+
+import numpy as np
+
+CACHE_ENABLED = os.environ.get("RIFT_CACHE", "1") == "1"
+CACHE_MEMORY_MB = int(os.environ.get("RIFT_CACHE_MB", "256"))
+# per user: pickles are only ever loaded from a directory nobody else can write
+CACHE_DIR = os.environ.get("RIFT_CACHE_DIR") or os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "rift", "analysis"
+)
+CACHE_DISK_MB = int(os.environ.get("RIFT_CACHE_DISK_MB", "2048"))
+
+HASH_BLOCK = 1 << 20
+
+# module constants that change how fast, not what, an analysis computes
+# (time-budgeted results are never cached, so the budget is one of them)
+OPERATIONAL_SETTINGS = {
+    "CYCLE_WORKERS", "DETECTOR_WORKERS", "CENTRALITY_TIME_BUDGET_S", "PIVOT_BATCH",
+}
+
+
+# -----------------------------
+# Keys
+# -----------------------------
+def digest(*parts):
+    """ Stable hex key for strings, numbers, tuples and NumPy arrays """
+    h = hashlib.blake2b(digest_size=20)
+    for part in parts:
+        if isinstance(part, np.ndarray):
+            h.update(str(part.dtype).encode())
+            h.update(np.ascontiguousarray(part).view(np.uint8))
+        else:
+            h.update(repr(part).encode())
+        h.update(b"\x1f")
+    return h.hexdigest()
+
+
+def source_digest(source):
+    """
+    Hash of the raw upload (path or seekable file object), restoring the
+    file position; None when the source can't be read twice.
+    """
+    h = hashlib.blake2b(digest_size=20)
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            for block in iter(lambda: f.read(HASH_BLOCK), b""):
+                h.update(block)
+        return h.hexdigest()
+
+    try:
+        pos = source.tell()
+    except (AttributeError, OSError):
+        return None
+    for block in iter(lambda: source.read(HASH_BLOCK), b""):
+        h.update(block if isinstance(block, bytes) else block.encode())
+    source.seek(pos)
+    return h.hexdigest()
+
+
+def graph_digest(tg):
+    """ Content hash of the parsed transactions, in first-appearance order """
+    return digest(
+        "\x00".join(map(str, tg.accounts.tolist())),
+        tg.indptr, tg.indices, tg.edge_ptr, tg.amounts, tg.timestamps,
+    )
+
+
+def config_fingerprint(*modules):
+    """ UPPER_CASE settings of the given modules, so any tuning invalidates """
+    settings = []
+    for module in modules:
+        for name, value in sorted(vars(module).items()):
+            if not name.isupper() or name in OPERATIONAL_SETTINGS:
+                continue
+            if isinstance(value, (int, float, str, bool, tuple, type(None))):
+                settings.append((module.__name__, name, value))
+    return digest(*settings)
+
+
+def private_dir(path):
+    """
+    Create ``path`` (mode 0o700) if needed and check that it is a real
+    directory owned by this user that nobody else can write; raises
+    PermissionError if not.
+    """
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    st = os.lstat(path)
+    if not stat.S_ISDIR(st.st_mode):
+        raise PermissionError(f"{path} is not a directory")
+    if st.st_uid != os.getuid():
+        raise PermissionError(f"{path} is owned by another user")
+    if st.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+        raise PermissionError(f"{path} is writable by other users")
+    return path
+
+
+# -----------------------------
+# Storage tiers
+# -----------------------------
+class AnalysisCache:
+    """
+    Two-tier LRU of pickled values: a size-bounded in-memory tier in front
+    of a directory on disk (shared by every worker process). Values are
+    stored pickled, so callers can mutate what they get back.
+    """
+
+    def __init__(self, memory_mb=CACHE_MEMORY_MB, directory=CACHE_DIR, disk_mb=CACHE_DISK_MB):
+        self.memory_bytes = memory_mb * 2**20
+        self.directory = directory or None
+        self.disk_bytes = disk_mb * 2**20
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._memory_used = 0
+        if self.directory:
+            try:
+                private_dir(self.directory)
+            except OSError as e:
+                warnings.warn(f"analysis cache: disk tier off ({e})")
+                self.directory = None
+
+    def get(self, key):
+        with self._lock:
+            blob = self._memory.get(key)
+            if blob is not None:
+                self._memory.move_to_end(key)
+        if blob is None:
+            blob = self._disk_get(key)
+            if blob is None:
+                return None
+            self._memory_put(key, blob)
+        try:
+            return pickle.loads(blob)
+        except Exception:
+            # corrupt or from an incompatible build: a miss, and gone
+            self._drop(key)
+            return None
+
+    def _drop(self, key):
+        with self._lock:
+            blob = self._memory.pop(key, None)
+            if blob is not None:
+                self._memory_used -= len(blob)
+        if self.directory:
+            try:
+                os.unlink(self._path(key))
+            except OSError:
+                pass
+
+    def put(self, key, value):
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        self._memory_put(key, blob)
+        self._disk_put(key, blob)
+
+    # memory tier
+    def _memory_put(self, key, blob):
+        if len(blob) > self.memory_bytes:
+            return
+        with self._lock:
+            old = self._memory.pop(key, None)
+            if old is not None:
+                self._memory_used -= len(old)
+            self._memory[key] = blob
+            self._memory_used += len(blob)
+            while self._memory_used > self.memory_bytes:
+                _, dropped = self._memory.popitem(last=False)
+                self._memory_used -= len(dropped)
+
+    # disk tier: one file per key, mtime is the recency
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.pkl")
+
+    def _disk_get(self, key):
+        if not self.directory:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                blob = f.read()
+            os.utime(path)
+        except OSError:
+            return None
+        return blob
+
+    def _disk_put(self, key, blob):
+        if not self.directory or len(blob) > self.disk_bytes:
+            return
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(blob)
+            os.replace(tmp, self._path(key))
+        except OSError:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            return
+        self._disk_evict()
+
+    def _disk_evict(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".pkl"):
+                continue
+            try:
+                st = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, name))
+
+        used = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if used <= self.disk_bytes:
+                break
+            try:
+                os.unlink(os.path.join(self.directory, name))
+            except OSError:
+                pass
+            used -= size
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """ Process-wide cache, or None when RIFT_CACHE=0 """
+    global _cache
+    if not CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = AnalysisCache()
+        return _cache
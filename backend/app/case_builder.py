@@ -1,34 +1,159 @@
-import networkx as nx
-
-def build_graph(df):
-
-    G = nx.DiGraph()
-    node_stats = {}
-
-    for _, row in df.iterrows():
-        sender = row["sender_id"]
-        receiver = row["receiver_id"]
-
-        G.add_edge(sender, receiver,
-                   amount=row["amount"],
-                   timestamp=row["timestamp"])
-
-        for node in [sender, receiver]:
-            if node not in node_stats:
-                node_stats[node] = {
-                    "transactions": 0,
-                    "in_degree": 0,
-                    "out_degree": 0,
-                    "patterns": set(),
-                    "ring_ids": set(),
-                    "amounts": []
-                }
-
-        node_stats[sender]["transactions"] += 1
-        node_stats[sender]["out_degree"] += 1
-        node_stats[sender]["amounts"].append(row["amount"])
-
-        node_stats[receiver]["transactions"] += 1
-        node_stats[receiver]["in_degree"] += 1
-
-    return G, node_stats
+"""
+Investigation cases: fraud rings merged wherever they share an account,
+so one mule network reads as one case rather than dozens of overlapping
+cycle / smurf / shell rings.
+
+Rings are merged with a union-find over account codes (vectorized
+hooking and path compression, near-linear in ring memberships); case
+aggregates come from one pass over the ring and edge arrays.
+"""
+import gc
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+
+from app.transaction_graph import NS_PER_HOUR
+
+MIXED = "mixed"
+
+
+def union_find(n, a, b):
+    """
+    Roots after union(a[i], b[i]) for all i, over elements 0..n-1: every
+    element points at the smallest element of its set.
+    """
+    parent = np.arange(n)
+    a = np.asarray(a, dtype=np.int64)
+    b = np.asarray(b, dtype=np.int64)
+    while True:
+        _compress(parent)
+        ra, rb = parent[a], parent[b]
+        apart = ra != rb
+        if not apart.any():
+            return parent
+        a, b = a[apart], b[apart]
+        # hook each larger root under the smallest root it meets
+        np.minimum.at(parent, np.maximum(ra[apart], rb[apart]), np.minimum(ra[apart], rb[apart]))
+
+
+def _compress(parent):
+    """ Path compression, in place: pointer jumping until every element points at a root """
+    while True:
+        grand = parent[parent]
+        if np.array_equal(grand, parent):
+            return
+        parent[:] = grand
+
+
+def build_cases(tg, fraud_rings):
+    """
+    -> case dicts, highest risk first:
+
+        case_id           CASE_0001, ...
+        member_accounts   every account of its rings (codes, by account id)
+        ring_ids          the merged rings
+        pattern_type      the rings' pattern type, or "mixed"
+        pattern_mix       {pattern_type: number of rings}
+        risk_score        highest ring risk
+        total_flow        amount moved between the case's accounts
+        transfers         number of those transfers
+        first_seen / last_seen / time_span_hours   over those transfers
+    """
+    if not fraud_rings:
+        return []
+    n = tg.number_of_nodes()
+    sizes = np.array([len(r["member_accounts"]) for r in fraud_rings], dtype=np.int64)
+    members = np.fromiter(
+        chain.from_iterable(r["member_accounts"] for r in fraud_rings), dtype=np.int64, count=int(sizes.sum())
+    )
+    ring_of = np.repeat(np.arange(len(fraud_rings)), sizes)
+
+    # every member joins its ring's first member
+    firsts = members[np.cumsum(sizes) - sizes]
+    root = union_find(n, np.repeat(firsts, sizes), members)
+    roots, ring_case = np.unique(root[firsts], return_inverse=True)
+    n_cases = len(roots)
+
+    case_of = np.full(n, -1, dtype=np.int64)
+    case_of[members] = ring_case[ring_of]
+
+    # -----------------------------
+    # Ring-level aggregates
+    # -----------------------------
+    risk = np.array([r["risk_score"] for r in fraud_rings], dtype=np.float64)
+    max_risk = np.full(n_cases, -np.inf)
+    np.maximum.at(max_risk, ring_case, risk)
+
+    pattern, pattern_names = pd.factorize(pd.Series([r["pattern_type"] for r in fraud_rings]), sort=True)
+    mix = np.zeros((n_cases, len(pattern_names)), dtype=np.int64)
+    np.add.at(mix, (ring_case, pattern), 1)
+
+    # -----------------------------
+    # Flow between each case's accounts
+    # -----------------------------
+    src_case = case_of[tg.edge_src]
+    internal = np.flatnonzero((src_case >= 0) & (src_case == case_of[tg.indices]))
+    edge_case = src_case[internal]
+    flow = np.bincount(edge_case, weights=tg.edge_totals()[internal], minlength=n_cases)
+    transfers = np.bincount(edge_case, weights=np.diff(tg.edge_ptr)[internal], minlength=n_cases)
+    first_seen = np.full(n_cases, np.iinfo(np.int64).max)
+    last_seen = np.full(n_cases, np.iinfo(np.int64).min)
+    np.minimum.at(first_seen, edge_case, tg.timestamps[tg.edge_ptr[internal]])
+    np.maximum.at(last_seen, edge_case, tg.edge_latest()[internal])
+    seen = transfers > 0
+    first_seen[~seen] = last_seen[~seen] = 0
+    span_hours = ((last_seen - first_seen) / NS_PER_HOUR).round(2).tolist()
+    first_text = pd.to_datetime(first_seen).astype(str).tolist()
+    last_text = pd.to_datetime(last_seen).astype(str).tolist()
+
+    # members by account id, grouped per case
+    accounts = np.flatnonzero(case_of >= 0)
+    accounts = accounts[np.lexsort((tg.accounts[accounts], case_of[accounts]))]
+    bounds = np.searchsorted(case_of[accounts], np.arange(n_cases + 1))
+    rings_by_case = np.argsort(ring_case, kind="stable")
+    ring_bounds = np.searchsorted(ring_case[rings_by_case], np.arange(n_cases + 1))
+
+    order = np.lexsort((roots, -np.diff(bounds), -max_risk))
+    member_list = accounts.tolist()
+    ring_ids = np.array([r["ring_id"] for r in fraud_rings], dtype=object)[rings_by_case].tolist()
+    names = [str(p) for p in pattern_names]
+    mix_list = mix.tolist()
+    bounds, ring_bounds = bounds.tolist(), ring_bounds.tolist()
+    risk_list = max_risk.round(2).tolist()
+    flow_list = flow.round(2).tolist()
+    transfer_list = transfers.astype(np.int64).tolist()
+    seen_list = seen.tolist()
+
+    # one small dict per case: keep the cyclic GC out
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        cases = []
+        for number, c in enumerate(order.tolist(), start=1):
+            pattern_mix = {name: k for name, k in zip(names, mix_list[c]) if k}
+            cases.append({
+                "case_id": f"CASE_{number:04d}",
+                "member_accounts": member_list[bounds[c]:bounds[c + 1]],
+                "ring_ids": ring_ids[ring_bounds[c]:ring_bounds[c + 1]],
+                "pattern_type": next(iter(pattern_mix)) if len(pattern_mix) == 1 else MIXED,
+                "pattern_mix": pattern_mix,
+                "risk_score": risk_list[c],
+                "total_flow": flow_list[c],
+                "transfers": transfer_list[c],
+                "first_seen": first_text[c] if seen_list[c] else None,
+                "last_seen": last_text[c] if seen_list[c] else None,
+                "time_span_hours": span_hours[c],
+            })
+        return cases
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+
+def assign_cases(suspicious_accounts, cases):
+    """ Sets each suspicious account's ``case_id`` (its one case, or "") """
+    case_of = {m: case["case_id"] for case in cases for m in case["member_accounts"]}
+    for account in suspicious_accounts:
+        account["case_id"] = case_of.get(account["account_id"], "")
+    return suspicious_accounts
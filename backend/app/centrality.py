@@ -0,0 +1,271 @@
+import math
+import os
+import random
+import time
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+from scipy.sparse import diags
+
+from app.instrumentation import count, stage
+
+# exact | sampled | rings | off | auto
+BETWEENNESS_MODE = os.environ.get("RIFT_BETWEENNESS", "auto")
+BETWEENNESS_SAMPLES = int(os.environ.get("RIFT_BETWEENNESS_SAMPLES", "256"))
+BETWEENNESS_SEED = int(os.environ.get("RIFT_BETWEENNESS_SEED", "42"))
+RING_HOPS = int(os.environ.get("RIFT_RING_HOPS", "2"))
+CENTRALITY_TIME_BUDGET_S = float(os.environ.get("RIFT_CENTRALITY_BUDGET_S", "30"))
+# auto: exact while n * (n + m) stays under this (Brandes' cost; about 5 s
+# here, measured at 0.5-0.6 us per unit), else sampled pivots over the
+# whole graph up to WHOLE_GRAPH_MAX_NODES accounts, else rings
+EXACT_MAX_WORK = int(os.environ.get("RIFT_BETWEENNESS_EXACT_WORK", "10000000"))
+WHOLE_GRAPH_MAX_NODES = 5000
+PIVOT_BATCH = 16            # pivots per batch between budget checks
+ERROR_CONFIDENCE = 0.9
+
+PAGERANK_ALPHA = 0.85
+PAGERANK_TOL = 1e-6         # per node, as in nx.pagerank
+PAGERANK_MAX_ITER = 100
+# None (unweighted, like nx.pagerank on our graph) | amount | transfers
+PAGERANK_WEIGHT = os.environ.get("RIFT_PAGERANK_WEIGHT") or None
+# streams (app.incremental) seed each batch's PageRank with the previous batch's
+PAGERANK_WARM_START = os.environ.get("RIFT_PAGERANK_WARM_START", "1") == "1"
+
+
+def sampling_error_bound(n, k, confidence=ERROR_CONFIDENCE):
+    """
+    Additive error of k-pivot betweenness on normalized scores, holding for
+    all n nodes at once with the given confidence (Hoeffding + union bound).
+    """
+    if k <= 0 or n <= 2:
+        return None
+    if k >= n:
+        return 0.0
+    delta = 1 - confidence
+    return round(math.sqrt(math.log(2 * n / delta) / (2 * k)), 4)
+
+
+def ring_neighborhood(G, fraud_rings, hops=RING_HOPS):
+    """ Ring members plus everything within ``hops`` (either direction) """
+    frontier = {m for ring in fraud_rings for m in ring["member_accounts"] if m in G}
+    nodes = set(frontier)
+    for _ in range(hops):
+        nxt = set()
+        for u in frontier:
+            nxt.update(G.successors(u))
+            nxt.update(G.predecessors(u))
+        frontier = nxt - nodes
+        nodes |= frontier
+        if not frontier:
+            break
+    return nodes
+
+
+def exact_fits(n, m):
+    """ Whether an exact sweep (n pivots, each O(n + m)) is cheap enough """
+    return n * (n + m) <= EXACT_MAX_WORK
+
+
+def pivot_betweenness(G, pivots, deadline):
+    """
+    Brandes accumulation from each pivot, in batches, until the deadline.
+    Returns (normalized estimate, pivots actually used).
+    """
+    n = G.number_of_nodes()
+    raw = dict.fromkeys(G, 0.0)
+    used = 0
+
+    for i in range(0, len(pivots), PIVOT_BATCH):
+        if used and time.monotonic() > deadline:
+            break
+        batch = pivots[i:i + PIVOT_BATCH]
+        part = nx.betweenness_centrality_subset(G, batch, G, normalized=False)
+        for v, b in part.items():
+            raw[v] += b
+        used += len(batch)
+
+    if n <= 2 or used == 0:
+        return dict.fromkeys(G, 0.0), used
+
+    scale = (n / used) / ((n - 1) * (n - 2))
+    return {v: b * scale for v, b in raw.items()}, used
+
+
+def compute_betweenness(G, fraud_rings, mode=BETWEENNESS_MODE,
+                        samples=BETWEENNESS_SAMPLES, seed=BETWEENNESS_SEED,
+                        budget_s=CENTRALITY_TIME_BUDGET_S, tg=None):
+    """
+    -> (betweenness dict, report dict for the response summary). With the
+    CSR graph ``tg``, G may be None: only the part betweenness runs on is
+    converted to NetworkX.
+    """
+    report = {"mode": mode, "status": "ok"}
+    if mode == "off":
+        report["status"] = "skipped"
+        return {}, report
+
+    if mode == "auto":
+        if tg is not None:
+            n_total, m_total = tg.number_of_nodes(), tg.number_of_edges()
+        else:
+            n_total, m_total = G.number_of_nodes(), G.number_of_edges()
+        if exact_fits(n_total, m_total):
+            mode = "exact"
+        elif n_total <= WHOLE_GRAPH_MAX_NODES:
+            mode = "sampled"
+        else:
+            mode = "rings"
+        report["resolved_mode"] = mode
+
+    if mode == "rings":
+        if tg is not None:
+            mask = np.zeros(tg.number_of_nodes(), dtype=bool)
+            mask[[m for ring in fraud_rings for m in ring["member_accounts"]]] = True
+            H = tg.to_networkx(nodes=tg.reach(mask, RING_HOPS, "both"))
+        else:
+            H = G.subgraph(ring_neighborhood(G, fraud_rings))
+        report["hops"] = RING_HOPS
+    else:
+        H = G if G is not None else tg.to_networkx()
+
+    n = H.number_of_nodes()
+    report["nodes"] = n
+
+    nodes = list(H)
+    rng = random.Random(seed)
+    if mode == "exact" or (mode == "rings" and exact_fits(n, H.number_of_edges())):
+        # shuffled, so a sweep cut short by the budget is still a uniform
+        # sample (which the error bound assumes), not a prefix of the codes
+        pivots = nodes
+        rng.shuffle(pivots)
+    else:
+        pivots = rng.sample(nodes, min(samples, n))
+    report["seed"] = seed
+
+    deadline = time.monotonic() + budget_s
+    betweenness, used = pivot_betweenness(H, pivots, deadline)
+
+    report["pivots"] = used
+    report["error_bound"] = sampling_error_bound(n, used)
+    report["confidence"] = ERROR_CONFIDENCE
+    if used < len(pivots):
+        # out of time: fewer pivots, wider (reported) error bound
+        report["status"] = "degraded"
+        report["requested_pivots"] = len(pivots)
+        report["time_budget_s"] = budget_s
+
+    return betweenness, report
+
+
+def pagerank_csr(tg, alpha=PAGERANK_ALPHA, weight=PAGERANK_WEIGHT,
+                 tol=PAGERANK_TOL, max_iter=PAGERANK_MAX_ITER, nstart=None):
+    """
+    Power-iteration PageRank on the TransactionGraph's CSR adjacency.
+
+    Same model as nx.pagerank: dangling mass is spread uniformly and the
+    run stops when the L1 change drops below n * tol. ``weight`` picks
+    transition weights (see TransactionGraph.adjacency). ``nstart`` is a
+    warm start: a (accounts, scores) pair from an earlier run, matched by
+    account id so the two graphs need not share codes. New accounts start
+    at 1/n.
+
+    Returns (scores array aligned with tg.accounts, diagnostics dict).
+    Never raises on non-convergence; diagnostics["converged"] says so.
+    """
+    t0 = time.perf_counter()
+    n = tg.number_of_nodes()
+    info = {
+        "method": "scipy_power", "weight": weight, "alpha": alpha,
+        "tol": tol, "max_iter": max_iter, "warm_start": nstart is not None,
+    }
+    if n == 0:
+        info.update(iterations=0, converged=True, residual=0.0, seconds=0.0)
+        return np.zeros(0), info
+
+    A = tg.adjacency(weight=weight, dtype=np.float64)
+    out_strength = np.asarray(A.sum(axis=1)).ravel()
+    dangling = out_strength == 0
+    inv = np.divide(1.0, out_strength, out=np.zeros(n), where=~dangling)
+    # x @ P == P.T @ x; transpose once so each step is a CSR matvec
+    PT = (diags(inv) @ A).T.tocsr()
+
+    x = _warm_start_vector(tg.accounts, nstart) if nstart is not None else None
+    if x is None:
+        x = np.full(n, 1.0 / n)
+
+    residual = float("inf")
+    converged = False
+    it = 0
+    while it < max_iter:
+        it += 1
+        x_prev = x
+        x = alpha * (PT @ x_prev)
+        x += (alpha * x_prev[dangling].sum() + (1 - alpha)) / n
+        residual = float(np.abs(x - x_prev).sum())
+        if residual < n * tol:
+            converged = True
+            break
+
+    info.update(
+        iterations=it,
+        converged=converged,
+        residual=residual,
+        seconds=round(time.perf_counter() - t0, 4),
+    )
+    return x, info
+
+
+def _warm_start_vector(accounts, nstart):
+    prev_accounts, prev_scores = nstart
+    pos = pd.Index(prev_accounts).get_indexer(accounts)
+    if (pos < 0).all():
+        return None
+    x = np.where(pos >= 0, np.asarray(prev_scores)[pos], 1.0 / len(accounts))
+    return x / x.sum()
+
+
+def compute_pagerank(G, tg=None, nstart=None):
+    """
+    -> (pagerank, report dict). With the CSR graph this is the sparse
+    solver, warm-started from ``nstart`` if given (see pagerank_csr), and
+    the scores come back as an array aligned with tg.accounts; otherwise a
+    dict.
+    """
+    if tg is None:
+        try:
+            return nx.pagerank(G, max_iter=50), {"method": "networkx", "status": "ok"}
+        except nx.PowerIterationFailedConvergence as e:
+            return {}, {"method": "networkx", "status": "failed", "error": str(e), "fallback": "zero"}
+
+    scores, info = pagerank_csr(tg, nstart=nstart)
+    # an unconverged vector is still a usable ranking; keep it for scoring
+    info["status"] = "ok" if info["converged"] else "not_converged"
+    return scores, info
+
+
+def compute_centralities(G, fraud_rings, tg=None, pagerank_start=None):
+    """
+    PageRank and betweenness for scoring, plus a report of what was
+    actually computed (mode, pivots, error bound, failures, fallbacks).
+    G may be None when the CSR graph ``tg`` is given. ``pagerank_start``
+    warm-starts PageRank: only a stream passes one, its previous batch's.
+    """
+    with stage("pagerank"):
+        pagerank, pr_report = compute_pagerank(G, tg, nstart=pagerank_start)
+        count("nodes", len(pagerank))
+        count("iterations", pr_report.get("iterations", 0))
+    try:
+        with stage("betweenness"):
+            betweenness, bc_report = compute_betweenness(G, fraud_rings, tg=tg)
+            count("nodes", bc_report.get("nodes", 0))
+            count("pivots", bc_report.get("pivots", 0))
+    except Exception as e:
+        betweenness = {}
+        bc_report = {
+            "mode": BETWEENNESS_MODE,
+            "status": "failed",
+            "error": f"{type(e).__name__}: {e}",
+            "fallback": "zero",
+        }
+    return pagerank, betweenness, {"pagerank": pr_report, "betweenness": bc_report}
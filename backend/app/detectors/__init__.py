@@ -1,21 +1,17 @@
-from .cycle_detector import detect_cycles
-from .smurf_detector import detect_smurf_rings
-from .shell_detector import detect_shells
+from .registry import (
+    DETECTORS,
+    detector_modules,
+    enabled_detectors,
+    register_detector,
+    register_index,
+    run_detectors,
+)
 
+# importing a detector module registers its plugins (registration order is
+# output order)
+from . import cycle_detector, smurf_detector, shell_detector, fan_detector  # noqa: F401
 
-def detect_patterns(G, df, node_stats):
-    rings = []
-
-    # Cycle detection
-    cycle_rings = detect_cycles(G, df, node_stats)
-    rings.extend(cycle_rings)
-
-    # Smurf detection
-    smurf_rings = detect_smurf_rings(df)
-    rings.extend(smurf_rings)
 
-    # Shell detection
-    shell_rings = detect_shells(G, node_stats)
-    rings.extend(shell_rings)
-
-    return rings
+def detect_patterns(G, df, node_stats):
+    """ Rings from every enabled detector (see app.detectors.registry) """
+    return run_detectors(G, node_stats)
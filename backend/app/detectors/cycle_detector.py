@@ -1,130 +1,97 @@
-import networkx as nx
-from collections import defaultdict
-import statistics
-from datetime import timedelta
+import os
+
+import numpy as np
+
+from app.detectors.registry import register_detector
+from app.detectors.temporal_cycles import (
+    enumerate_temporal_cycles,
+    parallel_temporal_cycles,
+)
+from app.instrumentation import count
+from app.transaction_graph import by_account_id
 
 MIN_RING_SIZE = 3
 MAX_RING_SIZE = 5
 MAX_TIME_WINDOW_HOURS = 72
 MIN_RELATIVE_AMOUNT = 1.8      # was 2, slightly lowered
 AMOUNT_PRESERVATION_TOL = 0.92  # at least 92% of amount should stay in cycle
+CYCLE_WORKERS = int(os.environ.get("RIFT_CYCLE_WORKERS", "1"))  # >1 → SCC-partitioned process pool
 
-def find_cycles_dfs(G, source, max_depth, visited_global, time_window_hours):
-    """ Limited-depth DFS cycle finder from source, temporal constraint """
-    def dfs(node, path, start_time):
-        if len(path) > max_depth:
-            return []
-
-        cycles = []
-        for neigh, data in G[node].items():
-            if data.get('timestamp', None) is None:
-                continue
-            if (data['timestamp'] - start_time).total_seconds() / 3600 > time_window_hours:
-                continue
-
-            if neigh == path[0] and len(path) >= MIN_RING_SIZE:
-                cycle = path + [neigh]
-                cycles.append(tuple(cycle))
-            elif neigh not in path:
-                new_path = path + [neigh]
-                cycles.extend(dfs(neigh, new_path, start_time))
-
-        return cycles
-
-    if source in visited_global:
-        return []
-
-    visited_global.add(source)
-    start_time = min((d['timestamp'] for _, d in G[source].items()), default=None)
-    if start_time is None:
-        return []
-
-    found = dfs(source, [source], start_time)
+@register_detector("cycles", needs=("scc", "median_amount"))
+def cycle_plugin(ctx):
+    return detect_cycles(
+        ctx.tg, None, ctx.node_stats,
+        labels=ctx.index("scc"), median_amount=ctx.index("median_amount"),
+    )
 
-    # deduplicate rotationally
-    unique = set()
-    for c in found:
-        c_rot = min(c[i:] + c[:i] for i in range(len(c)-1))
-        unique.add(c_rot)
 
-    return list(unique)
-
-
-def detect_cycles(G, df, node_stats):
+def detect_cycles(G, df, node_stats, workers=None, labels=None, median_amount=None):
+    """ ``labels`` (SCC per account) and ``median_amount`` are computed if not given """
     rings = []
     ring_counter = 1
 
-    all_amounts = [d['amount'] for u,v,d in G.edges(data=True) if 'amount' in d]
-    median_amount = statistics.median(all_amounts) if all_amounts else 1.0
-
-    visited = set()
-
-    for node in list(G.nodes()):
-        if node in visited:
+    if median_amount is None:
+        median_amount = float(np.median(G.amounts)) if G.number_of_transfers() else 1.0
+
+    workers = CYCLE_WORKERS if workers is None else workers
+
+    # time-ordered, windowed cycles, one per node cycle, streamed; the
+    # parallel path yields the very same sequence so ring ids match
+    if workers > 1:
+        cycles = parallel_temporal_cycles(
+            G, MIN_RING_SIZE, MAX_RING_SIZE, MAX_TIME_WINDOW_HOURS,
+            workers=workers, labels=labels
+        )
+    else:
+        cycles = enumerate_temporal_cycles(
+            G, MIN_RING_SIZE, MAX_RING_SIZE, MAX_TIME_WINDOW_HOURS, labels=labels
+        )
+
+    candidates = 0
+    for cycle, hop_amounts, timestamps in cycles:
+        candidates += 1
+        risk = cycle_risk(hop_amounts, median_amount)
+        if risk is None:
             continue
-        if G.out_degree(node) < 1 or G.in_degree(node) < 1:
-            continue
-
-        cycles = find_cycles_dfs(G, node, MAX_RING_SIZE, visited, MAX_TIME_WINDOW_HOURS)
-
-        for cycle_tuple in cycles:
-            cycle = list(cycle_tuple[:-1])  # remove duplicate closing node
-            if len(cycle) < MIN_RING_SIZE or len(cycle) > MAX_RING_SIZE:
-                continue
 
-            # amount preservation check
-            total_out = 0.0
-            total_in  = 0.0
-            timestamps = []
+        ring_id = f"RING_C_{ring_counter:03d}"
+        members = by_account_id(G.accounts, cycle)
 
-            valid = True
-            for i in range(len(cycle)):
-                a = cycle[i]
-                b = cycle[(i+1) % len(cycle)]
-                if not G.has_edge(a, b):
-                    valid = False
-                    break
-                d = G[a][b]
-                total_out += d.get('amount', 0)
-                total_in  += d.get('amount', 0)  # in simple cycle should balance
-                timestamps.append(d.get('timestamp'))
+        rings.append({
+            "ring_id": ring_id,
+            "member_accounts": members,
+            "pattern_type": "cycle",
+            "risk_score": round(risk, 2)
+        })
 
-            if not valid or not timestamps:
-                continue
+        tag_cycle_members(node_stats, members, ring_id)
 
-            if (max(timestamps) - min(timestamps)) / timedelta(hours=1) > MAX_TIME_WINDOW_HOURS:
-                continue
+        ring_counter += 1
 
-            if total_out == 0:
-                continue
+    count("candidate_cycles", candidates)
+    return rings
 
-            relative = total_out / median_amount
-            if relative < MIN_RELATIVE_AMOUNT:
-                continue
 
-            # stricter: amount should roughly preserve
-            if min(total_out, total_in) / max(total_out, total_in + 1e-9) < AMOUNT_PRESERVATION_TOL:
-                continue
+def cycle_risk(hop_amounts, median_amount):
+    """ Ring risk for a cycle's hop amounts, or None if it doesn't qualify """
+    # amount preservation check
+    total_out = sum(hop_amounts)
+    total_in = sum(hop_amounts)  # in simple cycle should balance
 
-            risk = min(100.0, 45 + relative * 8)
+    if total_out == 0:
+        return None
 
-            ring_id = f"RING_C_{ring_counter:03d}"
-            members = sorted(set(cycle))
+    relative = total_out / median_amount
+    if relative < MIN_RELATIVE_AMOUNT:
+        return None
 
-            rings.append({
-                "ring_id": ring_id,
-                "member_accounts": members,
-                "pattern_type": "cycle",
-                "risk_score": round(risk, 2)
-            })
+    # stricter: amount should roughly preserve
+    if min(total_out, total_in) / max(total_out, total_in + 1e-9) < AMOUNT_PRESERVATION_TOL:
+        return None
 
-            for acc in members:
-                node_stats[acc].setdefault("patterns", set()).add(f"cycle_length_{len(members)}")
-                node_stats[acc].setdefault("ring_ids", set()).add(ring_id)
+    return min(100.0, 45 + relative * 8)
 
-            ring_counter += 1
 
-            # mark all in cycle visited (avoid redundant work)
-            visited.update(members)
+def tag_cycle_members(node_stats, members, ring_id):
+    node_stats.tag(members, f"cycle_length_{len(members)}", ring_id)
 
-    return rings
\ No newline at end of file
@@ -0,0 +1,58 @@
+"""
+Plain fan-in / fan-out: one account dealing with many distinct
+counterparties whose latest transfers all fall inside one window. Ported
+from the old single-file detector; off by default (see RIFT_DETECTORS),
+since the smurf detector covers the fan-in-then-fan-out case precisely.
+"""
+import numpy as np
+
+from app.detectors.registry import register_detector
+from app.instrumentation import count
+from app.transaction_graph import NS_PER_HOUR, by_account_id
+
+FAN_THRESHOLD = 10
+FAN_WINDOW_HOURS = 72
+FAN_RISK = 60.0
+
+
+@register_detector("fan_in", needs=("degrees",), default=False)
+def fan_in_plugin(ctx):
+    G = ctx.tg
+    _, in_deg = ctx.index("degrees")
+    # in-edges grouped by receiver
+    latest = G.edge_latest()[G.in_edges]
+    return _fan_rings(G, in_deg, G.in_indptr, latest, G.in_indices, "fan_in", "RING_FI")
+
+
+@register_detector("fan_out", needs=("degrees",), default=False)
+def fan_out_plugin(ctx):
+    G = ctx.tg
+    out_deg, _ = ctx.index("degrees")
+    # edge ids are already grouped by sender
+    return _fan_rings(G, out_deg, G.indptr, G.edge_latest(), G.indices, "fan_out", "RING_FO")
+
+
+def _fan_rings(G, degree, indptr, latest, partners, pattern, prefix):
+    """ Rings for accounts whose edges (grouped per ``indptr``) fit the window """
+    # non-empty groups tile ``latest``, so one reduceat gives every span
+    nonempty = np.flatnonzero(degree > 0)
+    span = np.zeros(len(degree), dtype=np.int64)
+    if len(nonempty):
+        starts = indptr[nonempty]
+        span[nonempty] = np.maximum.reduceat(latest, starts) - np.minimum.reduceat(latest, starts)
+
+    candidates = degree >= FAN_THRESHOLD
+    count("hubs_scanned", candidates.sum())
+    hubs = np.flatnonzero(candidates & (span <= FAN_WINDOW_HOURS * NS_PER_HOUR))
+
+    accounts = G.accounts
+    rings = []
+    for ring_counter, hub in enumerate(hubs.tolist(), start=1):
+        members = partners[indptr[hub]:indptr[hub + 1]]
+        rings.append({
+            "ring_id": f"{prefix}_{ring_counter:03d}",
+            "member_accounts": [hub] + by_account_id(accounts, members.tolist()),
+            "pattern_type": pattern,
+            "risk_score": FAN_RISK
+        })
+    return rings
@@ -0,0 +1,161 @@
+"""
+Detector plugins and the shared indexes they run on.
+
+A detector is a function ``run(ctx) -> [ring dicts]`` registered with
+``@register_detector(name, needs=(...))``; ``needs`` names the indexes it
+reads through ``ctx.index(name)``. Indexes are registered the same way
+with ``@register_index`` and built at most once per run, the first time
+any detector (or another index) asks for them, then shared.
+
+``run_detectors`` runs the enabled detectors over a thread pool (they only
+share read-only indexes) and returns their rings in registration order, so
+the output does not depend on which one finishes first. Under a request
+profile they run inline, where the profiler can see them.
+"""
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+
+import numpy as np
+
+from app.account_index import AccountIndex
+from app.instrumentation import count, profiling, stage
+
+# comma-separated detector names; empty = every detector enabled by default
+ENABLED_DETECTORS = os.environ.get("RIFT_DETECTORS", "")
+DETECTOR_WORKERS = int(os.environ.get("RIFT_DETECTOR_WORKERS", "0"))  # 0 = one per detector
+
+DETECTORS = {}
+INDEXES = {}
+
+
+def register_detector(name, needs=(), default=True):
+    """ Register ``run(ctx)`` as detector ``name``; off unless ``default`` or listed in RIFT_DETECTORS """
+    def register(run):
+        DETECTORS[name] = {
+            "name": name,
+            "run": run,
+            "needs": tuple(needs),
+            "default": default,
+            "module": sys.modules[run.__module__],
+        }
+        return run
+    return register
+
+
+def register_index(name):
+    """ Register ``build(ctx) -> value`` as shared index ``name`` """
+    def register(build):
+        INDEXES[name] = build
+        return build
+    return register
+
+
+def enabled_detectors(names=None):
+    """ Detector names to run, in registration order """
+    if names is None and ENABLED_DETECTORS:
+        names = [n.strip() for n in ENABLED_DETECTORS.split(",") if n.strip()]
+    if names is None:
+        return [n for n, d in DETECTORS.items() if d["default"]]
+    unknown = set(names) - set(DETECTORS)
+    if unknown:
+        raise ValueError(f"unknown detectors: {', '.join(sorted(unknown))}")
+    return [n for n in DETECTORS if n in names]
+
+
+def detector_modules():
+    """ Modules defining the registered detectors (their settings key the cache) """
+    modules = {id(d["module"]): d["module"] for d in DETECTORS.values()}
+    return [sys.modules[__name__]] + list(modules.values())
+
+
+# -----------------------------
+# Run context
+# -----------------------------
+class DetectorContext:
+    """ What a detector sees: the graph, node_stats and lazily built shared indexes """
+
+    def __init__(self, tg, node_stats):
+        self.tg = tg
+        self.node_stats = node_stats
+        self._indexes = {}
+        self._locks = {name: threading.Lock() for name in INDEXES}
+
+    def index(self, name):
+        if name in self._indexes:
+            return self._indexes[name]
+        with self._locks[name]:
+            if name not in self._indexes:
+                with stage(f"index:{name}"):
+                    self._indexes[name] = INDEXES[name](self)
+        return self._indexes[name]
+
+
+def run_detectors(tg, node_stats, names=None, workers=None, on_stage=None):
+    """
+    Run the enabled detectors (or ``names``) and return all their rings.
+    Each detector is a stage of its own; ``on_stage`` gets its progress.
+    """
+    names = enabled_detectors(names)
+    workers = workers or DETECTOR_WORKERS or len(names)
+    ctx = DetectorContext(tg, node_stats)
+
+    def run(name):
+        detector = DETECTORS[name]
+        with stage(name, on_stage):
+            for index in detector["needs"]:
+                ctx.index(index)
+            rings = detector["run"](ctx)
+            count("rings", len(rings))
+        return rings
+
+    if workers <= 1 or len(names) <= 1 or profiling():
+        results = [run(name) for name in names]
+    else:
+        with ThreadPoolExecutor(max_workers=min(workers, len(names))) as pool:
+            # each task gets the caller's context, so stages are recorded
+            futures = [pool.submit(copy_context().run, run, name) for name in names]
+            results = [f.result() for f in futures]
+
+    return [ring for rings in results for ring in rings]
+
+
+# -----------------------------
+# Shared indexes
+# -----------------------------
+@register_index("scc")
+def _scc_labels(ctx):
+    """ Strongly connected component label per account """
+    return ctx.tg.strong_components()[1]
+
+
+@register_index("transfers")
+def _transfers(ctx):
+    """ Flat (senders, receivers, amounts, timestamps), CSR order """
+    return ctx.tg.transfer_arrays()
+
+
+@register_index("accounts")
+def _accounts(ctx):
+    """ AccountIndex: per-account, time-sorted sent / received transfer rows """
+    return AccountIndex(*ctx.index("transfers"), ctx.tg.number_of_nodes())
+
+
+@register_index("degrees")
+def _degrees(ctx):
+    """ (out, in) distinct-counterparty degrees """
+    return ctx.tg.out_degrees(), ctx.tg.in_degrees()
+
+
+@register_index("node_tx")
+def _node_tx(ctx):
+    """ Transfers sent + received per account """
+    return ctx.tg.out_transfers + ctx.tg.in_transfers
+
+
+@register_index("median_amount")
+def _median_amount(ctx):
+    tg = ctx.tg
+    return float(np.median(tg.amounts)) if tg.number_of_transfers() else 1.0
@@ -1,52 +1,314 @@
+import gc
+
+import numpy as np
+
+from app.detectors.registry import register_detector
+from app.instrumentation import count
+from app.transaction_graph import NS_PER_HOUR
+
+MAX_SHELL_TX = 4        # stricter
+MIN_CHAIN_LEN = 4       # stricter minimum
+MIN_AMOUNT_RATIO = 0.75
+
+# short chains (ported from the old single-file detector; off by default)
+SHORT_CHAIN_MAX_COUNTERPARTIES = 3
+SHORT_CHAIN_RISK = 60.0
+
+
 def detect_shells(G, node_stats):
+    return shell_rings(G, find_shell_chains(G, shell_tx(G, node_stats)))
+
+
+@register_detector("shell", needs=("node_tx", "degrees"))
+def shell_plugin(ctx):
+    chains = find_shell_chains(ctx.tg, ctx.index("node_tx"), degrees=ctx.index("degrees"))
+    return shell_rings(ctx.tg, chains)
+
+
+def shell_rings(G, chains):
     rings = []
     ring_counter = 2000
 
-    for node in list(G.nodes()):
-        if node_stats[node].get("transactions", 0) > 4:  # stricter
-            continue
-        if G.out_degree(node) != 1 or G.in_degree(node) < 1:
-            continue
-
-        # follow unique successor chain
-        chain = [node]
-        curr = node
-        seen = {node}
-
-        while True:
-            succ = list(G.successors(curr))
-            if len(succ) != 1:
-                break
-            next_n = succ[0]
-            if next_n in seen:
-                break  # avoid self-loop or tiny cycle
-            if node_stats[next_n].get("transactions", 0) > 4:
-                break
-
-            chain.append(next_n)
-            seen.add(next_n)
-            curr = next_n
-
-            if len(chain) >= 4:  # stricter minimum
-                # optional: check amounts are similar along chain
-                amounts = []
-                for i in range(len(chain)-1):
-                    if not G.has_edge(chain[i], chain[i+1]):
-                        break
-                    am = G[chain[i]][chain[i+1]].get("amount", 0)
-                    amounts.append(am)
-                if len(amounts) == len(chain)-1 and min(amounts) > 0:
-                    ratio = min(amounts) / max(amounts)
-                    if ratio < 0.75:  # too much loss → not layering
-                        break
-
-                rings.append({
-                    "ring_id": f"RING_L_{ring_counter}",
-                    "member_accounts": chain[:],
-                    "pattern_type": "layered_shell",
-                    "risk_score": 78.0
-                })
-                ring_counter += 1
-                break  # one chain per starting low-degree node
-
-    return rings
\ No newline at end of file
+    for chain in chains:
+        rings.append({
+            "ring_id": f"RING_L_{ring_counter}",
+            "member_accounts": chain["members"],
+            "pattern_type": "layered_shell",
+            "risk_score": 78.0,
+            **chain_stats(chain)
+        })
+        ring_counter += 1
+
+    return rings
+
+
+def chain_stats(chain):
+    """ The per-chain scores that go out with a layered_shell ring """
+    return {key: chain[key] for key in ("retention", "elapsed_hours", "sub_chain_scores")}
+
+
+def shell_tx(G, node_stats):
+    n = G.number_of_nodes()
+    tx = np.zeros(n, dtype=np.int64)
+    known = min(n, len(node_stats.transactions))
+    tx[:known] = node_stats.transactions[:known]
+    return tx
+
+
+# -----------------------------
+# Maximal chain decomposition
+# -----------------------------
+def shell_paths(G, tx, degrees=None, totals=None):
+    """
+    Every maximal path of shell accounts (at most MAX_SHELL_TX transfers),
+    each passing money to exactly one counterparty, in one vectorized
+    pass: -> (members, offsets), members grouped per path in chain order,
+    paths of at least two accounts.
+
+    Where several links pay one account (a merge), the path goes on from
+    the largest of them (then the earliest, then the lowest code); the
+    other feeders end paths of their own. Pure cycles are left to the
+    cycle detector. Heads nobody pays are dropped, as chains start from
+    money that came in. ``totals`` is G.edge_totals(), if already at hand.
+    """
+    n = G.number_of_nodes()
+    out_deg, in_deg = degrees if degrees is not None else (G.out_degrees(), G.in_degrees())
+    shell = np.asarray(tx) <= MAX_SHELL_TX
+
+    # next account along a chain, or -1
+    nxt = np.full(n, -1, dtype=np.int64)
+    links = np.flatnonzero(shell & (out_deg == 1))
+    succ = G.indices[G.indptr[links]].astype(np.int64)
+    ok = shell[succ] & (succ != links)
+    links, succ = links[ok], succ[ok]
+    nxt[links] = succ
+    _cut_extra_feeders(G, nxt, links, succ, totals)
+    linked = nxt >= 0
+    has_prev = np.zeros(n, dtype=bool)
+    has_prev[nxt[linked]] = True
+
+    # pointer jumping (path compression): afterwards ptr is each account's
+    # path tail and dist its distance there, in O(log length) rounds
+    ptr = np.where(linked, nxt, np.arange(n))
+    dist = linked.astype(np.int64)
+    active = np.flatnonzero(linked)
+    for _ in range(len(active).bit_length() + 1):
+        active = active[linked[ptr[active]]]
+        if not len(active):
+            break
+        step = ptr[active]
+        dist[active] += dist[step]
+        ptr[active] = ptr[step]
+
+    # still short of a tail: on a pure cycle
+    on_path = (linked | has_prev) & ~linked[ptr]
+    on_path &= has_prev | (in_deg > 0)
+    members = np.flatnonzero(on_path)
+    members = members[np.lexsort((-dist[members], ptr[members]))]
+
+    tails = ptr[members]
+    starts = np.flatnonzero(np.r_[True, tails[1:] != tails[:-1]]) if len(members) else members
+    offsets = np.append(starts, len(members)).astype(np.int64)
+    lengths = np.diff(offsets)
+    keep = lengths >= 2
+    count("chains_followed", int(keep.sum()))
+    members = members[np.repeat(keep, lengths)]
+    return members, np.append(0, np.cumsum(lengths[keep])).astype(np.int64)
+
+
+def _cut_extra_feeders(G, nxt, links, succ, totals=None):
+    """ At each merge, unlink every feeder but the largest (then earliest, lowest code) """
+    merge = np.bincount(succ, minlength=len(nxt))[succ] > 1
+    links, succ = links[merge], succ[merge]
+    if not len(links):
+        return
+    # a link's only edge is its first; rank feeders within each merge target
+    edges = G.indptr[links]
+    amount = (totals if totals is not None else G.edge_totals())[edges]
+    latest = G.timestamps[G.edge_ptr[edges + 1] - 1]
+    order = np.lexsort((links, latest, -amount, succ))
+    target = succ[order]
+    extra = np.r_[False, target[1:] == target[:-1]]
+    nxt[links[order[extra]]] = -1
+
+
+def find_shell_chains(G, tx, degrees=None):
+    """
+    -> chain dicts ("members", "retention", "elapsed_hours",
+    "sub_chain_scores"), one per maximal layered chain, ordered by first
+    member. A chain is a stretch of a shell path, at least MIN_CHAIN_LEN
+    accounts long, whose hop totals stay within MIN_AMOUNT_RATIO of each
+    other; it is extended as far as that holds, so overlapping windows of
+    the same path are reported once.
+
+    ``sub_chain_scores`` is the amount ratio (smallest / largest hop) of
+    each MIN_CHAIN_LEN-account window along the chain; ``retention`` is
+    last hop / first hop and ``elapsed_hours`` the time between them.
+    """
+    totals = G.edge_totals()
+    members, offsets = shell_paths(G, tx, degrees, totals)
+
+    # flat hop arrays: hop i leaves members[i] (a link, so its only edge);
+    # each path's hops start at offsets[p] - p
+    is_hop = np.ones(len(members), dtype=bool)
+    is_hop[offsets[1:] - 1] = False
+    edges = G.indptr[members[is_hop]]
+    hops = totals[edges]
+    times = G.edge_latest()[edges]
+    hop_offsets = offsets - np.arange(len(offsets))
+
+    window = MIN_CHAIN_LEN - 1
+    first, last = _layered_segments(hops, hop_offsets, window)
+    path = np.searchsorted(hop_offsets, first, side="right") - 1
+    node = first + path
+    order = np.argsort(members[node], kind="stable")
+    first, last, node = first[order], last[order], node[order]
+
+    # per-chain stats straight off the flat hop arrays
+    lo_hop, hi_hop = _window_extremes(hops, window)
+    scores = np.round(lo_hop / np.maximum(hi_hop, 1e-12), 3).tolist()
+    start_hop = hops[first]
+    retention = np.round(np.where(start_hop > 0, hops[last - 1] / np.maximum(start_hop, 1e-12), 0.0), 4)
+    elapsed = np.round((times[last - 1] - times[first]) / NS_PER_HOUR, 2)
+
+    member_list = members.tolist()
+    # hundreds of thousands of small dicts and lists: keep the cyclic GC out
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return [
+            {
+                "members": member_list[n:n + (b - a) + 1],
+                "retention": r,
+                "elapsed_hours": e,
+                "sub_chain_scores": scores[a:b - window + 1],
+            }
+            for a, b, n, r, e in zip(
+                first.tolist(), last.tolist(), node.tolist(), retention.tolist(), elapsed.tolist()
+            )
+        ]
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+
+def _layered_segments(hops, hop_offsets, min_hops):
+    """
+    -> (first, last) flat hop ranges of every maximal layered stretch with
+    at least ``min_hops`` hops. Paths are first cut between neighbouring
+    hops that already break MIN_AMOUNT_RATIO (no window can span them);
+    segments that then hold their amounts throughout are taken whole, and
+    only the rest need the two-pointer sweep.
+    """
+    ratio_ok = np.minimum(hops[1:], hops[:-1]) >= MIN_AMOUNT_RATIO * np.maximum(hops[1:], hops[:-1])
+    cut = np.zeros(len(hops) + 1, dtype=bool)
+    cut[hop_offsets] = True
+    cut[1:-1] |= ~ratio_ok
+    bounds = np.flatnonzero(cut)
+    if len(bounds) < 2:
+        return bounds[:0], bounds[:0]
+
+    # segments tile ``hops``, so one reduceat gives each one's extremes
+    first, last = bounds[:-1], bounds[1:]
+    low = np.minimum.reduceat(hops, first)
+    high = np.maximum.reduceat(hops, first)
+    long_enough = last - first >= min_hops
+    first, last = first[long_enough], last[long_enough]
+    steady = (low >= MIN_AMOUNT_RATIO * high)[long_enough]
+
+    spans = [(first[steady], last[steady]), _layered_spans(hops, first[~steady], last[~steady], min_hops)]
+    return np.concatenate([f for f, _ in spans]), np.concatenate([l for _, l in spans])
+
+
+def _window_extremes(hops, window):
+    """
+    Min and max of every ``window`` consecutive hops (by starting hop);
+    windows running past their path's end are left as junk and never read.
+    """
+    if len(hops) < window:
+        return hops.copy(), hops.copy()
+    views = np.lib.stride_tricks.sliding_window_view(hops, window)
+    pad = np.zeros(window - 1, dtype=hops.dtype)
+    return np.r_[views.min(axis=1), pad], np.r_[views.max(axis=1), pad]
+
+
+def _layered_spans(hops, first, last, min_hops):
+    """
+    Maximal [lo, hi) hop ranges inside the given segments, at least
+    ``min_hops`` long, whose smallest hop is at least MIN_AMOUNT_RATIO of
+    the largest. The farthest end from each start is binary-searched for
+    every start at once over sparse tables of range min / max; a start
+    begins a maximal range when its farthest end beats its left neighbour's.
+    """
+    if not len(first):
+        return first, last
+    lengths = last - first
+    starts = np.repeat(first, lengths) + _ranks(lengths)
+    limit = np.repeat(last, lengths) - starts
+
+    lows, highs = [hops], [hops]
+    while 2 ** len(lows) <= lengths.max():
+        half = 2 ** (len(lows) - 1)
+        low, high = lows[-1], highs[-1]
+        lows.append(np.minimum(low[:-half], low[half:]))
+        highs.append(np.maximum(high[:-half], high[half:]))
+
+    # reach: the longest steady range from each start (one hop always is)
+    reach = np.ones(len(starts), dtype=np.int64)
+    for level in range(len(lows) - 1, -1, -1):
+        size = reach + 2 ** level
+        ok = size <= limit
+        i, n = starts[ok], size[ok]
+        top = np.log2(n).astype(np.int64)
+        low = np.empty(len(i))
+        high = np.empty(len(i))
+        for k in np.unique(top).tolist():
+            at = top == k
+            j, m = i[at], n[at]
+            low[at] = np.minimum(lows[k][j], lows[k][j + m - 2 ** k])
+            high[at] = np.maximum(highs[k][j], highs[k][j + m - 2 ** k])
+        grow = np.flatnonzero(ok)[low >= MIN_AMOUNT_RATIO * high]
+        reach[grow] = size[grow]
+
+    end = starts + reach
+    new_end = np.ones(len(starts), dtype=bool)
+    new_end[1:] = end[1:] > end[:-1]
+    new_end[np.cumsum(lengths) - lengths] = True
+    maximal = new_end & (reach >= min_hops)
+    return starts[maximal], end[maximal]
+
+
+def _ranks(lengths):
+    """ 0..length-1 for each of ``lengths``, concatenated """
+    return np.arange(int(lengths.sum())) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+
+
+# -----------------------------
+# Short shell chains
+# -----------------------------
+@register_detector("short_shell", needs=("degrees",), default=False)
+def short_shell_plugin(ctx):
+    """
+    Any account -> shell -> shell, where a shell deals with 1 to
+    SHORT_CHAIN_MAX_COUNTERPARTIES distinct counterparties. Broader (and
+    noisier) than the layered chains above.
+    """
+    G = ctx.tg
+    out_deg, in_deg = ctx.index("degrees")
+    partners = out_deg + in_deg
+    shell = (partners >= 1) & (partners <= SHORT_CHAIN_MAX_COUNTERPARTIES)
+
+    hops = np.flatnonzero(shell[G.edge_src] & shell[G.indices])
+    rings = []
+    for mid, end in zip(G.edge_src[hops].tolist(), G.indices[hops].tolist()):
+        for start in G.in_neighbors(mid).tolist():
+            if start in (mid, end):
+                continue
+            rings.append({
+                "ring_id": f"RING_T_{len(rings) + 1:03d}",
+                "member_accounts": [start, mid, end],
+                "pattern_type": "short_shell_chain",
+                "risk_score": SHORT_CHAIN_RISK
+            })
+    count("chains_followed", len(hops))
+    return rings
@@ -1,112 +1,229 @@
-from collections import defaultdict
-import pandas as pd
-from datetime import timedelta
-
-WINDOW = timedelta(hours=72)
+import numpy as np
+
+from app.detectors.registry import register_detector
+from app.instrumentation import count
+from app.transaction_graph import (
+    NS_PER_HOUR,
+    TransactionGraph,
+    by_account_id,
+    factorize_accounts,
+    to_epoch_ns,
+)
+
+WINDOW_HOURS = 72
 MIN_UNIQUE_FAN = 8          # lowered slightly, but still meaningful
 MIN_TX_PER_HUB = 12
 HUB_LIFESPAN_DAYS_THRESH = 45
+OUT_LAG_HOURS = 6           # fan-out may start slightly before fan-in ends
 
-def detect_smurf_rings(df: pd.DataFrame):
-    if len(df) == 0:
-        return []
+NS_PER_DAY = 24 * NS_PER_HOUR
 
-    df = df.sort_values("timestamp").copy()
-    df["ts"] = df["timestamp"]
 
-    senders = df["sender_id"].value_counts()
-    receivers = df["receiver_id"].value_counts()
+def windowed_distinct(group, ts, key, window, times=None, rank=None):
+    """
+    Sliding-window distinct counts for many groups at once.
 
-    potential_hubs = set(
-        senders[senders >= MIN_TX_PER_HUB].index
-    ) | set(
-        receivers[receivers >= MIN_TX_PER_HUB].index
-    )
+    Rows must be sorted by (group, ts). For every row i the window is
+    [L(i), i] with L(i) the first row of the group with ts >= ts[i] - window
+    (the left pointer of the classic two-pointer loop). Returns
+    (uniq, left): distinct ``key`` values in each row's window and L(i).
 
-    if not potential_hubs:
-        return []
+    Last-occurrence trick: row j is the latest occurrence of its key for
+    right ends i in [j, next_same_key(j) - 1], and is inside the window for
+    i <= R(j) (last row with ts <= ts[j] + window). So it adds +1 to a
+    contiguous range of i, and all counts fall out of one difference array.
 
-    tx_by_account = defaultdict(list)
-    for _, row in df.iterrows():
-        tx_by_account[row["sender_id"]].append(row)
-        tx_by_account[row["receiver_id"]].append(row)
+    ``times`` / ``rank`` reuse an AccountIndex's dense time ranks.
+    """
+    n = len(ts)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
 
-    rings = []
-    ring_counter = 1
+    # dense time ranks make (group, time) searchable as one int64 key
+    if times is None:
+        times = np.unique(ts)
+        rank = np.searchsorted(times, ts)
+    uniq_ts = times
+    stride = len(uniq_ts) + 1
+    composite = group * stride + rank
 
-    for hub in potential_hubs:
-        incoming = [r for r in tx_by_account[hub] if r["receiver_id"] == hub]
-        outgoing = [r for r in tx_by_account[hub] if r["sender_id"] == hub]
+    lo_rank = np.searchsorted(uniq_ts, ts - window, side="left")
+    left = np.searchsorted(composite, group * stride + lo_rank, side="left")
 
-        if len(incoming) < MIN_UNIQUE_FAN or len(outgoing) < MIN_UNIQUE_FAN:
-            continue
+    hi_rank = np.searchsorted(uniq_ts, ts + window, side="right")
+    right = np.searchsorted(composite, group * stride + hi_rank, side="left") - 1
 
-        inc_df = pd.DataFrame(incoming).sort_values("ts")
-        out_df = pd.DataFrame(outgoing).sort_values("ts")
+    # next row of the same group with the same key (n = none)
+    pos = np.arange(n)
+    by_key = np.lexsort((pos, key, group))
+    nxt = np.full(n, n, dtype=np.int64)
+    same = (group[by_key][1:] == group[by_key][:-1]) & (key[by_key][1:] == key[by_key][:-1])
+    nxt[by_key[:-1][same]] = by_key[1:][same]
 
-        # sliding window unique senders → receivers
-        def max_unique_in_window(dff, key_col):
-            if len(dff) < MIN_UNIQUE_FAN:
-                return 0, (0,0)
-            dff = dff.reset_index(drop=True)
-            left = 0
-            cnt = defaultdict(int)
-            uniq = 0
-            max_u = 0
-            best = (0,0)
+    end = np.minimum(nxt - 1, right)
+    diff = np.bincount(pos, minlength=n + 1) - np.bincount(end + 1, minlength=n + 1)
+    uniq = np.cumsum(diff[:n])
 
-            for right in range(len(dff)):
-                k = dff.at[right, key_col]
-                cnt[k] += 1
-                if cnt[k] == 1:
-                    uniq += 1
+    return uniq, left
 
-                while dff.at[right, "ts"] - dff.at[left, "ts"] > WINDOW and left <= right:
-                    kl = dff.at[left, key_col]
-                    cnt[kl] -= 1
-                    if cnt[kl] == 0:
-                        uniq -= 1
-                    left += 1
 
-                if uniq > max_u:
-                    max_u = uniq
-                    best = (left, right)
+def best_windows(group, uniq, left):
+    """
+    Per group: max distinct count and the first window reaching it.
+    Returns (groups, max_uniq, best_left, best_right) over present groups.
+    """
+    starts = np.flatnonzero(np.r_[True, group[1:] != group[:-1]])
+    best = np.maximum.reduceat(uniq, starts)
+    seg = np.repeat(np.arange(len(starts)), np.diff(np.r_[starts, len(group)]))
 
-            return max_u, best
+    hit = uniq == best[seg]
+    hit_rows = np.flatnonzero(hit)
+    _, first = np.unique(seg[hit_rows], return_index=True)
+    best_right = hit_rows[first]
 
-        uniq_in, (l_in, r_in) = max_unique_in_window(inc_df, "sender_id")
-        if uniq_in < MIN_UNIQUE_FAN:
-            continue
+    return group[starts], best, left[best_right], best_right
 
-        end_ts = inc_df.iloc[r_in]["ts"]
 
-        out_after = out_df[out_df["ts"] >= end_ts - timedelta(hours=6)]  # allow small lag
-        if len(out_after) < MIN_UNIQUE_FAN:
-            continue
+def detect_smurf_rings(data):
+    """ ``data`` is the transactions DataFrame or a TransactionGraph """
+    if isinstance(data, TransactionGraph):
+        senders, receivers, _, ts = data.transfer_arrays()
+        return find_smurf_rings(data.accounts, senders, receivers, ts)
 
-        uniq_out, (l_out, r_out) = max_unique_in_window(out_after, "receiver_id")
-        if uniq_out < MIN_UNIQUE_FAN:
-            continue
+    if len(data) == 0:
+        return []
+    accounts, senders, receivers = factorize_accounts(
+        data["sender_id"].to_numpy(), data["receiver_id"].to_numpy()
+    )
+    return find_smurf_rings(accounts, senders, receivers, to_epoch_ns(data["timestamp"]))
 
-        # simple lifespan filter
-        lifespan = (df["ts"].max() - df["ts"].min()).days if len(df) > 0 else 0
-        if lifespan > HUB_LIFESPAN_DAYS_THRESH * 1.5:  # long-lived → probably normal
-            continue
 
-        # collect members
-        in_senders = set(inc_df.iloc[l_in:r_in+1]["sender_id"])
-        out_receivers = set(out_after.iloc[l_out:r_out+1]["receiver_id"])
+@register_detector("smurf", needs=("accounts",))
+def smurf_plugin(ctx):
+    index = ctx.index("accounts")
+    return find_smurf_rings(
+        ctx.tg.accounts, index.senders, index.receivers, index.timestamps, index
+    )
 
-        members = {hub} | in_senders | out_receivers
 
-        score = min(100, 55 + (uniq_in + uniq_out) * 1.1)
+def find_smurf_rings(accounts, senders, receivers, ts, index=None):
+    candidates = smurf_hubs(accounts, senders, receivers, ts, index=index)
 
+    # deterministic ring ids: hubs in account-id order
+    candidates.sort(key=lambda c: accounts[c[0]])
+    rings = []
+    for ring_counter, (_, members, score) in enumerate(candidates, start=1):
         rings.append({
             "ring_id": f"RING_S_{ring_counter:03d}",
-            "member_accounts": sorted(members),
+            "member_accounts": members,
             "pattern_type": "fan_in_fan_out",
             "risk_score": round(score, 2)
         })
-        ring_counter += 1
 
-    return rings
\ No newline at end of file
+    return rings
+
+
+def dataset_too_long(ts):
+    """ simple lifespan filter: a long-lived dataset is probably normal """
+    if len(ts) == 0:
+        return False
+    lifespan_days = (ts.max() - ts.min()) // NS_PER_DAY
+    return lifespan_days > HUB_LIFESPAN_DAYS_THRESH * 1.5
+
+
+def smurf_hubs(accounts, senders, receivers, ts, check_lifespan=True, index=None):
+    """
+    -> [(hub code, member codes by account id, score)]. A hub's result only depends
+    on its own incoming and outgoing transfers, so passing just the
+    transfers around some hubs gives their exact results (the incremental
+    engine does this, applying the lifespan filter to the whole dataset).
+
+    ``index`` is the AccountIndex over these transfers shared by the
+    detector registry: hub rows then come from range queries instead of a
+    scan and sort of every transfer.
+    """
+    if len(ts) == 0:
+        return []
+
+    n_acc = len(accounts)
+    window = WINDOW_HOURS * NS_PER_HOUR
+
+    if check_lifespan and dataset_too_long(ts):
+        return []
+
+    out_count = np.bincount(senders, minlength=n_acc)
+    in_count = np.bincount(receivers, minlength=n_acc)
+
+    is_hub = (out_count >= MIN_TX_PER_HUB) | (in_count >= MIN_TX_PER_HUB)
+    is_hub &= (in_count >= MIN_UNIQUE_FAN) & (out_count >= MIN_UNIQUE_FAN)
+    count("hubs_scanned", is_hub.sum())
+    if not is_hub.any():
+        return []
+
+    # -----------------------------
+    # Fan-in: distinct senders into each hub
+    # -----------------------------
+    if index is None:
+        inc = np.flatnonzero(is_hub[receivers])
+        inc = inc[np.lexsort((inc, ts[inc], receivers[inc]))]
+        times = rank = None
+    else:
+        inc = index.incoming(np.flatnonzero(is_hub))
+        times, rank = index.times, index.ranks
+    inc_hub = receivers[inc].astype(np.int64)
+    uniq, left = windowed_distinct(
+        inc_hub, ts[inc], senders[inc], window, times, None if rank is None else rank[inc]
+    )
+    hubs, uniq_in, l_in, r_in = best_windows(inc_hub, uniq, left)
+
+    ok = uniq_in >= MIN_UNIQUE_FAN
+    hubs, uniq_in, l_in, r_in = hubs[ok], uniq_in[ok], l_in[ok], r_in[ok]
+    if len(hubs) == 0:
+        return []
+
+    # -----------------------------
+    # Fan-out after the fan-in peak (small lag allowed)
+    # -----------------------------
+    cutoff = np.full(n_acc, np.iinfo(np.int64).max)
+    cutoff[hubs] = ts[inc[r_in]] - OUT_LAG_HOURS * NS_PER_HOUR
+
+    if index is None:
+        out = np.flatnonzero(ts >= cutoff[senders])
+        out = out[np.lexsort((out, ts[out], senders[out]))]
+    else:
+        out = index.outgoing(hubs, cutoff[hubs])
+    out_hub = senders[out].astype(np.int64)
+
+    out_len = np.bincount(out_hub, minlength=n_acc)
+    keep = out_len[out_hub] >= MIN_UNIQUE_FAN
+    out, out_hub = out[keep], out_hub[keep]
+    if len(out) == 0:
+        return []
+
+    uniq, left = windowed_distinct(
+        out_hub, ts[out], receivers[out], window, times, None if rank is None else rank[out]
+    )
+    out_hubs, uniq_out, l_out, r_out = best_windows(out_hub, uniq, left)
+
+    ok = uniq_out >= MIN_UNIQUE_FAN
+    out_hubs, uniq_out, l_out, r_out = out_hubs[ok], uniq_out[ok], l_out[ok], r_out[ok]
+
+    # -----------------------------
+    # Materialize only the rings
+    # -----------------------------
+    fan_in = {
+        h: (u, l, r)
+        for h, u, l, r in zip(hubs.tolist(), uniq_in.tolist(), l_in.tolist(), r_in.tolist())
+    }
+
+    candidates = []
+    for hub, u_out, l, r in zip(out_hubs.tolist(), uniq_out.tolist(), l_out.tolist(), r_out.tolist()):
+        u_in, li, ri = fan_in[hub]
+        in_senders = senders[inc[li:ri + 1]]
+        out_receivers = receivers[out[l:r + 1]]
+
+        members = set(np.concatenate(([hub], in_senders, out_receivers)).tolist())
+        score = min(100, 55 + (u_in + u_out) * 1.1)
+        candidates.append((hub, by_account_id(accounts, members), score))
+
+    return candidates
@@ -0,0 +1,278 @@
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from app.transaction_graph import NS_PER_HOUR
+
+
+def scc_subgraph(G, labels=None, nodes=None):
+    """
+    Restrict G to edges inside a non-trivial strongly connected component.
+    Every cycle lives inside one SCC, so nothing else can close a loop.
+    ``nodes`` (boolean mask) further keeps only edges between those nodes.
+
+    Returns plain-list CSR (indptr, dst, edge_ptr, amounts, timestamps) over
+    the kept edges; node codes are unchanged.
+    """
+    if labels is None:
+        _, labels = G.strong_components()
+
+    src = G.edge_src
+    dst = G.indices
+    keep = (labels[src] == labels[dst]) & (src != dst)
+    if nodes is not None:
+        keep &= nodes[src] & nodes[dst]
+
+    counts = np.diff(G.edge_ptr)
+    keep_transfer = np.repeat(keep, counts)
+
+    n = G.number_of_nodes()
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src[keep], minlength=n), out=indptr[1:])
+    edge_ptr = np.zeros(int(keep.sum()) + 1, dtype=np.int64)
+    np.cumsum(counts[keep], out=edge_ptr[1:])
+
+    return (
+        indptr.tolist(),
+        dst[keep].tolist(),
+        edge_ptr.tolist(),
+        G.amounts[keep_transfer].tolist(),
+        G.timestamps[keep_transfer].tolist(),
+    )
+
+
+def canonical_cycle(nodes):
+    """ Rotation starting at the smallest node: one key per node cycle """
+    i = nodes.index(min(nodes))
+    return tuple(nodes[i:] + nodes[:i])
+
+
+def enumerate_temporal_cycles(G, min_len=3, max_len=5, window_hours=72,
+                              roots=None, labels=None, sub=None):
+    """
+    Bounded-length temporal cycle enumeration (2SCENT-style).
+
+    A temporal cycle is a closed walk v0 -> v1 -> ... -> v0 over distinct
+    accounts whose transfers are non-decreasing in time and all fall within
+    ``window_hours`` of the first one. Each transfer out of a root is tried
+    as the first hop; every later hop takes the earliest transfer that is
+    not before the previous one (earliest arrival keeps the most options
+    open, so this finds a cycle whenever one exists).
+
+    Yields ``(nodes, amounts, timestamps)`` once per canonical node cycle,
+    nodes in temporal order starting at the sender of the first transfer
+    (which is always the root the cycle was found from).
+
+    ``roots`` limits which accounts seed walks; ``sub`` reuses a prebuilt
+    ``scc_subgraph``.
+    """
+    window = int(window_hours * NS_PER_HOUR)
+    if sub is None:
+        sub = scc_subgraph(G, labels)
+    indptr, dst, edge_ptr, amounts, ts = sub
+
+    on_path = bytearray(G.number_of_nodes())
+    closes = bytearray(G.number_of_nodes())  # in-neighbours of the current root
+    seen = set()
+
+    path = []
+    hop_amounts = []
+    hop_times = []
+
+    def first_transfer(e, t, deadline):
+        hi = edge_ptr[e + 1]
+        k = bisect_left(ts, t, edge_ptr[e], hi)
+        if k == hi or ts[k] > deadline:
+            return -1
+        return k
+
+    def close(k):
+        key = canonical_cycle(path)
+        if key in seen:
+            return None
+        seen.add(key)
+        return tuple(path), hop_amounts + [amounts[k]], hop_times + [ts[k]]
+
+    def extend(node, t, deadline):
+        root = path[0]
+        lo, hi = indptr[node], indptr[node + 1]
+
+        # full length: only the hop back to the root can still matter
+        if len(path) >= max_len:
+            e = bisect_left(dst, root, lo, hi)
+            if e < hi and dst[e] == root:
+                k = first_transfer(e, t, deadline)
+                if k >= 0:
+                    found = close(k)
+                    if found:
+                        yield found
+            return
+
+        for e in range(lo, hi):
+            v = dst[e]
+            if v != root and (on_path[v] or (len(path) == max_len - 1 and not closes[v])):
+                continue
+
+            k = bisect_left(ts, t, edge_ptr[e], edge_ptr[e + 1])
+            if k == edge_ptr[e + 1] or ts[k] > deadline:
+                continue
+
+            if v == root:
+                if len(path) >= min_len:
+                    found = close(k)
+                    if found:
+                        yield found
+                continue
+
+            path.append(v)
+            hop_amounts.append(amounts[k])
+            hop_times.append(ts[k])
+            on_path[v] = 1
+            yield from extend(v, ts[k], deadline)
+            on_path[v] = 0
+            hop_times.pop()
+            hop_amounts.pop()
+            path.pop()
+
+    if roots is None:
+        roots = range(G.number_of_nodes())
+
+    for root in roots:
+        if indptr[root] == indptr[root + 1]:
+            continue
+        path.append(root)
+        on_path[root] = 1
+        preds = G.in_neighbors(root).tolist()
+        for p in preds:
+            closes[p] = 1
+
+        for e in range(indptr[root], indptr[root + 1]):
+            v = dst[e]
+            path.append(v)
+            on_path[v] = 1
+            for k in range(edge_ptr[e], edge_ptr[e + 1]):
+                hop_amounts.append(amounts[k])
+                hop_times.append(ts[k])
+                yield from extend(v, ts[k], ts[k] + window)
+                hop_times.pop()
+                hop_amounts.pop()
+            on_path[v] = 0
+            path.pop()
+
+        for p in preds:
+            closes[p] = 0
+        on_path[root] = 0
+        path.pop()
+
+
+# -----------------------------
+# SCC-partitioned parallel mode
+# -----------------------------
+_worker_state = None
+
+
+def _init_cycle_worker(G, labels, params):
+    global _worker_state
+    _worker_state = (G, scc_subgraph(G, labels), params)
+
+
+def _run_cycle_task(roots):
+    G, sub, params = _worker_state
+    return list(enumerate_temporal_cycles(G, *params, roots=roots, sub=sub))
+
+
+def plan_cycle_tasks(G, labels, n_tasks):
+    """
+    Size-aware split of the roots into about ``n_tasks`` tasks.
+
+    Work is estimated as the number of intra-SCC transfers leaving a root.
+    Components heavier than one task's share are cut into consecutive root
+    ranges (so a giant SCC is spread over many workers); the rest are packed
+    together. Tasks come back heaviest first for LPT-style scheduling.
+    """
+    src = G.edge_src
+    dst = G.indices
+    keep = (labels[src] == labels[dst]) & (src != dst)
+    counts = np.diff(G.edge_ptr)
+    weight = np.bincount(src[keep], weights=counts[keep], minlength=G.number_of_nodes())
+
+    roots = np.flatnonzero(weight > 0)
+    if len(roots) == 0:
+        return []
+
+    comp_of_root = labels[roots]
+    comp_weight = np.bincount(comp_of_root, weights=weight[roots])
+    target = max(1.0, comp_weight.sum() / n_tasks)
+
+    by_comp = np.argsort(comp_of_root, kind="stable")
+    bounds = np.flatnonzero(np.diff(comp_of_root[by_comp])) + 1
+    groups = np.split(roots[by_comp], bounds)
+    groups.sort(key=lambda g: comp_weight[labels[g[0]]], reverse=True)
+
+    tasks = []
+    batch, batch_w = [], 0.0
+    for group in groups:
+        if comp_weight[labels[group[0]]] > target:
+            chunk, chunk_w = [], 0.0
+            for r in group.tolist():
+                chunk.append(r)
+                chunk_w += weight[r]
+                if chunk_w >= target:
+                    tasks.append((chunk_w, chunk))
+                    chunk, chunk_w = [], 0.0
+            if chunk:
+                tasks.append((chunk_w, chunk))
+            continue
+
+        batch.extend(group.tolist())
+        batch_w += comp_weight[labels[group[0]]]
+        if batch_w >= target:
+            tasks.append((batch_w, sorted(batch)))
+            batch, batch_w = [], 0.0
+    if batch:
+        tasks.append((batch_w, sorted(batch)))
+
+    tasks.sort(key=lambda t: t[0], reverse=True)
+    return [roots for _, roots in tasks]
+
+
+def parallel_temporal_cycles(G, min_len=3, max_len=5, window_hours=72,
+                             workers=2, tasks_per_worker=4, labels=None):
+    """
+    Same output, in the same order, as enumerate_temporal_cycles, computed
+    over a process pool.
+
+    Workers enumerate disjoint root sets; results are merged back into root
+    order (within a root, walk order is unchanged) and cycles that another
+    root already produced are dropped, which is exactly what the serial
+    ``seen`` set does.
+    """
+    if labels is None:
+        _, labels = G.strong_components()
+    tasks = plan_cycle_tasks(G, labels, workers * tasks_per_worker)
+    if len(tasks) < 2:
+        yield from enumerate_temporal_cycles(
+            G, min_len, max_len, window_hours, labels=labels
+        )
+        return
+
+    params = (min_len, max_len, window_hours)
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_cycle_worker,
+        initargs=(G, labels, params),
+    ) as pool:
+        futures = [pool.submit(_run_cycle_task, roots) for roots in tasks]
+        found = [c for f in futures for c in f.result()]
+
+    # stable sort keeps each root's walk order
+    found.sort(key=lambda c: c[0][0])
+
+    seen = set()
+    for cycle in found:
+        key = canonical_cycle(list(cycle[0]))
+        if key in seen:
+            continue
+        seen.add(key)
+        yield cycle
@@ -1,28 +1,80 @@
+import gc
+
 import networkx as nx
+import numpy as np
 import pandas as pd
 
+from app.node_stats import NodeStats
+from app.transaction_graph import TransactionGraph, factorize_accounts, to_epoch_ns
+
+
 def build_graph(df: pd.DataFrame):
+    """ Columnar graph build: factorized ids, bincount stats, bulk edge load """
     df["timestamp"] = pd.to_datetime(df["timestamp"])
     G = nx.DiGraph()
-    node_stats = {}
+    node_stats = NodeStats()
 
-    for _, row in df.iterrows():
-        sender = row["sender_id"]
-        receiver = row["receiver_id"]
+    n_rows = len(df)
+    if n_rows == 0:
+        return G, node_stats
 
-        G.add_edge(sender, receiver, amount=row["amount"], timestamp=row["timestamp"])
+    senders = df["sender_id"].to_numpy()
+    receivers = df["receiver_id"].to_numpy()
+    amounts = df["amount"].to_numpy()
 
-        for node in [sender, receiver]:
-            if node not in node_stats:
-                node_stats[node] = {
-                    "transactions": 0,
-                    "patterns": set(),
-                    "ring_ids": set(),
-                    "amounts": []
-                }
+    accounts, send_codes, recv_codes = factorize_accounts(senders, receivers)
+    n_nodes = len(accounts)
+    node_stats = compute_node_stats(accounts, send_codes, recv_codes, amounts)
 
-        node_stats[sender]["transactions"] += 1
-        node_stats[receiver]["transactions"] += 1
-        node_stats[sender]["amounts"].append(row["amount"])
+    # DiGraph keeps one edge per (sender, receiver): insertion order of the
+    # first transfer, attributes of the last one
+    pair = send_codes.astype(np.int64) * n_nodes + recv_codes
+    _, first_idx = np.unique(pair, return_index=True)
+    _, last_rev = np.unique(pair[::-1], return_index=True)
+    last_idx = n_rows - 1 - last_rev
+    by_first = np.argsort(first_idx, kind="stable")
+    src_idx = first_idx[by_first]
+    attr_idx = last_idx[by_first]
+
+    timestamps = df["timestamp"].take(attr_idx).tolist()
+
+    # millions of small attr dicts: keep the cyclic GC out of the bulk load
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        G.add_nodes_from(accounts.tolist())
+        G.add_edges_from(
+            (u, v, {"amount": a, "timestamp": t})
+            for u, v, a, t in zip(
+                senders[src_idx].tolist(),
+                receivers[src_idx].tolist(),
+                amounts[attr_idx].tolist(),
+                timestamps
+            )
+        )
+    finally:
+        if gc_was_enabled:
+            gc.enable()
 
     return G, node_stats
+
+
+def build_transaction_graph(df: pd.DataFrame):
+    """ Same contract as build_graph, but every transfer is kept in CSR form """
+    df["timestamp"] = pd.to_datetime(df["timestamp"])
+    senders = df["sender_id"].to_numpy()
+    receivers = df["receiver_id"].to_numpy()
+    amounts = df["amount"].to_numpy()
+
+    accounts, send_codes, recv_codes = factorize_accounts(senders, receivers)
+    node_stats = compute_node_stats(accounts, send_codes, recv_codes, amounts)
+
+    tg = TransactionGraph.from_codes(
+        accounts, send_codes, recv_codes, amounts, to_epoch_ns(df["timestamp"])
+    )
+    return tg, node_stats
+
+
+def compute_node_stats(accounts, send_codes, recv_codes, amounts):
+    """ Per-account stats indexed by account code (ids are decoded in format_output) """
+    return NodeStats.from_codes(len(accounts), send_codes, recv_codes, amounts)
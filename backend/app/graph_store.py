@@ -0,0 +1,125 @@
+import os
+import threading
+import uuid
+from collections import OrderedDict
+
+from app.snapshot import SNAPSHOT_DIR, SnapshotError, open_snapshot, snapshot_path
+
+GRAPH_STORE_MB = int(os.environ.get("RIFT_GRAPH_STORE_MB", "1024"))
+MAX_STORED_GRAPHS = int(os.environ.get("RIFT_MAX_STORED_GRAPHS", "20"))
+
+
+class GraphStore:
+    """
+    Recent TransactionGraphs by analysis id, so the full graph can be paged
+    or exported after the /analyze response went out. Least recently used
+    graphs are dropped past ``max_graphs`` or ``max_mb`` of CSR arrays
+    (query indexes built over a graph count towards it and go with it).
+    The analysis' rings and cases are kept alongside, by id.
+
+    With a ``snapshot_dir`` (RIFT_SNAPSHOT_DIR), an id not held here is
+    opened from its snapshot, if one was written (see app.snapshot): so any
+    worker, or the service after a restart, can serve any analysis. Mapped
+    snapshots don't count towards ``max_mb``; their pages are the page
+    cache's, shared between processes.
+    """
+
+    def __init__(self, max_graphs=MAX_STORED_GRAPHS, max_mb=GRAPH_STORE_MB, snapshot_dir=SNAPSHOT_DIR):
+        self.max_graphs = max_graphs
+        self.max_bytes = max_mb * 2**20
+        self.snapshot_dir = snapshot_dir
+        self._lock = threading.Lock()
+        self._graphs = OrderedDict()
+        self._indexes = {}      # analysis id -> {name: index}
+        self._rings = {}        # analysis id -> ring / case id -> dict or None
+        self._mapped = set()    # analysis ids opened from snapshots
+
+    def put(self, tg, analysis_id=None, result=None):
+        """ Stores ``tg`` (and the rings and cases of its ``result``, if given) """
+        analysis_id = analysis_id or uuid.uuid4().hex
+        rings = {}
+        if result is not None:
+            rings.update((r["ring_id"], r) for r in result["fraud_rings"])
+            rings.update((c["case_id"], c) for c in result.get("cases", []))
+        with self._lock:
+            self._graphs[analysis_id] = tg
+            self._rings[analysis_id] = rings.get
+            self._mapped.discard(analysis_id)
+            self._graphs.move_to_end(analysis_id)
+            self._evict()
+        return analysis_id
+
+    def get(self, analysis_id):
+        with self._lock:
+            tg = self._graphs.get(analysis_id)
+            if tg is not None:
+                self._graphs.move_to_end(analysis_id)
+                return tg
+        return self._open(analysis_id)
+
+    def ring(self, analysis_id, ring_id):
+        """ A stored ring or case dict (member ids decoded); None if unknown """
+        if self.get(analysis_id) is None:
+            return None
+        with self._lock:
+            lookup = self._rings.get(analysis_id)
+        return lookup(ring_id) if lookup else None
+
+    def _open(self, analysis_id):
+        """ The graph of ``analysis_id`` from its snapshot (and its indexes and rings); None if none """
+        path = snapshot_path(analysis_id, self.snapshot_dir)
+        if path is None or not os.path.isdir(path):
+            return None
+        try:
+            snapshot = open_snapshot(path)
+        except (OSError, ValueError, KeyError, SnapshotError):
+            return None
+        with self._lock:
+            if analysis_id not in self._graphs:
+                self._graphs[analysis_id] = snapshot.tg
+                self._indexes[analysis_id] = {"queries": snapshot.query_index}
+                self._rings[analysis_id] = snapshot.ring
+                self._mapped.add(analysis_id)
+                self._evict()
+            return self._graphs.get(analysis_id)
+
+    def index(self, analysis_id, name, build):
+        """
+        ``build(tg)`` for a stored graph, built on first use and kept with
+        the graph (e.g. the tracing index); None for an unknown id.
+        """
+        tg = self.get(analysis_id)
+        if tg is None:
+            return None
+        with self._lock:
+            index = self._indexes.get(analysis_id, {}).get(name)
+        if index is not None:
+            return index
+
+        # built outside the lock; a concurrent first use may build it twice
+        index = build(tg)
+        with self._lock:
+            if analysis_id in self._graphs:
+                index = self._indexes.setdefault(analysis_id, {}).setdefault(name, index)
+                self._evict()
+        return index
+
+    def _nbytes(self, analysis_id):
+        indexes = self._indexes.get(analysis_id, {})
+        if analysis_id in self._mapped:
+            # graph and query index are mapped; only indexes built since are ours
+            return sum(index.nbytes() for name, index in indexes.items() if name != "queries")
+        return self._graphs[analysis_id].nbytes + sum(index.nbytes() for index in indexes.values())
+
+    def _evict(self):
+        total = sum(self._nbytes(analysis_id) for analysis_id in self._graphs)
+        # always keep the newest graph, even if it alone is over budget
+        while len(self._graphs) > 1 and (
+            len(self._graphs) > self.max_graphs or total > self.max_bytes
+        ):
+            analysis_id = next(iter(self._graphs))
+            total -= self._nbytes(analysis_id)
+            del self._graphs[analysis_id]
+            self._indexes.pop(analysis_id, None)
+            self._rings.pop(analysis_id, None)
+            self._mapped.discard(analysis_id)
@@ -0,0 +1,430 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from app.case_builder import assign_cases, build_cases
+from app.centrality import PAGERANK_WARM_START, compute_centralities
+from app.detectors.cycle_detector import (
+    MAX_RING_SIZE,
+    MAX_TIME_WINDOW_HOURS,
+    MIN_RING_SIZE,
+    cycle_risk,
+    tag_cycle_members,
+)
+from app.detectors.shell_detector import chain_stats, find_shell_chains
+from app.detectors.smurf_detector import NS_PER_DAY, dataset_too_long, smurf_hubs
+from app.detectors.temporal_cycles import (
+    canonical_cycle,
+    enumerate_temporal_cycles,
+    scc_subgraph,
+)
+from app.instrumentation import count, recording, stage
+from app.ingest import AccountInterner, GraphAccumulator, iter_transaction_chunks
+from app.node_stats import NodeStats
+from app.output_formatter import decode_rings, format_output
+from app.scoring import calculate_suspicion
+from app.transaction_graph import TransactionGraph, by_account_id
+
+WINDOW_DAYS = float(os.environ.get("RIFT_INCREMENTAL_WINDOW_DAYS", "30"))
+COMPACT_DEAD_RATIO = 0.5    # re-intern once half the known accounts left the window
+MAX_STREAMS = int(os.environ.get("RIFT_MAX_STREAMS", "32"))
+STREAM_IDLE_S = float(os.environ.get("RIFT_STREAM_IDLE_S", "3600"))
+
+FIRST_RING_IDS = {"cycle": 1, "fan_in_fan_out": 1, "layered_shell": 2000}
+
+
+class IncrementalAnalyzer:
+    """
+    Rolling-window analysis kept in memory between batches.
+
+    ``apply`` appends a delta batch, expires transfers older than the window
+    (measured back from the newest timestamp) and re-evaluates only what the
+    added and expired transfers can affect; "touched" accounts are their
+    endpoints:
+
+        cycles   roots within MAX_RING_SIZE - 1 hops of a touched account;
+                 cycles through a touched account are replaced
+        smurf    hubs that are touched (a hub only depends on its own
+                 transfers)
+        shells   every maximal chain is relabelled (one vectorized pass, and
+                 a chain can reach arbitrarily far upstream)
+
+    Everything else comes from the previous batch's results. The CSR graph
+    itself is rebuilt from the retained columns each batch (one vectorized
+    sort), and scoring runs over all accounts, PageRank warm-started from
+    the previous batch's scores (RIFT_PAGERANK_WARM_START).
+
+    Ring ids are stable while their accounts stay in the window: the same
+    cycle, hub or chain start keeps its id from batch to batch. Ids of
+    rings with an account that left the window are forgotten.
+
+    Batches are applied one at a time (``lock``), parsing included, since
+    parsing interns into the shared account codes.
+    """
+
+    def __init__(self, window_days=WINDOW_DAYS):
+        self.window = int(window_days * NS_PER_DAY)
+        self.lock = threading.Lock()
+        self.last_used = time.monotonic()
+        self._reset()
+
+    def _reset(self):
+        self.interner = AccountInterner()
+        self.senders = np.zeros(0, dtype=np.int32)
+        self.receivers = np.zeros(0, dtype=np.int32)
+        self.amounts = np.zeros(0, dtype=np.float32)
+        self.timestamps = np.zeros(0, dtype=np.int64)
+        self.tg = None
+        self.node_stats = NodeStats()
+        self.pagerank = None    # (accounts, scores) of the last batch, the next warm start
+
+        self.cycles = {}    # canonical codes -> (order, cycle codes, hop amounts)
+        self.smurfs = {}    # hub code -> (member codes, score)
+        self.shells = {}    # first member code -> chain dict (see find_shell_chains)
+        self.rings = {}     # ring key (account ids) -> ring dict (codes), as last reported
+
+        self._ring_ids = {}
+        self._next_id = dict(FIRST_RING_IDS)
+        self._seq = 0
+        self._smurf_stale = False
+
+    # -----------------------------
+    # Batches
+    # -----------------------------
+    def apply(self, source, return_graph=False):
+        """
+        Add a delta batch (CSV path / file object) and return the analysis;
+        ``return_graph`` returns (result, TransactionGraph) of this batch.
+        """
+        with recording() as rec, self.lock:
+            with stage("parse"):
+                acc = GraphAccumulator(self.interner)
+                for chunk in iter_transaction_chunks(source):
+                    acc.add(chunk)
+                    count("rows", len(chunk))
+                    count("chunks")
+            result = self._apply(*acc.columns())
+            tg = self.tg
+        result["summary"]["stages"] = rec.stages
+        return (result, tg) if return_graph else result
+
+    def apply_columns(self, senders, receivers, amounts, timestamps):
+        """
+        Same as ``apply`` for already-encoded codes from ``self.interner``;
+        the caller must not encode while another batch is applied.
+        """
+        with recording() as rec, self.lock:
+            result = self._apply(senders, receivers, amounts, timestamps)
+        result["summary"]["stages"] = rec.stages
+        return result
+
+    def _apply(self, senders, receivers, amounts, timestamps):
+        start_time = time.time()
+        full = self.tg is None
+
+        self.senders = np.concatenate([self.senders, senders])
+        self.receivers = np.concatenate([self.receivers, receivers])
+        self.amounts = np.concatenate([self.amounts, amounts])
+        self.timestamps = np.concatenate([self.timestamps, timestamps])
+
+        n_acc = len(self.interner.accounts)
+        touched = np.zeros(n_acc, dtype=bool)
+        touched[senders] = True
+        touched[receivers] = True
+
+        # -----------------------------
+        # Window expiry
+        # -----------------------------
+        expired = 0
+        if len(self.timestamps):
+            keep = self.timestamps >= self.timestamps.max() - self.window
+            expired = int(len(keep) - keep.sum())
+            if expired:
+                touched[self.senders[~keep]] = True
+                touched[self.receivers[~keep]] = True
+                self.senders = self.senders[keep]
+                self.receivers = self.receivers[keep]
+                self.amounts = self.amounts[keep]
+                self.timestamps = self.timestamps[keep]
+
+        alive = np.zeros(n_acc, dtype=bool)
+        alive[self.senders] = True
+        alive[self.receivers] = True
+        if expired:
+            self._prune_ring_ids(alive)
+        if not full and n_acc and 1 - alive.sum() / n_acc > COMPACT_DEAD_RATIO:
+            self._compact(alive)
+            full = True
+
+        if full:
+            touched = np.ones(len(self.interner.accounts), dtype=bool)
+
+        with stage("graph"):
+            accounts = np.array(self.interner.accounts, dtype=object)
+            self.tg = TransactionGraph.from_codes(
+                accounts, self.senders, self.receivers, self.amounts, self.timestamps
+            )
+            self._update_node_stats(touched)
+            count("accounts", self.tg.number_of_nodes())
+            count("edges", self.tg.number_of_edges())
+            count("transfers", self.tg.number_of_transfers())
+            count("touched", touched.sum())
+
+        with stage("cycles"):
+            self._update_cycles(touched)
+        with stage("smurf"):
+            self._update_smurfs(touched, full)
+        with stage("shell"):
+            self._update_shells()
+        with stage("rings"):
+            fraud_rings, changes = self._collect_rings(full)
+            count("rings", len(fraud_rings))
+
+        with stage("scoring"):
+            pagerank, betweenness, centrality = compute_centralities(
+                None, fraud_rings, tg=self.tg,
+                pagerank_start=self.pagerank if PAGERANK_WARM_START else None,
+            )
+            self.pagerank = (self.tg.accounts, pagerank)
+            suspicious_accounts = calculate_suspicion(
+                self.tg, self.node_stats, fraud_rings, pagerank=pagerank, betweenness=betweenness
+            )
+            cases = build_cases(self.tg, fraud_rings)
+            assign_cases(suspicious_accounts, cases)
+            count("accounts", self.tg.number_of_nodes())
+            count("flagged", len(suspicious_accounts))
+            count("cases", len(cases))
+
+        with stage("output"):
+            result = format_output(
+                suspicious_accounts,
+                fraud_rings,
+                self.node_stats,
+                round(time.time() - start_time, 2),
+                self.tg,
+                centrality=centrality,
+                cases=cases
+            )
+            count("edges", len(result["graph"]["edges"]))
+        result["summary"]["transfers_in_window"] = int(len(self.timestamps))
+        result["summary"]["transfers_expired"] = expired
+        result["summary"]["accounts_reevaluated"] = int(touched.sum())
+        result["ring_changes"] = {
+            "added": decode_rings(self.tg, changes["added"]),
+            "changed": decode_rings(self.tg, changes["changed"]),
+            "removed": changes["removed"],
+        }
+        return result
+
+    def _compact(self, alive):
+        """ Drop accounts that left the window; codes change, so start over """
+        accounts = self.interner.accounts
+        remap = np.full(len(accounts), -1, dtype=np.int32)
+        remap[alive] = np.arange(int(alive.sum()), dtype=np.int32)
+
+        self.interner.accounts = [a for a, ok in zip(accounts, alive.tolist()) if ok]
+        self.interner.codes = {a: i for i, a in enumerate(self.interner.accounts)}
+        self.senders = remap[self.senders]
+        self.receivers = remap[self.receivers]
+        # reported rings stay comparable (a departed member becomes -1)
+        for ring in self.rings.values():
+            ring["member_accounts"] = remap[ring["member_accounts"]].tolist()
+
+        self.node_stats = NodeStats()
+        self.cycles = {}
+        self.smurfs = {}
+        self.shells = {}
+
+    # -----------------------------
+    # Per-account state
+    # -----------------------------
+    def _update_node_stats(self, touched):
+        self.node_stats.refresh(self.tg, np.flatnonzero(touched))
+
+    # -----------------------------
+    # Detectors
+    # -----------------------------
+    def _update_cycles(self, touched):
+        tg = self.tg
+        hit = touched.tolist()
+        self.cycles = {
+            key: c for key, c in self.cycles.items() if not any(hit[v] for v in key)
+        }
+
+        # every member of a cycle through a touched account is reachable from
+        # it and reaches it within MAX_RING_SIZE - 1 hops; enumerating from
+        # those roots in the same order finds the same temporal instance a
+        # full run would
+        hood = (
+            tg.reach(touched, MAX_RING_SIZE - 1, "out")
+            & tg.reach(touched, MAX_RING_SIZE - 1, "in")
+        )
+        _, labels = tg.strong_components()
+        sub = scc_subgraph(tg, labels, nodes=hood)
+
+        found = enumerate_temporal_cycles(
+            tg, MIN_RING_SIZE, MAX_RING_SIZE, MAX_TIME_WINDOW_HOURS,
+            roots=np.flatnonzero(hood).tolist(), sub=sub
+        )
+        candidates = 0
+        for cycle, hop_amounts, _ in found:
+            candidates += 1
+            if not any(hit[v] for v in cycle):
+                continue
+            self._seq += 1
+            key = canonical_cycle(list(cycle))
+            self.cycles[key] = ((cycle[0], self._seq), cycle, hop_amounts)
+        count("candidate_cycles", candidates)
+
+    def _update_smurfs(self, touched, full):
+        if dataset_too_long(self.timestamps):
+            self.smurfs = {}
+            self._smurf_stale = True
+            return
+        if self._smurf_stale or full:
+            touched = np.ones(len(touched), dtype=bool)
+            self._smurf_stale = False
+
+        # every transfer into or out of a touched hub, nothing else
+        rows = touched[self.senders] | touched[self.receivers]
+        hubs = smurf_hubs(
+            self.tg.accounts,
+            self.senders[rows],
+            self.receivers[rows],
+            self.timestamps[rows],
+            check_lifespan=False,
+        )
+        self.smurfs = {h: r for h, r in self.smurfs.items() if not touched[h]}
+        for hub, members, score in hubs:
+            if touched[hub]:
+                self.smurfs[hub] = (members, score)
+
+    def _update_shells(self):
+        tg = self.tg
+        tx = tg.out_transfers + tg.in_transfers
+        self.shells = {chain["members"][0]: chain for chain in find_shell_chains(tg, tx)}
+
+    # -----------------------------
+    # Rings
+    # -----------------------------
+    def _collect_rings(self, full=False):
+        """ -> (fraud_rings, {"added", "changed", "removed"}) and re-tags node_stats """
+        accounts = self.tg.accounts
+        median_amount = float(np.median(self.amounts)) if len(self.amounts) else 1.0
+
+        current = {}
+        for key, (_, cycle, hop_amounts) in sorted(self.cycles.items(), key=lambda kv: kv[1][0]):
+            risk = cycle_risk(hop_amounts, median_amount)
+            if risk is None:
+                continue
+            members = by_account_id(accounts, cycle)
+            current[("cycle",) + tuple(accounts[list(key)].tolist())] = (members, risk, {})
+
+        for hub in sorted(self.smurfs, key=lambda h: accounts[h]):
+            members, score = self.smurfs[hub]
+            current[("fan_in_fan_out", accounts[hub])] = (members, score, {})
+
+        for start in sorted(self.shells):
+            chain = self.shells[start]
+            current[("layered_shell", accounts[start])] = (chain["members"], 78.0, chain_stats(chain))
+
+        rings = {}
+        for key, (members, risk, extra) in current.items():
+            rings[key] = {
+                "ring_id": self._ring_id(key),
+                "member_accounts": members,
+                "pattern_type": key[0],
+                "risk_score": round(risk, 2),
+                **extra
+            }
+
+        added = [r for k, r in rings.items() if k not in self.rings]
+        changed = [
+            r for k, r in rings.items()
+            if k in self.rings and r != self.rings[k]
+        ]
+        removed = [r["ring_id"] for k, r in self.rings.items() if k not in rings]
+
+        # node tags only follow cycle rings, as in detect_cycles; re-tag the
+        # members of every cycle ring that came, went or changed
+        if full:
+            dirty = list(rings.values()) + list(self.rings.values())
+        else:
+            dirty = added + changed + [
+                r for k, r in self.rings.items() if rings.get(k) != r
+            ]
+        stale = {
+            m for r in dirty if r["pattern_type"] == "cycle" for m in r["member_accounts"]
+        }
+        self.node_stats.clear_tags(stale)
+        for ring in rings.values():
+            if ring["pattern_type"] == "cycle" and stale.intersection(ring["member_accounts"]):
+                tag_cycle_members(
+                    self.node_stats,
+                    [m for m in ring["member_accounts"] if m in stale],
+                    ring["ring_id"],
+                )
+
+        self.rings = rings
+        changes = {"added": added, "changed": changed, "removed": removed}
+        return list(rings.values()), changes
+
+    def _prune_ring_ids(self, alive):
+        """ Forget ids of rings with an account that left the window (keys are account ids) """
+        codes = self.interner.codes
+
+        def live(account):
+            code = codes.get(account)
+            return code is not None and alive[code]
+
+        self._ring_ids = {
+            key: ring_id for key, ring_id in self._ring_ids.items() if all(map(live, key[1:]))
+        }
+
+    def _ring_id(self, key):
+        ring_id = self._ring_ids.get(key)
+        if ring_id is None:
+            kind = key[0]
+            n = self._next_id[kind]
+            self._next_id[kind] += 1
+            if kind == "cycle":
+                ring_id = f"RING_C_{n:03d}"
+            elif kind == "fan_in_fan_out":
+                ring_id = f"RING_S_{n:03d}"
+            else:
+                ring_id = f"RING_L_{n}"
+            self._ring_ids[key] = ring_id
+        return ring_id
+
+
+# -----------------------------
+# Named streams for the API
+# -----------------------------
+# at most MAX_STREAMS, least recently used first; idle ones expire after
+# STREAM_IDLE_S
+_streams = OrderedDict()
+_streams_lock = threading.Lock()
+
+
+def get_stream(stream_id, create=True):
+    now = time.monotonic()
+    with _streams_lock:
+        while _streams and now - next(iter(_streams.values())).last_used > STREAM_IDLE_S:
+            _streams.popitem(last=False)
+        analyzer = _streams.get(stream_id)
+        if analyzer is None and create:
+            analyzer = _streams[stream_id] = IncrementalAnalyzer()
+        if analyzer is not None:
+            analyzer.last_used = now
+            _streams.move_to_end(stream_id)
+            while len(_streams) > MAX_STREAMS:
+                _streams.popitem(last=False)
+        return analyzer
+
+
+def drop_stream(stream_id):
+    with _streams_lock:
+        return _streams.pop(stream_id, None) is not None
@@ -0,0 +1,300 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from app.graph_builder import compute_node_stats
+from app.transaction_graph import TransactionGraph, factorize_accounts, to_epoch_ns
+
+REQUIRED_COLUMNS = ["sender_id", "receiver_id", "amount", "timestamp"]
+CSV_DTYPES = {
+    "sender_id": str,
+    "receiver_id": str,
+    "amount": np.float32,
+    "timestamp": str,
+}
+CHUNK_ROWS = 50_000
+# columnar chunks are far cheaper to hold (no text parsing), and fewer of
+# them means fewer repeated id lookups in the interner
+COLUMNAR_CHUNK_ROWS = 500_000
+
+# leading bytes of the binary formats; anything else is read as CSV
+NAT = np.iinfo(np.int64).min            # NaT as epoch ns
+
+PARQUET_MAGIC = b"PAR1"
+ARROW_FILE_MAGIC = b"ARROW1"            # Arrow IPC file = Feather v2
+FEATHER_V1_MAGIC = b"FEA1"
+ARROW_STREAM_MAGIC = b"\xff\xff\xff\xff"  # continuation marker of an IPC stream
+
+
+def parse_timestamps(values):
+    """
+    Epoch ns for 'YYYY-MM-DD HH:MM:SS' strings. NumPy's datetime64 parser
+    handles this fixed ISO-like format in C; anything else falls back to
+    pandas' inference. Blank or missing timestamps raise ValueError.
+    """
+    values = np.asarray(values)
+    try:
+        ts = values.astype("datetime64[ns]").view(np.int64)
+    except ValueError:
+        ts = to_epoch_ns(pd.Series(values))
+    return check_timestamps(ts)
+
+
+def check_timestamps(ts):
+    """ ``ts`` (epoch ns) unless some are NaT, which would pass for the year 1677 """
+    missing = int(np.count_nonzero(ts == NAT))
+    if missing:
+        raise ValueError(f"{missing} rows have a missing/unparseable timestamp")
+    return ts
+
+
+class AccountInterner:
+    """ Account id -> dense int32 code, stable across chunks """
+
+    def __init__(self):
+        self.codes = {}
+        self.accounts = []
+
+    def encode(self, senders, receivers):
+        # factorize the chunk first so Python only touches its distinct ids
+        return self.encode_local(*factorize_accounts(senders, receivers))
+
+    def encode_arrow(self, senders, receivers):
+        """ Same as encode for Arrow string arrays, factorized inside Arrow """
+        return self.encode_local(*factorize_arrow(senders, receivers))
+
+    def encode_local(self, uniques, send_local, recv_local):
+        """ Chunk-local codes (into ``uniques``) -> global codes """
+        lookup = np.empty(len(uniques), dtype=np.int32)
+        for i, acc in enumerate(uniques.tolist()):
+            code = self.codes.get(acc)
+            if code is None:
+                code = len(self.accounts)
+                self.codes[acc] = code
+                self.accounts.append(acc)
+            lookup[i] = code
+        return lookup[send_local], lookup[recv_local]
+
+
+class GraphAccumulator:
+    """
+    Incremental input to the graph builder: each chunk is reduced to int32
+    codes, amounts and int64 timestamps (16 bytes per transfer) and the raw
+    text is dropped, so memory tracks the graph rather than the upload.
+    """
+
+    def __init__(self, interner=None):
+        self.interner = interner or AccountInterner()
+        self.senders = []
+        self.receivers = []
+        self.amounts = []
+        self.timestamps = []
+
+    def add(self, chunk):
+        """ ``chunk`` is a DataFrame or an Arrow record batch (see iter_transaction_chunks) """
+        if len(chunk) == 0:
+            return
+        if not isinstance(chunk, pd.DataFrame):
+            self._add_arrow(chunk)
+            return
+
+        s, r = self.interner.encode(
+            chunk["sender_id"].to_numpy(), chunk["receiver_id"].to_numpy()
+        )
+        ts = chunk["timestamp"]
+        if pd.api.types.is_datetime64_any_dtype(ts):
+            ts = check_timestamps(to_epoch_ns(ts))
+        else:
+            ts = parse_timestamps(ts.to_numpy())
+
+        self.senders.append(s)
+        self.receivers.append(r)
+        self.amounts.append(chunk["amount"].to_numpy(np.float32))
+        self.timestamps.append(ts)
+
+    def _add_arrow(self, batch):
+        s, r = self.interner.encode_arrow(batch.column("sender_id"), batch.column("receiver_id"))
+        self.senders.append(s)
+        self.receivers.append(r)
+        self.amounts.append(batch.column("amount").to_numpy())
+        self.timestamps.append(arrow_epoch_ns(batch.column("timestamp")))
+
+    def columns(self):
+        """ -> (senders, receivers, amounts, timestamps) so far; resets the buffers """
+        columns = (
+            _concat(self.senders, np.int32),
+            _concat(self.receivers, np.int32),
+            _concat(self.amounts, np.float32),
+            _concat(self.timestamps, np.int64),
+        )
+        self.senders, self.receivers, self.amounts, self.timestamps = [], [], [], []
+        return columns
+
+    def build(self):
+        """ -> (TransactionGraph, node_stats) """
+        accounts = np.array(self.interner.accounts, dtype=object)
+        senders, receivers, amounts, timestamps = self.columns()
+
+        node_stats = compute_node_stats(accounts, senders, receivers, amounts)
+        tg = TransactionGraph.from_codes(accounts, senders, receivers, amounts, timestamps)
+        return tg, node_stats
+
+
+def _concat(parts, dtype):
+    if not parts:
+        return np.zeros(0, dtype=dtype)
+    return np.concatenate(parts)
+
+
+def iter_transaction_chunks(source, chunk_rows=None):
+    """
+    Typed chunks of a transactions file (path or file object): CSV,
+    Parquet, Arrow IPC (file or stream) or Feather, told apart by their
+    leading bytes. Only the columns the pipeline uses are read.
+
+    CSV chunks are DataFrames; columnar ones stay Arrow record batches
+    (GraphAccumulator.add takes both), so ids never become per-row
+    Python strings.
+    """
+    fmt = sniff_format(source)
+    if fmt != "csv":
+        yield from iter_columnar_batches(source, fmt, chunk_rows or COLUMNAR_CHUNK_ROWS)
+        return
+
+    reader = pd.read_csv(
+        source,
+        usecols=REQUIRED_COLUMNS,
+        dtype=CSV_DTYPES,
+        chunksize=chunk_rows or CHUNK_ROWS,
+    )
+    with reader:
+        yield from reader
+
+
+def sniff_format(source):
+    """ "parquet", "arrow", "arrow_stream", "feather" (v1) or "csv" """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            head = f.read(8)
+    else:
+        try:
+            pos = source.tell()
+            head = source.read(8)
+            source.seek(pos)
+        except (AttributeError, OSError):
+            return "csv"
+    if not isinstance(head, bytes):
+        return "csv"
+
+    if head.startswith(PARQUET_MAGIC):
+        return "parquet"
+    if head.startswith(ARROW_FILE_MAGIC):
+        return "arrow"
+    if head.startswith(ARROW_STREAM_MAGIC):
+        return "arrow_stream"
+    if head.startswith(FEATHER_V1_MAGIC):
+        return "feather"
+    return "csv"
+
+
+# -----------------------------
+# Columnar formats
+# -----------------------------
+def iter_columnar_batches(source, fmt, chunk_rows=COLUMNAR_CHUNK_ROWS):
+    """
+    Arrow record batches of the required columns, ids as strings and
+    amounts as float32. Paths are memory-mapped, so the other columns
+    (and, for uncompressed Arrow, the kept ones) are never copied in.
+    """
+    import pyarrow as pa
+
+    mapped = isinstance(source, (str, os.PathLike))
+
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        parquet = pq.ParquetFile(source, memory_map=mapped)
+        _check_columns(parquet.schema_arrow.names)
+        batches = parquet.iter_batches(batch_size=chunk_rows, columns=REQUIRED_COLUMNS)
+    elif fmt == "arrow":
+        reader = pa.ipc.open_file(pa.memory_map(os.fspath(source)) if mapped else source)
+        _check_columns(reader.schema.names)
+        batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+    elif fmt == "arrow_stream":
+        reader = pa.ipc.open_stream(pa.memory_map(os.fspath(source)) if mapped else source)
+        _check_columns(reader.schema.names)
+        batches = reader
+    else:
+        import pyarrow.feather as feather
+
+        try:
+            table = feather.read_table(source, columns=REQUIRED_COLUMNS, memory_map=mapped)
+        except pa.ArrowInvalid as e:
+            raise ValueError(f"Missing required columns: {e}")
+        batches = table.to_batches(chunk_rows)
+
+    for batch in batches:
+        batch = _normalize_batch(batch.select(REQUIRED_COLUMNS))
+        for start in range(0, batch.num_rows, chunk_rows):
+            yield batch.slice(start, chunk_rows)
+
+
+def factorize_arrow(senders, receivers):
+    """ factorize_accounts for Arrow string arrays: same first-appearance order """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    n = len(senders)
+    interleave = np.empty(2 * n, dtype=np.int64)
+    interleave[0::2] = np.arange(n)
+    interleave[1::2] = np.arange(n, 2 * n)
+    both = pa.concat_arrays([senders, receivers]).take(interleave)
+    encoded = pc.dictionary_encode(both)
+    codes = encoded.indices.to_numpy()
+    accounts = np.array(encoded.dictionary.to_pylist(), dtype=object)
+    return accounts, codes[0::2], codes[1::2]
+
+
+def arrow_epoch_ns(column):
+    """ int64 epoch ns from an Arrow timestamp, date or string column (naive = UTC) """
+    import pyarrow as pa
+
+    if pa.types.is_timestamp(column.type) or pa.types.is_date(column.type):
+        if column.null_count:
+            raise ValueError(f"{column.null_count} rows have a missing/unparseable timestamp")
+        tz = getattr(column.type, "tz", None)
+        return column.cast(pa.timestamp("ns", tz)).cast(pa.int64()).to_numpy()
+    return parse_timestamps(column.to_numpy(zero_copy_only=False))
+
+
+def _check_columns(names):
+    missing = [c for c in REQUIRED_COLUMNS if c not in names]
+    if missing:
+        raise ValueError(f"Missing required columns: {', '.join(missing)}")
+
+
+def _normalize_batch(batch):
+    """ Same types the CSV reader produces (timestamps may stay native) """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    columns = []
+    for name, column in zip(batch.schema.names, batch.columns):
+        if name in ("sender_id", "receiver_id"):
+            if pa.types.is_dictionary(column.type):
+                column = column.dictionary_decode()
+            if not pa.types.is_string(column.type):
+                column = pc.cast(column, pa.string())
+        elif name == "amount":
+            column = pc.cast(column, pa.float32())
+        columns.append(column)
+    return pa.RecordBatch.from_arrays(columns, names=batch.schema.names)
+
+
+def read_transactions_csv(source, chunk_rows=None):
+    """ Stream a transactions file (CSV or columnar) into the graph builder """
+    acc = GraphAccumulator()
+    for chunk in iter_transaction_chunks(source, chunk_rows):
+        acc.add(chunk)
+    return acc.build()
@@ -0,0 +1,353 @@
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+import warnings
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from app.cache import private_dir
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+PROFILE_DIR = os.environ.get("RIFT_PROFILE_DIR") or os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "rift", "profiles"
+)
+PROFILE_KEEP = int(os.environ.get("RIFT_PROFILE_KEEP", "50"))                # 0: no limit
+PROFILE_MAX_AGE_H = float(os.environ.get("RIFT_PROFILE_MAX_AGE_H", "24"))    # 0: no limit
+PROFILE_TOP = 25            # functions listed in the response
+PROFILERS = ("cprofile", "pyinstrument")
+
+WALL_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+_recorder = ContextVar("rift_recorder", default=None)
+_profiling = ContextVar("rift_profiling", default=False)
+
+
+# -----------------------------
+# Per-run stage records
+# -----------------------------
+def _peak_rss_bytes():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _mb(after, before):
+    if after is None or before is None:
+        return None
+    return round((after - before) / 2**20, 2)
+
+
+class Recorder:
+    """
+    Stage records of one run, in start order (nested stages included).
+    Stages may run on several threads; each thread nests its own.
+    """
+
+    def __init__(self):
+        self.stages = []
+        self._local = threading.local()
+
+    @property
+    def _open(self):
+        if not hasattr(self._local, "open"):
+            self._local.open = []
+        return self._local.open
+
+    def count(self, name, n=1):
+        if self._open:
+            counts = self._open[-1]["counts"]
+            counts[name] = counts.get(name, 0) + int(n)
+
+
+@contextmanager
+def recording():
+    """
+    Collect stage() records made in this context (thread / task). Nested
+    calls share the outer recording.
+    """
+    rec = _recorder.get()
+    if rec is not None:
+        yield rec
+        return
+    rec = Recorder()
+    token = _recorder.set(rec)
+    try:
+        yield rec
+    finally:
+        _recorder.reset(token)
+
+
+@contextmanager
+def stage(name, on_stage=None):
+    """
+    Time a stage of the current recording: wall and CPU seconds, RSS change
+    and how far it pushed the process's peak RSS, plus item counts added
+    with count(). Stages opened inside another one name it as "parent".
+    ``on_stage(name, status)`` gets "running" / "done" around the stage.
+    Nothing is recorded outside recording().
+
+    CPU time is this thread's; work in other processes (the parallel cycle
+    pool) is only visible in wall time.
+    """
+    if on_stage:
+        on_stage(name, "running")
+    with _recorded(name):
+        yield
+    if on_stage:
+        on_stage(name, "done")
+
+
+@contextmanager
+def _recorded(name):
+    rec = _recorder.get()
+    if rec is None:
+        yield
+        return
+
+    entry = {"stage": name, "counts": {}}
+    if rec._open:
+        entry["parent"] = rec._open[-1]["stage"]
+    rec.stages.append(entry)
+    rec._open.append(entry)
+
+    rss, peak = _rss_bytes(), _peak_rss_bytes()
+    wall, cpu = time.perf_counter(), time.thread_time()
+    try:
+        yield
+    finally:
+        entry["wall_s"] = round(time.perf_counter() - wall, 4)
+        entry["cpu_s"] = round(time.thread_time() - cpu, 4)
+        entry["rss_delta_mb"] = _mb(_rss_bytes(), rss)
+        entry["peak_rss_delta_mb"] = _mb(_peak_rss_bytes(), peak)
+        rec._open.pop()
+
+
+def count(name, n=1):
+    """ Add to an item count of the running stage """
+    rec = _recorder.get()
+    if rec is not None:
+        rec.count(name, n)
+
+
+# -----------------------------
+# Process-wide metrics (/metrics)
+# -----------------------------
+class StageMetrics:
+    """
+    Totals over every recorded run, rendered in the Prometheus text format.
+    Job results are observed by the API process, not the pool worker that
+    ran them, so /metrics covers /jobs as well.
+    """
+
+    def __init__(self, buckets=WALL_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._runs = 0
+        self._stages = {}
+        self._items = {}
+
+    def observe(self, stages):
+        with self._lock:
+            self._runs += 1
+            for entry in stages:
+                name = entry["stage"]
+                s = self._stages.setdefault(name, {
+                    "count": 0, "wall": 0.0, "cpu": 0.0,
+                    "buckets": [0] * len(self.buckets),
+                })
+                s["count"] += 1
+                s["wall"] += entry["wall_s"]
+                s["cpu"] += entry["cpu_s"]
+                for i, bound in enumerate(self.buckets):
+                    if entry["wall_s"] <= bound:
+                        s["buckets"][i] += 1
+                for item, n in entry["counts"].items():
+                    self._items[(name, item)] = self._items.get((name, item), 0) + n
+
+    def render(self):
+        with self._lock:
+            lines = [
+                "# HELP rift_analyses_total Analyses with recorded stages.",
+                "# TYPE rift_analyses_total counter",
+                f"rift_analyses_total {self._runs}",
+                "# HELP rift_stage_wall_seconds Wall time per pipeline stage.",
+                "# TYPE rift_stage_wall_seconds histogram",
+            ]
+            for name, s in self._stages.items():
+                for bound, n in zip(self.buckets, s["buckets"]):
+                    lines.append(f'rift_stage_wall_seconds_bucket{{stage="{name}",le="{bound}"}} {n}')
+                lines.append(f'rift_stage_wall_seconds_bucket{{stage="{name}",le="+Inf"}} {s["count"]}')
+                lines.append(f'rift_stage_wall_seconds_sum{{stage="{name}"}} {s["wall"]:.6f}')
+                lines.append(f'rift_stage_wall_seconds_count{{stage="{name}"}} {s["count"]}')
+
+            lines += [
+                "# HELP rift_stage_cpu_seconds_total CPU time per pipeline stage.",
+                "# TYPE rift_stage_cpu_seconds_total counter",
+            ]
+            for name, s in self._stages.items():
+                lines.append(f'rift_stage_cpu_seconds_total{{stage="{name}"}} {s["cpu"]:.6f}')
+
+            lines += [
+                "# HELP rift_stage_items_total Items processed per pipeline stage.",
+                "# TYPE rift_stage_items_total counter",
+            ]
+            for (name, item), n in self._items.items():
+                lines.append(f'rift_stage_items_total{{stage="{name}",item="{item}"}} {n}')
+
+            rss = _rss_bytes()
+            if rss is not None:
+                lines += [
+                    "# HELP rift_process_resident_memory_bytes Current RSS of the API process.",
+                    "# TYPE rift_process_resident_memory_bytes gauge",
+                    f"rift_process_resident_memory_bytes {rss}",
+                ]
+        return "\n".join(lines) + "\n"
+
+
+metrics = StageMetrics()
+
+
+# -----------------------------
+# Single-request profiles
+# -----------------------------
+class ProfilerBusy(Exception):
+    pass
+
+
+# cProfile (sys.monitoring on 3.12+) allows one active profiler per process
+_profile_lock = threading.Lock()
+
+
+def profiling():
+    """ Whether this context runs under profiled(), which only sees its own thread """
+    return _profiling.get()
+
+
+@contextmanager
+def profiled(profiler="cprofile"):
+    """
+    Profile the enclosed block and write the dump to PROFILE_DIR (then
+    prune it, see prune_profiles). Yields a dict that is filled in on exit:
+    the dump's file name (None if the directory isn't private to this
+    user) and, for cProfile, the top functions by cumulative time. Raises
+    ProfilerBusy if another request is being profiled, ImportError if
+    pyinstrument is missing.
+    """
+    if not _profile_lock.acquire(blocking=False):
+        raise ProfilerBusy()
+    try:
+        if profiler == "pyinstrument":
+            from pyinstrument import Profiler
+            prof = Profiler()
+            start, stop = prof.start, prof.stop
+        else:
+            prof = cProfile.Profile()
+            start, stop = prof.enable, prof.disable
+
+        report = {"profiler": profiler}
+        token = _profiling.set(True)
+        start()
+        try:
+            yield report
+        finally:
+            stop()
+            _profiling.reset(token)
+            if profiler != "pyinstrument":
+                report["top"] = _top_functions(prof, PROFILE_TOP)
+            report["file"] = _write_profile(prof, profiler)
+    finally:
+        _profile_lock.release()
+
+
+def _write_profile(prof, profiler):
+    try:
+        private_dir(PROFILE_DIR)
+    except OSError as e:
+        warnings.warn(f"profile not written ({e})")
+        return None
+    name = uuid.uuid4().hex
+    if profiler == "pyinstrument":
+        name += ".html"
+        with open(os.path.join(PROFILE_DIR, name), "w") as f:
+            f.write(prof.output_html())
+    else:
+        name += ".prof"
+        prof.dump_stats(os.path.join(PROFILE_DIR, name))
+    prune_profiles()
+    return name
+
+
+def prune_profiles(directory=None, keep=None, max_age_h=None):
+    """
+    Delete the dumps in ``directory`` (default PROFILE_DIR) past the newest
+    ``keep`` or older than ``max_age_h`` hours -> file names removed.
+    """
+    directory = directory or PROFILE_DIR
+    keep = PROFILE_KEEP if keep is None else keep
+    max_age_h = PROFILE_MAX_AGE_H if max_age_h is None else max_age_h
+    if not os.path.isdir(directory):
+        return []
+
+    dumps = []
+    for name in os.listdir(directory):
+        if not name.endswith((".prof", ".html")):
+            continue
+        try:
+            dumps.append((os.path.getmtime(os.path.join(directory, name)), name))
+        except OSError:
+            continue
+    dumps.sort(reverse=True)
+
+    oldest = time.time() - max_age_h * 3600
+    removed = [
+        name for i, (mtime, name) in enumerate(dumps)
+        if (keep and i >= keep) or (max_age_h and mtime < oldest)
+    ]
+    for name in removed:
+        try:
+            os.remove(os.path.join(directory, name))
+        except OSError:
+            pass
+    return removed
+
+
+def _top_functions(prof, limit):
+    stats = pstats.Stats(prof, stream=io.StringIO()).sort_stats("cumulative")
+    top = []
+    for func in stats.fcn_list[:limit]:
+        calls, _, tottime, cumtime, _ = stats.stats[func]
+        filename, line, fn = func
+        top.append({
+            "function": f"{os.path.basename(filename)}:{line}({fn})",
+            "calls": calls,
+            "tottime_s": round(tottime, 4),
+            "cumtime_s": round(cumtime, 4),
+        })
+    return top
+
+
+def profile_path(name):
+    """ Path of a dump written by profiled(), or None """
+    if os.path.basename(name) != name or not name.endswith((".prof", ".html")):
+        return None
+    path = os.path.join(PROFILE_DIR, name)
+    return path if os.path.isfile(path) else None
@@ -0,0 +1,199 @@
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+
+from app.instrumentation import metrics
+from app.pipeline import STAGES, run_analysis
+from app.snapshot import prune_snapshots, snapshot_path
+
+JOB_WORKERS = int(os.environ.get("RIFT_JOB_WORKERS", "2"))
+MAX_QUEUED_JOBS = int(os.environ.get("RIFT_MAX_QUEUED_JOBS", "16"))
+MAX_FINISHED_JOBS = int(os.environ.get("RIFT_MAX_FINISHED_JOBS", "100"))
+
+ACTIVE = ("queued", "running")
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class JobCancelled(Exception):
+    pass
+
+
+# -----------------------------
+# Worker side
+# -----------------------------
+def _run_job(job_id, path, events, cancelled):
+    """ Runs in a pool process; reports stages through the manager queue """
+
+    def on_stage(stage, status):
+        if cancelled.get(job_id):
+            raise JobCancelled(job_id)
+        events.put((job_id, stage, status, time.time()))
+
+    events.put((job_id, None, "running", time.time()))
+    # the graph comes back too (CSR arrays pickle compactly) for /graphs,
+    # unless a snapshot of it is written for the graph store to open
+    snapshot = snapshot_path(job_id)
+    if snapshot is None:
+        return run_analysis(path, on_stage=on_stage, return_graph=True)
+    result = run_analysis(path, on_stage=on_stage, snapshot=snapshot)
+    prune_snapshots()
+    return result, None
+
+
+# -----------------------------
+# API side
+# -----------------------------
+class JobManager:
+    """
+    Bounded process pool for /jobs. At most ``workers`` analyses run at once
+    and at most ``max_queued`` more wait; finished results are kept for the
+    last ``max_finished`` jobs.
+    """
+
+    def __init__(self, workers=JOB_WORKERS, max_queued=MAX_QUEUED_JOBS,
+                 max_finished=MAX_FINISHED_JOBS, graph_store=None):
+        self.workers = workers
+        self.graph_store = graph_store
+        self.max_queued = max_queued
+        self.max_finished = max_finished
+
+        # spawn: the API process has threads, so don't fork it
+        ctx = multiprocessing.get_context("spawn")
+        self._manager = ctx.Manager()
+        self._events = self._manager.Queue()
+        self._cancelled = self._manager.dict()
+        self._pool = ProcessPoolExecutor(max_workers=workers, mp_context=ctx)
+
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+        self._futures = {}
+        self._results = {}
+
+        self._drainer = threading.Thread(target=self._drain_events, daemon=True)
+        self._drainer.start()
+
+    def submit(self, path):
+        with self._lock:
+            active = sum(1 for j in self._jobs.values() if j["status"] in ACTIVE)
+            if active >= self.workers + self.max_queued:
+                raise JobQueueFull()
+
+            job_id = uuid.uuid4().hex
+            self._jobs[job_id] = {
+                "job_id": job_id,
+                "status": "queued",
+                "created_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+                "stages": {s: {"status": "pending", "seconds": None} for s in STAGES},
+                "error": None,
+            }
+            future = self._pool.submit(_run_job, job_id, path, self._events, self._cancelled)
+            self._futures[job_id] = future
+
+        future.add_done_callback(lambda f: self._finish(job_id, path, f))
+        return self.status(job_id)
+
+    def status(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            return {
+                **job,
+                "stages": {s: dict(v) for s, v in job["stages"].items()},
+            }
+
+    def result(self, job_id):
+        with self._lock:
+            return self._results.get(job_id)
+
+    def cancel(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            if job["status"] in ACTIVE:
+                # queued → dropped by the pool; running → stops at the next stage
+                self._cancelled[job_id] = True
+                self._futures[job_id].cancel()
+        return self.status(job_id)
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self._events.put(None)
+        self._manager.shutdown()
+
+    # -----------------------------
+    # Bookkeeping
+    # -----------------------------
+    def _drain_events(self):
+        while True:
+            try:
+                event = self._events.get()
+            except (EOFError, OSError):
+                return
+            if event is None:
+                return
+
+            job_id, stage, status, ts = event
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if job is None:
+                    continue
+                if stage is None:
+                    if job["status"] == "queued":
+                        job["status"] = "running"
+                    job["started_at"] = ts
+                    continue
+
+                entry = job["stages"][stage]
+                entry["status"] = status
+                if status == "running":
+                    entry["started_at"] = ts
+                else:
+                    entry["seconds"] = round(ts - entry.pop("started_at", ts), 3)
+
+    def _finish(self, job_id, path, future):
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+        with self._lock:
+            job = self._jobs[job_id]
+            job["finished_at"] = time.time()
+            self._futures.pop(job_id, None)
+            self._cancelled.pop(job_id, None)
+
+            try:
+                result, tg = future.result()
+                # recorded in the pool process, counted here
+                metrics.observe(result["summary"]["stages"])
+                if self.graph_store is not None:
+                    # the job id doubles as the analysis id
+                    if tg is not None:
+                        self.graph_store.put(tg, job_id, result)
+                    result["analysis_id"] = job_id
+                self._results[job_id] = result
+                job["status"] = "done"
+            except (CancelledError, JobCancelled):
+                job["status"] = "cancelled"
+            except Exception as e:
+                job["status"] = "failed"
+                job["error"] = f"{type(e).__name__}: {e}"
+
+            self._evict_finished()
+
+    def _evict_finished(self):
+        finished = [j for j, job in self._jobs.items() if job["status"] not in ACTIVE]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
+            self._results.pop(job_id, None)
@@ -1,17 +1,72 @@
+from contextlib import asynccontextmanager
+import shutil
+import tempfile
+import uuid
+from typing import List
+
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi import FastAPI, UploadFile, File
+from fastapi import FastAPI, UploadFile, File, HTTPException, Query, Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse
+
+from app.account_index import AccountIndex
+from app.graph_store import GraphStore
+from app.incremental import drop_stream, get_stream
+from app.instrumentation import PROFILERS, ProfilerBusy, metrics, profile_path, profiled
+from app.jobs import JobManager, JobQueueFull
+from app.output_formatter import (
+    EDGE_PAGE_LIMIT,
+    edge_records,
+    edges_arrow,
+)
+from app.pipeline import run_analysis
+from app.query_index import QueryIndex, page
+from app.snapshot import prune_snapshots, snapshot_path
+from app.tracing import (
+    TRACE_MAX_HOPS,
+    TRACE_MAX_HOURS,
+    first_arrival,
+    parse_start,
+    trace_money,
+    trace_result,
+)
+
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+PROMETHEUS_TEXT = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class FastJSONResponse(JSONResponse):
+    """ orjson-encoded when available: several times faster on big results """
+
+    def render(self, content):
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(content)
+
+
+graph_store = GraphStore()
+_job_manager = None
+
 
-import pandas as pd
-import time
+def get_job_manager():
+    global _job_manager
+    if _job_manager is None:
+        _job_manager = JobManager(graph_store=graph_store)
+    return _job_manager
 
-from app.graph_builder import build_graph
-from app.detectors.cycle_detector import detect_cycles
-from app.detectors.smurf_detector import detect_smurf_rings
-from app.detectors.shell_detector import detect_shells
-from app.scoring import calculate_suspicion
-from app.output_formatter import format_output
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app):
+    yield
+    if _job_manager is not None:
+        _job_manager.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -22,56 +77,270 @@ app.add_middleware(
 
 
 @app.post("/analyze")
-async def analyze(file: UploadFile = File(...)):
-
-    start_time = time.time()
-
-    # -----------------------------
-    # Load CSV
-    # -----------------------------
-    df = pd.read_csv(file.file)
-    df["timestamp"] = pd.to_datetime(df["timestamp"])
-
-    # -----------------------------
-    # Build Graph
-    # -----------------------------
-    G, node_stats = build_graph(df)
-
-    # -----------------------------
-    # Run All Detectors
-    # -----------------------------
-    fraud_rings = []
-
-    # 1️⃣ Cycle detection
-    cycle_rings = detect_cycles(G, df, node_stats)
-    fraud_rings.extend(cycle_rings)
-
-    # 2️⃣ Smurf detection
-    smurf_rings = detect_smurf_rings(df)
-    fraud_rings.extend(smurf_rings)
-
-    # 3️⃣ Shell detection
-    shell_rings = detect_shells(G, node_stats)
-    fraud_rings.extend(shell_rings)
-
-    # -----------------------------
-    # Suspicion Scoring
-    # -----------------------------
-    suspicious_accounts = calculate_suspicion(
-        G,
-        node_stats,
-        fraud_rings
-    )
-
-    processing_time = round(time.time() - start_time, 2)
-
-    # -----------------------------
-    # Final Output
-    # -----------------------------
-    return format_output(
-        suspicious_accounts,
-        fraud_rings,
-        node_stats,
-        processing_time,
-        G
-    )
\ No newline at end of file
+def analyze(
+    file: UploadFile = File(...),
+    profile: str = Query(None, pattern=f"^({'|'.join(PROFILERS)})$"),
+):
+    # plain def: FastAPI runs it in the threadpool, so the CPU-bound
+    # pipeline doesn't block the event loop; the response is encoded here,
+    # skipping FastAPI's per-object jsonable_encoder pass
+    analysis_id = uuid.uuid4().hex
+    # with snapshots on, the graph store serves the analysis from its snapshot
+    snapshot = snapshot_path(analysis_id)
+    if profile:
+        try:
+            with profiled(profile) as report:
+                result, tg = run_analysis(file.file, return_graph=True, use_cache=False, snapshot=snapshot)
+        except ProfilerBusy:
+            raise HTTPException(status_code=409, detail="Another request is being profiled")
+        except ImportError:
+            raise HTTPException(status_code=501, detail=f"{profile} is not installed")
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        result["summary"]["profile"] = report
+    else:
+        try:
+            result, tg = run_analysis(file.file, return_graph=True, snapshot=snapshot)
+        except ImportError:
+            raise HTTPException(status_code=501, detail="pyarrow is needed for columnar uploads")
+        except ValueError as e:
+            # a malformed upload, e.g. missing required columns
+            raise HTTPException(status_code=400, detail=str(e))
+    metrics.observe(result["summary"]["stages"])
+    if snapshot is None:
+        graph_store.put(tg, analysis_id, result)
+    else:
+        prune_snapshots()
+    result["analysis_id"] = analysis_id
+    return FastJSONResponse(result)
+
+
+# -----------------------------
+# Instrumentation
+# -----------------------------
+@app.get("/metrics")
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type=PROMETHEUS_TEXT)
+
+
+@app.get("/profiles/{name}")
+def download_profile(name: str):
+    # .prof opens in snakeviz / pstats, .html (pyinstrument) in a browser
+    path = profile_path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Unknown profile")
+    return FileResponse(path)
+
+
+# -----------------------------
+# Background jobs
+# -----------------------------
+@app.post("/jobs", status_code=202)
+def create_job(file: UploadFile = File(...)):
+    # the pool process reads the upload from disk (any supported format)
+    with tempfile.NamedTemporaryFile(delete=False) as tmp:
+        shutil.copyfileobj(file.file, tmp)
+
+    try:
+        return get_job_manager().submit(tmp.name)
+    except JobQueueFull:
+        raise HTTPException(status_code=429, detail="Job queue is full, retry later")
+
+
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    job = get_job_manager().status(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return job
+
+
+@app.get("/jobs/{job_id}/result")
+def job_result(job_id: str):
+    manager = get_job_manager()
+    job = manager.status(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    if job["status"] != "done":
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}")
+    return FastJSONResponse(manager.result(job_id))
+
+
+@app.delete("/jobs/{job_id}")
+def cancel_job(job_id: str):
+    job = get_job_manager().cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return job
+
+
+# -----------------------------
+# Incremental streams
+# -----------------------------
+@app.post("/streams/{stream_id}/batches")
+def add_batch(stream_id: str, file: UploadFile = File(...)):
+    # appends to the stream's rolling window; the response carries the full
+    # analysis plus "ring_changes" since the previous batch
+    analyzer = get_stream(stream_id)
+    try:
+        result, tg = analyzer.apply(file.file, return_graph=True)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    metrics.observe(result["summary"]["stages"])
+    result["analysis_id"] = graph_store.put(tg)
+    return FastJSONResponse(result)
+
+
+@app.delete("/streams/{stream_id}")
+def delete_stream(stream_id: str):
+    if not drop_stream(stream_id):
+        raise HTTPException(status_code=404, detail="Unknown stream")
+    return {"stream_id": stream_id, "deleted": True}
+
+
+# -----------------------------
+# Full graph, on demand
+# -----------------------------
+def _stored_graph(analysis_id):
+    tg = graph_store.get(analysis_id)
+    if tg is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired analysis")
+    return tg
+
+
+@app.get("/graphs/{analysis_id}/edges")
+def graph_edges(
+    analysis_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(1000, ge=1, le=EDGE_PAGE_LIMIT),
+):
+    tg = _stored_graph(analysis_id)
+    total = tg.number_of_edges()
+    end = min(offset + limit, total)
+    return FastJSONResponse({
+        "total": total,
+        "offset": offset,
+        "limit": limit,
+        "edges": edge_records(tg, range(offset, end)) if offset < end else [],
+    })
+
+
+@app.get("/graphs/{analysis_id}/edges.arrow")
+def graph_edges_arrow(analysis_id: str):
+    tg = _stored_graph(analysis_id)
+    try:
+        body = edges_arrow(tg)
+    except ImportError:
+        raise HTTPException(status_code=501, detail="pyarrow is not installed")
+    return Response(body, media_type=ARROW_STREAM)
+
+
+def _query_index(analysis_id):
+    index = graph_store.index(analysis_id, "queries", QueryIndex.from_graph)
+    if index is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired analysis")
+    return index
+
+
+@app.get("/graphs/{analysis_id}/neighborhood")
+def graph_neighborhood(
+    analysis_id: str,
+    account: str,
+    hops: int = Query(1, ge=1, le=3),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(2000, ge=1, le=EDGE_PAGE_LIMIT),
+):
+    """ The ``hops``-hop ego network of ``account``: nearest edges first, paged """
+    index = _query_index(analysis_id)
+    code = index.codes([account])[0]
+    if code < 0:
+        raise HTTPException(status_code=404, detail="Unknown account")
+    accounts, _, edges = index.ego(code, hops)
+    edges, paging = page(edges, offset, limit)
+    return FastJSONResponse({
+        "account": account,
+        "hops": hops,
+        "accounts": len(accounts),
+        **paging,
+        "edges": index.edge_records(edges),
+    })
+
+
+@app.get("/graphs/{analysis_id}/between")
+def graph_between(
+    analysis_id: str,
+    accounts: List[str] = Query(...),
+    view: str = Query("transfers", pattern="^(transfers|edges)$"),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(1000, ge=1, le=EDGE_PAGE_LIMIT),
+):
+    """
+    Transactions among ``accounts`` (repeat the parameter): every transfer,
+    oldest first, or with view=edges one total per sender / receiver pair.
+    Unknown ids are listed in ``unknown``.
+    """
+    index = _query_index(analysis_id)
+    codes = index.codes(accounts)
+    unknown = [a for a, c in zip(accounts, codes.tolist()) if c < 0]
+    if view == "edges":
+        edges, paging = page(index.edges_among(codes), offset, limit)
+        records = index.edge_records(edges)
+    else:
+        rows, edges = index.transfers_among(codes)
+        rows, paging = page(rows, offset, limit)
+        records = index.transfer_records(rows, edges)
+    return FastJSONResponse({"view": view, "unknown": unknown, **paging, view: records})
+
+
+@app.get("/graphs/{analysis_id}/rings/{ring_id}")
+def graph_ring(
+    analysis_id: str,
+    ring_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(2000, ge=1, le=EDGE_PAGE_LIMIT),
+):
+    """ A fraud ring or case (by ring_id / case_id) with the edges among its members, paged """
+    index = _query_index(analysis_id)
+    ring = graph_store.ring(analysis_id, ring_id)
+    if ring is None:
+        raise HTTPException(status_code=404, detail="Unknown ring")
+    edges, paging = page(index.edges_among(index.codes(ring["member_accounts"])), offset, limit)
+    return FastJSONResponse({**ring, **paging, "edges": index.edge_records(edges)})
+
+
+@app.get("/graphs/{analysis_id}/trace")
+def graph_trace(
+    analysis_id: str,
+    account: str,
+    start: str = Query(None, description="timestamp; defaults to the account's first incoming transfer"),
+    hops: int = Query(3, ge=1, le=TRACE_MAX_HOPS),
+    hours: float = Query(72, gt=0, le=TRACE_MAX_HOURS),
+    amount: float = Query(None, gt=0, description="what entered the account; default: all it sent"),
+    limit: int = Query(2000, ge=1, le=EDGE_PAGE_LIMIT),
+):
+    """
+    Follow the money out of ``account``: transfers after ``start``, each
+    hop after the previous one, within ``hours``, with amounts conserved.
+    """
+    tg = _stored_graph(analysis_id)
+    code = tg.codes([account])[0]
+    if code < 0:
+        raise HTTPException(status_code=404, detail="Unknown account")
+    index = graph_store.index(analysis_id, "accounts", AccountIndex.from_graph)
+    if index is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired analysis")
+    if start is None:
+        start_ns = first_arrival(index, code)
+    else:
+        try:
+            start_ns = parse_start(start)
+        except (ValueError, TypeError):
+            raise HTTPException(status_code=400, detail="Unparseable start timestamp")
+
+    trace = trace_money(index, code, start_ns, hops, hours, amount)
+    return FastJSONResponse({
+        "account": account,
+        "hops": hops,
+        "hours": hours,
+        **trace_result(tg, trace, start_ns, limit),
+    })
@@ -0,0 +1,281 @@
+from collections.abc import Mapping
+
+import numpy as np
+
+MAX_PATTERNS = 64           # one bit each in the pattern column
+
+COLUMNS = (
+    "transactions", "out_degree", "in_degree", "amount_sum", "amount_sumsq",
+    "amount_min", "amount_max", "patterns",
+)
+
+
+class NodeStats:
+    """
+    Per-account stats as parallel NumPy columns indexed by account code:
+
+        transactions                 transfers sent + received
+        out_degree / in_degree       transfers sent / received
+        amount_sum / amount_sumsq    over sent amounts (streaming mean / variance)
+        amount_min / amount_max      over sent amounts (NaN if nothing sent)
+        patterns                     bitmask; bit i is pattern_names[i]
+
+    Ring membership is sparse: (code, ring) pairs, grouped into CSR form
+    by code when read. About 70 bytes per account, whatever its activity.
+
+    ``stats[code]`` is a read-only dict-like view, with "patterns" and
+    "ring_ids" as sets, so code written for the old dict-of-dicts keeps
+    working; tags are written through ``tag`` / ``clear_tags``.
+    """
+
+    def __init__(self, n=0):
+        self.transactions = np.zeros(n, dtype=np.int64)
+        self.out_degree = np.zeros(n, dtype=np.int64)
+        self.in_degree = np.zeros(n, dtype=np.int64)
+        self.amount_sum = np.zeros(n, dtype=np.float64)
+        self.amount_sumsq = np.zeros(n, dtype=np.float64)
+        self.amount_min = np.full(n, np.nan)
+        self.amount_max = np.full(n, np.nan)
+        self.patterns = np.zeros(n, dtype=np.uint64)
+
+        self.pattern_names = []
+        self.ring_names = []
+        self._ring_index = {}
+        self._pairs = []            # (codes, ring index) batches not yet grouped
+        self._ring_codes = np.zeros(0, dtype=np.int64)
+        self._ring_of = np.zeros(0, dtype=np.int64)
+        self._csr = None
+
+    @classmethod
+    def from_codes(cls, n, senders, receivers, amounts):
+        stats = cls(n)
+        stats.add(senders, receivers, amounts)
+        return stats
+
+    @classmethod
+    def from_columns(cls, columns, pattern_names, ring_names, ring_codes, ring_of):
+        """
+        Stats over the given COLUMNS and ring pairs as they are (e.g.
+        memory-mapped from a snapshot, so read-only), nothing copied.
+        """
+        stats = cls()
+        for name in COLUMNS:
+            setattr(stats, name, columns[name])
+        stats.pattern_names = list(pattern_names)
+        stats.ring_names = list(ring_names)
+        stats._ring_index = {name: i for i, name in enumerate(stats.ring_names)}
+        stats._ring_codes = ring_codes
+        stats._ring_of = ring_of
+        return stats
+
+    def __len__(self):
+        """ Accounts with at least one transfer """
+        return int(np.count_nonzero(self.transactions))
+
+    def __contains__(self, code):
+        return 0 <= code < len(self.transactions) and self.transactions[code] > 0
+
+    def __getitem__(self, code):
+        if code not in self:
+            raise KeyError(code)
+        return NodeView(self, code)
+
+    # -----------------------------
+    # Numeric columns
+    # -----------------------------
+    def _grow(self, n):
+        old = len(self.transactions)
+        if n <= old:
+            return
+        pad = n - old
+        for name in ("transactions", "out_degree", "in_degree", "amount_sum", "amount_sumsq", "patterns"):
+            column = getattr(self, name)
+            setattr(self, name, np.concatenate([column, np.zeros(pad, dtype=column.dtype)]))
+        self.amount_min = np.concatenate([self.amount_min, np.full(pad, np.nan)])
+        self.amount_max = np.concatenate([self.amount_max, np.full(pad, np.nan)])
+        self._csr = None
+
+    def add(self, senders, receivers, amounts):
+        """ Fold a batch of transfers (codes) into the running stats """
+        if len(senders) == 0:
+            return
+        n = max(len(self.transactions), int(senders.max()) + 1, int(receivers.max()) + 1)
+        self._grow(n)
+
+        sent = np.bincount(senders, minlength=n)
+        received = np.bincount(receivers, minlength=n)
+        self.out_degree += sent
+        self.in_degree += received
+        self.transactions += sent + received
+
+        amounts = np.asarray(amounts, dtype=np.float64)
+        self.amount_sum += np.bincount(senders, weights=amounts, minlength=n)
+        self.amount_sumsq += np.bincount(senders, weights=amounts * amounts, minlength=n)
+
+        # NaN is "nothing sent yet": fmin / fmax skip it
+        np.fmin.at(self.amount_min, senders, amounts)
+        np.fmax.at(self.amount_max, senders, amounts)
+
+    def refresh(self, tg, codes):
+        """
+        Recompute the numeric columns of ``codes`` from a TransactionGraph,
+        whose transfers are grouped by sender (e.g. after an incremental
+        update or expiry). Accounts left without transfers drop their tags.
+        """
+        self._grow(tg.number_of_nodes())
+        codes = np.asarray(codes, dtype=np.int64)
+        if len(codes) == 0:
+            return
+        self.out_degree[codes] = tg.out_transfers[codes]
+        self.in_degree[codes] = tg.in_transfers[codes]
+        self.transactions[codes] = self.out_degree[codes] + self.in_degree[codes]
+
+        # every transfer sent by ``codes``, tagged with its position in ``codes``
+        sent_from = tg.edge_ptr[tg.indptr]
+        lo, hi = sent_from[codes], sent_from[codes + 1]
+        lengths = hi - lo
+        owner = np.repeat(np.arange(len(codes)), lengths)
+        rows = np.arange(lengths.sum()) + np.repeat(lo - (np.cumsum(lengths) - lengths), lengths)
+        amounts = tg.amounts[rows].astype(np.float64)
+
+        self.amount_sum[codes] = np.bincount(owner, weights=amounts, minlength=len(codes))
+        self.amount_sumsq[codes] = np.bincount(owner, weights=amounts * amounts, minlength=len(codes))
+        low = np.full(len(codes), np.nan)
+        high = np.full(len(codes), np.nan)
+        np.fmin.at(low, owner, amounts)
+        np.fmax.at(high, owner, amounts)
+        self.amount_min[codes] = low
+        self.amount_max[codes] = high
+
+        dead = codes[self.transactions[codes] == 0]
+        if len(dead):
+            self.clear_tags(dead)
+
+    def amount_mean(self):
+        return self.amount_sum / np.maximum(self.out_degree, 1)
+
+    def amount_var(self):
+        """ Population variance of sent amounts """
+        mean = self.amount_mean()
+        return np.maximum(self.amount_sumsq / np.maximum(self.out_degree, 1) - mean * mean, 0.0)
+
+    # -----------------------------
+    # Tags
+    # -----------------------------
+    def pattern_bit(self, name):
+        if name not in self.pattern_names:
+            if len(self.pattern_names) == MAX_PATTERNS:
+                raise ValueError(f"more than {MAX_PATTERNS} distinct patterns")
+            self.pattern_names.append(name)
+        return np.uint64(1) << np.uint64(self.pattern_names.index(name))
+
+    def tag(self, codes, pattern, ring_id):
+        """ Mark accounts as taking part in ``pattern`` through ring ``ring_id`` """
+        codes = np.asarray(codes, dtype=np.int64)
+        self.patterns[codes] |= self.pattern_bit(pattern)
+
+        ring = self._ring_index.get(ring_id)
+        if ring is None:
+            ring = self._ring_index[ring_id] = len(self.ring_names)
+            self.ring_names.append(ring_id)
+        self._pairs.append((codes, np.full(len(codes), ring, dtype=np.int64)))
+        self._csr = None
+
+    def clear_tags(self, codes):
+        """ Drop every pattern and ring of these accounts """
+        codes = np.asarray(list(codes), dtype=np.int64)
+        codes = codes[(codes >= 0) & (codes < len(self.patterns))]
+        self.patterns[codes] = 0
+        self._flush()
+        keep = ~np.isin(self._ring_codes, codes)
+        self._ring_codes = self._ring_codes[keep]
+        self._ring_of = self._ring_of[keep]
+        self._csr = None
+
+    def _flush(self):
+        if self._pairs:
+            self._ring_codes = np.concatenate([self._ring_codes] + [c for c, _ in self._pairs])
+            self._ring_of = np.concatenate([self._ring_of] + [r for _, r in self._pairs])
+            self._pairs = []
+
+    def ring_csr(self):
+        """ (indptr, ring indices into ring_names): the rings of each code, CSR """
+        if self._csr is None:
+            self._flush()
+            n = len(self.transactions)
+            order = np.lexsort((self._ring_of, self._ring_codes))
+            indptr = np.zeros(n + 1, dtype=np.int64)
+            np.cumsum(np.bincount(self._ring_codes, minlength=n), out=indptr[1:])
+            self._csr = (indptr, self._ring_of[order])
+        return self._csr
+
+    def patterns_of(self, code):
+        bits = int(self.patterns[code])
+        return {name for i, name in enumerate(self.pattern_names) if bits >> i & 1}
+
+    def ring_ids_of(self, code):
+        indptr, rings = self.ring_csr()
+        return {self.ring_names[r] for r in rings[indptr[code]:indptr[code + 1]].tolist()}
+
+    def tags(self):
+        """ Everything the detectors wrote, to replay with ``set_tags`` (e.g. from a cache) """
+        self._flush()
+        return (
+            list(self.pattern_names), self.patterns.copy(),
+            list(self.ring_names), self._ring_codes.copy(), self._ring_of.copy(),
+        )
+
+    def set_tags(self, tags):
+        pattern_names, patterns, ring_names, ring_codes, ring_of = tags
+        self.pattern_names = list(pattern_names)
+        self.patterns = patterns.copy()
+        self.ring_names = list(ring_names)
+        self._ring_index = {name: i for i, name in enumerate(self.ring_names)}
+        self._pairs = []
+        self._ring_codes = ring_codes.copy()
+        self._ring_of = ring_of.copy()
+        self._csr = None
+
+    def nbytes(self):
+        self._flush()
+        columns = [getattr(self, name) for name in COLUMNS]
+        return sum(a.nbytes for a in (*columns, self._ring_codes, self._ring_of))
+
+
+class NodeView(Mapping):
+    """ One account of a NodeStats, read like the old per-account dict """
+
+    __slots__ = ("_stats", "_code")
+
+    KEYS = (
+        "transactions", "out_degree", "in_degree", "amount_mean", "amount_std",
+        "amount_min", "amount_max", "patterns", "ring_ids",
+    )
+
+    def __init__(self, stats, code):
+        self._stats = stats
+        self._code = code
+
+    def __getitem__(self, key):
+        s, c = self._stats, self._code
+        if key in ("transactions", "out_degree", "in_degree"):
+            return int(getattr(s, key)[c])
+        if key in ("amount_min", "amount_max"):
+            return float(getattr(s, key)[c])
+        if key == "amount_mean":
+            return float(s.amount_sum[c] / max(s.out_degree[c], 1))
+        if key == "amount_std":
+            sent = max(s.out_degree[c], 1)
+            mean = s.amount_sum[c] / sent
+            return float(np.sqrt(max(s.amount_sumsq[c] / sent - mean * mean, 0.0)))
+        if key == "patterns":
+            return s.patterns_of(c)
+        if key == "ring_ids":
+            return s.ring_ids_of(c)
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self.KEYS)
+
+    def __len__(self):
+        return len(self.KEYS)
@@ -1,24 +1,169 @@
-def format_output(suspicious_accounts, fraud_rings, node_stats, processing_time, G):
-
-    edges = []
-    for u, v in G.edges():
-        edges.append({
-            "source": u,
-            "target": v,
-            "amount": G[u][v]["amount"],
-    "timestamp": str(G[u][v]["timestamp"])
-        })
-
-    return {
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+EDGE_PAGE_LIMIT = 10_000
+
+
+def format_output(suspicious_accounts, fraud_rings, node_stats, processing_time, G,
+                  centrality=None, analysis_id=None, cases=None):
+    """
+    ``G`` is the TransactionGraph. Only edges between ring members go into
+    the response; the whole graph is served separately (see graph_store).
+    ``cases`` are the rings merged into investigation cases (app.case_builder).
+
+    Everything upstream works on account codes; this is where they turn
+    back into account ids.
+    """
+    edges = ring_edge_ids(G, fraud_rings)
+    accounts = G.accounts
+    suspicious_accounts = [
+        {**a, "account_id": accounts[a["account_id"]]} for a in suspicious_accounts
+    ]
+    fraud_rings = decode_rings(G, fraud_rings)
+    cases = decode_rings(G, cases or [])
+
+    summary = {
+        "total_accounts_analyzed": len(node_stats),
+        "suspicious_accounts_flagged": len(suspicious_accounts),
+        "fraud_rings_detected": len(fraud_rings),
+        "cases_detected": len(cases),
+        "processing_time_seconds": processing_time
+    }
+    if centrality is not None:
+        summary["centrality"] = centrality
+
+    output = {
         "suspicious_accounts": suspicious_accounts,
         "fraud_rings": fraud_rings,
+        "cases": cases,
         "graph": {
-            "edges": edges
+            "scope": "rings",
+            "total_edges": G.number_of_edges(),
+            "edges": edge_records(G, edges)
         },
-        "summary": {
-            "total_accounts_analyzed": len(node_stats),
-            "suspicious_accounts_flagged": len(suspicious_accounts),
-            "fraud_rings_detected": len(fraud_rings),
-            "processing_time_seconds": processing_time
-        }
+        "summary": summary
+    }
+    if analysis_id is not None:
+        output["analysis_id"] = analysis_id
+    return output
+
+
+def decode_rings(G, fraud_rings):
+    """ Copies of the rings with member codes turned into account ids """
+    return [
+        {**ring, "member_accounts": G.accounts[ring["member_accounts"]].tolist()}
+        for ring in fraud_rings
+    ]
+
+
+# -----------------------------
+# Edge selections
+# -----------------------------
+def ring_edge_ids(G, fraud_rings):
+    """ Edge ids with both ends in some ring (members are codes) """
+    mask = np.zeros(G.number_of_nodes(), dtype=bool)
+    mask[[m for ring in fraud_rings for m in ring["member_accounts"]]] = True
+    return np.flatnonzero(mask[G.edge_src] & mask[G.indices])
+
+
+# -----------------------------
+# Encodings
+# -----------------------------
+def edge_records(G, edges):
+    """ JSON edge dicts: total amount and latest timestamp per sender/receiver pair """
+    edges = np.asarray(edges, dtype=np.int64)
+    if len(edges) == 0:
+        return []
+    timestamps = pd.to_datetime(G.edge_latest()[edges]).astype(str).tolist()
+    return [
+        {"source": u, "target": v, "amount": a, "timestamp": t}
+        for u, v, a, t in zip(
+            G.accounts[G.edge_src[edges]].tolist(),
+            G.accounts[G.indices[edges]].tolist(),
+            G.edge_totals()[edges].tolist(),
+            timestamps
+        )
+    ]
+
+
+def edges_arrow(G, edges=None):
+    """
+    Arrow IPC stream of edges (all by default): dictionary-encoded
+    source/target, amount, transfers and timestamp columns.
+    """
+    import pyarrow as pa
+
+    if edges is None:
+        edges = np.arange(G.number_of_edges())
+    dictionary = pa.array(G.accounts.tolist(), type=pa.string())
+    table = pa.table({
+        "source": pa.DictionaryArray.from_arrays(G.edge_src[edges].astype(np.int32), dictionary),
+        "target": pa.DictionaryArray.from_arrays(G.indices[edges].astype(np.int32), dictionary),
+        "amount": G.edge_totals()[edges],
+        "transfers": np.diff(G.edge_ptr)[edges],
+        "timestamp": pa.array(G.edge_latest()[edges], type=pa.timestamp("ns")),
+    })
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def write_result_parquet(result, directory):
+    """
+    A result as Parquet tables in ``directory``: accounts.parquet (the
+    suspicious accounts), rings.parquet (one row per ring, members as a
+    list column), cases.parquet (likewise, one row per case) and
+    summary.json. Returns the paths written.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    os.makedirs(directory, exist_ok=True)
+    accounts = pa.table({
+        "account_id": pa.array([a["account_id"] for a in result["suspicious_accounts"]], pa.string()),
+        "suspicion_score": pa.array([a["suspicion_score"] for a in result["suspicious_accounts"]], pa.float64()),
+        "detected_patterns": pa.array(
+            [a["detected_patterns"] for a in result["suspicious_accounts"]], pa.list_(pa.string())
+        ),
+        "ring_id": pa.array([a["ring_id"] for a in result["suspicious_accounts"]], pa.string()),
+        "case_id": pa.array([a.get("case_id", "") for a in result["suspicious_accounts"]], pa.string()),
+    })
+    rings = pa.table({
+        "ring_id": pa.array([r["ring_id"] for r in result["fraud_rings"]], pa.string()),
+        "pattern_type": pa.array([r["pattern_type"] for r in result["fraud_rings"]], pa.string()),
+        "risk_score": pa.array([r["risk_score"] for r in result["fraud_rings"]], pa.float64()),
+        "member_accounts": pa.array(
+            [r["member_accounts"] for r in result["fraud_rings"]], pa.list_(pa.string())
+        ),
+    })
+
+    cases = result.get("cases", [])
+    cases = pa.table({
+        "case_id": pa.array([c["case_id"] for c in cases], pa.string()),
+        "pattern_type": pa.array([c["pattern_type"] for c in cases], pa.string()),
+        "risk_score": pa.array([c["risk_score"] for c in cases], pa.float64()),
+        "total_flow": pa.array([c["total_flow"] for c in cases], pa.float64()),
+        "transfers": pa.array([c["transfers"] for c in cases], pa.int64()),
+        "first_seen": pa.array(pd.to_datetime([c["first_seen"] for c in cases]), pa.timestamp("ns")),
+        "last_seen": pa.array(pd.to_datetime([c["last_seen"] for c in cases]), pa.timestamp("ns")),
+        "ring_ids": pa.array([c["ring_ids"] for c in cases], pa.list_(pa.string())),
+        "member_accounts": pa.array([c["member_accounts"] for c in cases], pa.list_(pa.string())),
+    })
+
+    paths = {
+        "accounts": os.path.join(directory, "accounts.parquet"),
+        "rings": os.path.join(directory, "rings.parquet"),
+        "cases": os.path.join(directory, "cases.parquet"),
+        "summary": os.path.join(directory, "summary.json"),
     }
+    pq.write_table(accounts, paths["accounts"])
+    pq.write_table(rings, paths["rings"])
+    pq.write_table(cases, paths["cases"])
+    with open(paths["summary"], "w") as f:
+        json.dump(result["summary"], f, indent=1, default=str)
+    return paths
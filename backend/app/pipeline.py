@@ -0,0 +1,203 @@
+import os
+import time
+
+from app import centrality as centrality_config
+from app import scoring as scoring_config
+from app.cache import config_fingerprint, digest, get_cache, graph_digest, source_digest
+from app.instrumentation import count, recording, stage
+from app.ingest import GraphAccumulator, iter_transaction_chunks
+from app.detectors import detector_modules, enabled_detectors, run_detectors
+from app.centrality import compute_centralities
+from app.scoring import calculate_suspicion
+from app.case_builder import assign_cases, build_cases
+from app.output_formatter import format_output
+from app.snapshot import write_snapshot
+
+# one stage per enabled detector (RIFT_DETECTORS)
+DETECTOR_STAGES = enabled_detectors()
+STAGES = ["parse", "graph", *DETECTOR_STAGES, "scoring"]
+
+# bump when the shape of a cached stage value changes
+CACHE_VERSION = 6
+
+
+def _skip(on_stage, names):
+    """ Stages answered from the cache still report progress """
+    if on_stage:
+        for name in names:
+            on_stage(name, "running")
+            on_stage(name, "done")
+
+
+def _cache_keys(data_key):
+    """ Chained stage keys: each one covers the settings of every stage before it """
+    detectors = digest(
+        CACHE_VERSION, "detectors", data_key,
+        config_fingerprint(*detector_modules()),
+    )
+    centrality = digest(
+        CACHE_VERSION, "centrality", detectors, config_fingerprint(centrality_config)
+    )
+    result = digest(
+        CACHE_VERSION, "result", centrality, config_fingerprint(scoring_config)
+    )
+    return detectors, centrality, result
+
+
+def run_analysis(source, on_stage=None, return_graph=False, use_cache=True, snapshot=None):
+    """
+    Full analysis of a transactions CSV (path or file object).
+
+    ``on_stage(name, status)`` is called with "running" / "done" around each
+    of STAGES; it may raise to abort the run between stages.
+    ``return_graph`` returns (result, TransactionGraph) so the caller can keep
+    the graph for the paged graph endpoints.
+
+    ``summary.stages`` has wall / CPU time, RSS change and item counts for
+    every stage that ran (see app.instrumentation).
+
+    With the cache on (see app.cache), an identical upload skips parsing,
+    identical data and settings return the stored result, and otherwise only
+    the stages whose settings changed run again: a scoring change reuses the
+    detectors and centralities. ``summary.cache`` says what was reused.
+    ``use_cache=False`` runs every stage (e.g. when profiling).
+
+    ``snapshot`` is a directory to write the analysis to as a memory-mapped
+    snapshot (see app.snapshot), for other processes or a restart to serve.
+    """
+    with recording() as rec:
+        result, tg = _run(source, on_stage, get_cache() if use_cache else None, snapshot)
+    result["summary"]["stages"] = rec.stages
+    if return_graph:
+        return result, tg
+    return result
+
+
+def _run(source, on_stage, cache, snapshot=None):
+    start_time = time.time()
+    cache_status = {}
+
+    # -----------------------------
+    # Load CSV + Build Graph
+    # -----------------------------
+    # chunks are streamed straight into the CSR graph, so the raw upload is
+    # never held as a DataFrame
+    raw_key = source_digest(source) if cache else None
+    graph_key = digest(CACHE_VERSION, "graph", raw_key) if raw_key else None
+    cached = cache.get(graph_key) if graph_key else None
+
+    if cached is not None:
+        tg, node_stats, data_key = cached
+        cache_status["graph"] = "hit"
+        _skip(on_stage, ["parse", "graph"])
+    else:
+        with stage("parse", on_stage):
+            acc = GraphAccumulator()
+            for chunk in iter_transaction_chunks(source):
+                acc.add(chunk)
+                count("rows", len(chunk))
+                count("chunks")
+
+        with stage("graph", on_stage):
+            tg, node_stats = acc.build()
+            count("accounts", tg.number_of_nodes())
+            count("edges", tg.number_of_edges())
+            count("transfers", tg.number_of_transfers())
+            data_key = graph_digest(tg) if cache else None
+            if graph_key:
+                cache.put(graph_key, (tg, node_stats, data_key))
+                cache_status["graph"] = "miss"
+
+    if cache:
+        detectors_key, centrality_key, result_key = _cache_keys(data_key)
+        result = cache.get(result_key)
+        if result is not None:
+            _skip(on_stage, DETECTOR_STAGES + ["scoring"])
+            cache_status["result"] = "hit"
+            result["summary"]["processing_time_seconds"] = round(time.time() - start_time, 2)
+            result["summary"]["cache"] = cache_status
+            if snapshot:
+                # the stages that fed this result are cached too, unless evicted
+                detected = cache.get(detectors_key)
+                if detected is not None:
+                    node_stats.set_tags(detected[1])
+                pagerank, betweenness, _ = cache.get(centrality_key) or (None, None, None)
+                _snapshot(snapshot, tg, result, node_stats if detected else None, pagerank, betweenness)
+            return result, tg
+        cache_status["result"] = "miss"
+
+    # -----------------------------
+    # Run All Detectors
+    # -----------------------------
+    cached = cache.get(detectors_key) if cache else None
+    if cached is not None:
+        fraud_rings, tags = cached
+        node_stats.set_tags(tags)
+        cache_status["detectors"] = "hit"
+        _skip(on_stage, DETECTOR_STAGES)
+    else:
+        # detectors run side by side over shared indexes, one stage each
+        fraud_rings = run_detectors(tg, node_stats, on_stage=on_stage)
+
+        if cache:
+            cache.put(detectors_key, (fraud_rings, node_stats.tags()))
+            cache_status["detectors"] = "miss"
+
+    # -----------------------------
+    # Suspicion Scoring
+    # -----------------------------
+    with stage("scoring", on_stage):
+        cached = cache.get(centrality_key) if cache else None
+        if cached is not None:
+            pagerank, betweenness, centrality = cached
+            cache_status["centrality"] = "hit"
+        else:
+            pagerank, betweenness, centrality = compute_centralities(None, fraud_rings, tg=tg)
+            # time-degraded or failed centralities are not worth keeping
+            complete = all(r["status"] in ("ok", "skipped") for r in centrality.values())
+            if cache and complete:
+                cache.put(centrality_key, (pagerank, betweenness, centrality))
+                cache_status["centrality"] = "miss"
+
+        suspicious_accounts = calculate_suspicion(
+            tg,
+            node_stats,
+            fraud_rings,
+            pagerank=pagerank,
+            betweenness=betweenness
+        )
+        cases = build_cases(tg, fraud_rings)
+        assign_cases(suspicious_accounts, cases)
+        count("accounts", tg.number_of_nodes())
+        count("flagged", len(suspicious_accounts))
+        count("cases", len(cases))
+
+    processing_time = round(time.time() - start_time, 2)
+
+    # -----------------------------
+    # Final Output
+    # -----------------------------
+    with stage("output"):
+        result = format_output(
+            suspicious_accounts,
+            fraud_rings,
+            node_stats,
+            processing_time,
+            tg,
+            centrality=centrality,
+            cases=cases
+        )
+        count("edges", len(result["graph"]["edges"]))
+    if cache:
+        if "centrality" in cache_status:
+            cache.put(result_key, result)
+        result["summary"]["cache"] = cache_status
+    if snapshot:
+        _snapshot(snapshot, tg, result, node_stats, pagerank, betweenness)
+    return result, tg
+
+
+def _snapshot(path, tg, result, node_stats, pagerank, betweenness):
+    with stage("snapshot"):
+        write_snapshot(path, tg, result, node_stats, pagerank, betweenness)
+        count("bytes", os.path.getsize(os.path.join(path, "arrays.bin")))
@@ -0,0 +1,161 @@
+"""
+Account-level graph queries (k-hop ego networks, transfers among a set of
+accounts, ring members with their edges) answered from a per-graph index,
+so a query costs what it returns rather than a pass over every edge.
+"""
+import numpy as np
+import pandas as pd
+
+from app.account_index import gather, spans
+
+
+class QueryIndex:
+    """
+    Precomputed once per stored graph (see GraphStore.index), all plain
+    arrays (ARRAYS), so a snapshot can store and memory-map them:
+
+        nbr[nbr_ptr[a]:nbr_ptr[a+1]]   distinct counterparties of a, either direction
+        edge_amount / edge_latest      per edge: total amount, latest transfer (ns)
+        account_order                  codes sorted by account id, for id lookups
+
+    Edges among a set of accounts come straight off the graph's forward CSR
+    (out-edge ranges of the set, filtered by receiver), and their transfers
+    off ``edge_ptr``.
+    """
+
+    ARRAYS = ("nbr", "nbr_ptr", "edge_amount", "edge_latest", "account_order")
+
+    def __init__(self, tg, arrays):
+        self.tg = tg
+        for name in self.ARRAYS:
+            setattr(self, name, arrays[name])
+
+    @classmethod
+    def from_graph(cls, tg):
+        n = tg.number_of_nodes()
+        src = np.concatenate([tg.edge_src, tg.indices]).astype(np.int64)
+        dst = np.concatenate([tg.indices, tg.edge_src]).astype(np.int64)
+        pairs = np.unique(src * n + dst)
+        nbr_ptr = np.zeros(n + 1, dtype=np.int64)
+        if n:
+            np.cumsum(np.bincount(pairs // n, minlength=n), out=nbr_ptr[1:])
+        return cls(tg, {
+            "nbr": (pairs % max(n, 1)).astype(np.int32),
+            "nbr_ptr": nbr_ptr,
+            "edge_amount": tg.edge_totals(),
+            "edge_latest": tg.edge_latest(),
+            "account_order": np.argsort(tg.accounts.astype(str), kind="stable"),
+        })
+
+    def codes(self, accounts):
+        """ Codes for account ids; -1 for unknown ids """
+        accounts = np.asarray(list(accounts), dtype=str)
+        if not len(self.account_order):
+            return np.full(len(accounts), -1, dtype=np.int64)
+        pos = np.searchsorted(self.tg.accounts, accounts, sorter=self.account_order)
+        codes = self.account_order[np.minimum(pos, len(self.account_order) - 1)].astype(np.int64)
+        codes[self.tg.accounts[codes].astype(str) != accounts] = -1
+        return codes
+
+    # -----------------------------
+    # Queries (edge ids / transfer rows)
+    # -----------------------------
+    def ego(self, code, hops):
+        """
+        Accounts within ``hops`` of ``code`` (either direction) and the edges
+        among them -> (accounts, hop of each, edge ids). Edges are ordered by
+        the farther hop of their two ends, then by id, so the closest part
+        of the network comes first.
+        """
+        n = self.tg.number_of_nodes()
+        dist = np.full(n, -1, dtype=np.int8)
+        dist[code] = 0
+        frontier = np.array([code], dtype=np.int64)
+        reached = [frontier]
+        for hop in range(1, hops + 1):
+            step = gather(self.nbr, self.nbr_ptr[frontier], self.nbr_ptr[frontier + 1])
+            step = step[dist[step] < 0]
+            if not len(step):
+                break
+            frontier = np.unique(step).astype(np.int64)
+            dist[frontier] = hop
+            reached.append(frontier)
+        accounts = np.sort(np.concatenate(reached))
+
+        edges = self._edges_from(accounts, dist >= 0)
+        far = np.maximum(dist[self.tg.edge_src[edges]], dist[self.tg.indices[edges]])
+        edges = edges[np.argsort(far, kind="stable")]
+        return accounts, dist[accounts], edges
+
+    def edges_among(self, codes):
+        """ Edge ids with both ends in ``codes``, in id order """
+        codes = np.unique(np.asarray(codes, dtype=np.int64))
+        codes = codes[codes >= 0]
+        member = np.zeros(self.tg.number_of_nodes(), dtype=bool)
+        member[codes] = True
+        return self._edges_from(codes, member)
+
+    def transfers_among(self, codes):
+        """ Transfer rows (positions in the graph's amounts / timestamps) among ``codes``, oldest first """
+        edges = self.edges_among(codes)
+        ptr = self.tg.edge_ptr
+        rows = spans(ptr[edges], ptr[edges + 1])
+        return rows[np.argsort(self.tg.timestamps[rows], kind="stable")], edges
+
+    def _edges_from(self, codes, member):
+        """ Out-edges of sorted ``codes`` whose receiver is in ``member`` (id order) """
+        indptr = self.tg.indptr
+        edges = spans(indptr[codes], indptr[codes + 1])
+        return edges[member[self.tg.indices[edges]]]
+
+    # -----------------------------
+    # Records
+    # -----------------------------
+    def edge_records(self, edges):
+        """ Same format as output_formatter.edge_records, off the precomputed columns """
+        edges = np.asarray(edges, dtype=np.int64)
+        if not len(edges):
+            return []
+        tg = self.tg
+        timestamps = pd.to_datetime(self.edge_latest[edges]).astype(str).tolist()
+        return [
+            {"source": u, "target": v, "amount": a, "timestamp": t}
+            for u, v, a, t in zip(
+                tg.accounts[tg.edge_src[edges]].tolist(),
+                tg.accounts[tg.indices[edges]].tolist(),
+                self.edge_amount[edges].tolist(),
+                timestamps,
+            )
+        ]
+
+    def transfer_records(self, rows, edges):
+        """ One dict per transfer row; ``edges`` covers every row's edge """
+        rows = np.asarray(rows, dtype=np.int64)
+        if not len(rows):
+            return []
+        tg = self.tg
+        edge = edges[np.searchsorted(tg.edge_ptr[edges], rows, side="right") - 1]
+        timestamps = pd.to_datetime(tg.timestamps[rows]).astype(str).tolist()
+        return [
+            {"sender_id": u, "receiver_id": v, "amount": round(a, 2), "timestamp": t}
+            for u, v, a, t in zip(
+                tg.accounts[tg.edge_src[edge]].tolist(),
+                tg.accounts[tg.indices[edge]].tolist(),
+                tg.amounts[rows].astype(np.float64).tolist(),
+                timestamps,
+            )
+        ]
+
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in self.ARRAYS)
+
+
+def page(items, offset, limit):
+    """ items[offset:offset + limit] plus the paging fields of a response """
+    total = len(items)
+    return items[offset:offset + limit], {
+        "total": total,
+        "offset": offset,
+        "limit": limit,
+        "truncated": offset + limit < total,
+    }
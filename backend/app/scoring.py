@@ -1,50 +1,105 @@
 import numpy as np
-import networkx as nx
 
-def calculate_suspicion(G, node_stats, fraud_rings):
+from app.centrality import compute_centralities
 
-    try:
-        pagerank = nx.pagerank(G, max_iter=50)
-        betweenness = nx.betweenness_centrality(G)
-    except:
-        pagerank = {}
-        betweenness = {}
+# pattern flags, one bit each
+CYCLE = 1
+SMURFING = 2
+SHELL_NETWORK = 4
 
-    suspicious = []
+PATTERN_POINTS = ((CYCLE, 40), (SMURFING, 30), (SHELL_NETWORK, 20))
+CENTRALITY_WEIGHT = 20
+BUSY_TX = 20                # transactions for the activity bonus
+BUSY_POINTS = 10
+UNIFORM_MIN_TX = 100        # false-positive control: many, near-identical
+UNIFORM_CV = 0.1            # payments (std < 10% of mean) look like payroll
+UNIFORM_DAMPENING = 0.3
+SCORE_CUTOFF = 5
+
+
+def pattern_flags(pattern_names):
+    flags = 0
+    if any("cycle" in p for p in pattern_names):
+        flags |= CYCLE
+    if "smurfing" in pattern_names:
+        flags |= SMURFING
+    if "shell_network" in pattern_names:
+        flags |= SHELL_NETWORK
+    return flags
+
+
+def pattern_masks(n, node_stats, fraud_rings):
+    """
+    Scoring flags over n account codes, mapped from node_stats' pattern
+    bitmask column one pattern name at a time. Detectors only tag ring
+    members, so only those are kept.
+    """
+    masks = np.zeros(n, dtype=np.uint8)
+    members = [m for ring in fraud_rings for m in ring["member_accounts"]]
+    if not members:
+        return masks
 
-    for node, data in node_stats.items():
+    known = min(n, len(node_stats.patterns))
+    bits = node_stats.patterns[:known]
+    for i, name in enumerate(node_stats.pattern_names):
+        flag = pattern_flags({name})
+        if flag:
+            masks[:known] |= np.where((bits >> np.uint64(i)) & np.uint64(1), flag, 0).astype(np.uint8)
 
-        score = 0
+    in_ring = np.zeros(n, dtype=bool)
+    in_ring[members] = True
+    masks[~in_ring] = 0
+    return masks
 
-        if any("cycle" in p for p in data["patterns"]):
-            score += 40
 
-        if "smurfing" in data["patterns"]:
-            score += 30
+def aligned(values, n):
+    """ {code: value} (or an aligned array) -> float array over n account codes """
+    if isinstance(values, np.ndarray):
+        return values
+    out = np.zeros(n)
+    if values:
+        codes = np.fromiter(values.keys(), dtype=np.int64, count=len(values))
+        out[codes] = np.fromiter(values.values(), dtype=np.float64, count=len(values))
+    return out
 
-        if "shell_network" in data["patterns"]:
-            score += 20
 
-        score += pagerank.get(node, 0) * 20
-        score += betweenness.get(node, 0) * 20
+def calculate_suspicion(tg, node_stats, fraud_rings, pagerank=None, betweenness=None):
+    """
+    Columnar scoring over the TransactionGraph's accounts; only accounts
+    above the cutoff become dicts (``account_id`` is still the code).
+    """
 
-        if data["transactions"] >= 20:
-            score += 10
+    # centralities normally come from compute_centralities so the pipeline
+    # can report how they were computed
+    if pagerank is None or betweenness is None:
+        pagerank, betweenness, _ = compute_centralities(None, fraud_rings, tg=tg)
 
-        # FALSE POSITIVE CONTROL
-        avg = np.mean(data["amounts"]) if data["amounts"] else 0
-        std = np.std(data["amounts"]) if data["amounts"] else 0
+    n = tg.number_of_nodes()
+    masks = pattern_masks(n, node_stats, fraud_rings)
 
-        if data["transactions"] > 100 and std < avg * 0.1:
-            score *= 0.3
+    score = np.zeros(n)
+    for bit, points in PATTERN_POINTS:
+        score += np.where(masks & bit, points, 0)
 
-        if score > 5:
-            suspicious.append({
-                "account_id": node,
-                "suspicion_score": round(min(score, 100), 2),
-                "detected_patterns": sorted(list(data["patterns"])),
-                "ring_id": sorted(list(data["ring_ids"]))[0] if data["ring_ids"] else ""
-            })
+    score += aligned(pagerank, n) * CENTRALITY_WEIGHT
+    score += aligned(betweenness, n) * CENTRALITY_WEIGHT
+
+    tx = tg.out_transfers + tg.in_transfers
+    score += np.where(tx >= BUSY_TX, BUSY_POINTS, 0)
+
+    # FALSE POSITIVE CONTROL
+    uniform = (tx > UNIFORM_MIN_TX) & (tg.out_amount_std < tg.out_amount_mean * UNIFORM_CV)
+    score = np.where(uniform, score * UNIFORM_DAMPENING, score)
+
+    suspicious = []
+    for i in np.flatnonzero(score > SCORE_CUTOFF).tolist():
+        ring_ids = node_stats.ring_ids_of(i)
+        suspicious.append({
+            "account_id": i,
+            "suspicion_score": round(min(float(score[i]), 100), 2),
+            "detected_patterns": sorted(node_stats.patterns_of(i)),
+            "ring_id": min(ring_ids) if ring_ids else ""
+        })
 
     suspicious.sort(key=lambda x: x["suspicion_score"], reverse=True)
 
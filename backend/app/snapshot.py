@@ -0,0 +1,327 @@
+"""
+On-disk snapshots of an analyzed dataset, memory-mapped when opened.
+
+A snapshot is a directory with two files:
+
+    manifest.json   format name and version, the analysis summary, small
+                    lists (pattern / ring names) and where each array lives
+    arrays.bin      every array back to back, each at a 64-byte aligned
+                    offset: the graph's CSR and transfer columns, account
+                    ids, node stats, the query index, centrality vectors
+                    and the ring / case / account tables
+
+Opening one maps arrays.bin once (np.memmap) and wraps views of it, so it
+costs no parsing or rebuilding, and every process that opens the same
+snapshot shares one copy in the page cache. Everything read back is
+read-only.
+
+Tables (lists of dicts, e.g. fraud rings) are stored column by column:
+numbers as float64 (NaN = absent), strings as fixed-width unicode, lists
+as values plus offsets, member account lists as account codes, anything
+else as JSON text.
+
+The service's snapshots (RIFT_SNAPSHOT_DIR) are pruned as new ones are
+written: only the newest RIFT_SNAPSHOT_KEEP are kept, none older than
+RIFT_SNAPSHOT_MAX_AGE_H hours (see prune_snapshots).
+"""
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from app.node_stats import COLUMNS, NodeStats
+from app.query_index import QueryIndex
+from app.transaction_graph import STATE_ARRAYS, TransactionGraph
+
+SNAPSHOT_FORMAT = "rift-snapshot"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_DIR = os.environ.get("RIFT_SNAPSHOT_DIR") or None
+SNAPSHOT_KEEP = int(os.environ.get("RIFT_SNAPSHOT_KEEP", "100"))               # 0: no limit
+SNAPSHOT_MAX_AGE_H = float(os.environ.get("RIFT_SNAPSHOT_MAX_AGE_H", "168"))   # 0: no limit
+ALIGN = 64
+
+TABLES = ("fraud_rings", "cases", "suspicious_accounts")
+ACCOUNT_FIELDS = ("member_accounts", "account_id")
+SAFE_ID = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def snapshot_path(analysis_id, directory=None):
+    """ Where the snapshot of ``analysis_id`` lives; None with snapshots off (or an odd id) """
+    directory = directory or SNAPSHOT_DIR
+    if not directory or not SAFE_ID.match(analysis_id or ""):
+        return None
+    return os.path.join(directory, analysis_id)
+
+
+def prune_snapshots(directory=None, keep=None, max_age_h=None):
+    """
+    Delete the snapshots in ``directory`` (default RIFT_SNAPSHOT_DIR) past
+    the newest ``keep`` or older than ``max_age_h`` hours -> ids removed.
+    A process that has one open keeps reading it (the mapping outlives the
+    file); it just can't be opened again.
+    """
+    directory = directory or SNAPSHOT_DIR
+    keep = SNAPSHOT_KEEP if keep is None else keep
+    max_age_h = SNAPSHOT_MAX_AGE_H if max_age_h is None else max_age_h
+    if not directory or not os.path.isdir(directory):
+        return []
+
+    snapshots = []
+    for name in os.listdir(directory):
+        if not SAFE_ID.match(name):
+            continue    # e.g. a snapshot still being written
+        try:
+            snapshots.append((os.path.getmtime(os.path.join(directory, name, "manifest.json")), name))
+        except OSError:
+            continue
+    snapshots.sort(reverse=True)
+
+    oldest = time.time() - max_age_h * 3600
+    removed = [
+        name for i, (mtime, name) in enumerate(snapshots)
+        if (keep and i >= keep) or (max_age_h and mtime < oldest)
+    ]
+    for name in removed:
+        shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+    return removed
+
+
+# -----------------------------
+# Writing
+# -----------------------------
+def write_snapshot(path, tg, result, node_stats=None, pagerank=None, betweenness=None,
+                   query_index=None):
+    """
+    Snapshot of an analysis: its TransactionGraph, formatted ``result``
+    (ids decoded), NodeStats and centralities. The query index is built
+    here unless given. Written next to ``path`` and renamed into place, so
+    readers never see half a snapshot.
+    """
+    n = tg.number_of_nodes()
+    query_index = query_index or QueryIndex.from_graph(tg)
+    arrays = {"accounts": tg.accounts.astype(str)}
+    arrays.update((f"graph.{name}", getattr(tg, name)) for name in STATE_ARRAYS)
+    arrays.update((f"query.{name}", getattr(query_index, name)) for name in QueryIndex.ARRAYS)
+
+    manifest = {
+        "format": SNAPSHOT_FORMAT,
+        "version": SNAPSHOT_VERSION,
+        "summary": result["summary"],
+        "tables": {},
+    }
+    if node_stats is not None:
+        pattern_names, _, ring_names, ring_codes, ring_of = node_stats.tags()
+        arrays.update((f"stats.{name}", getattr(node_stats, name)) for name in COLUMNS)
+        arrays["stats.ring_codes"] = ring_codes
+        arrays["stats.ring_of"] = ring_of
+        manifest["node_stats"] = {"pattern_names": pattern_names, "ring_names": ring_names}
+    for name, values in (("pagerank", pagerank), ("betweenness", betweenness)):
+        if values is not None:
+            arrays[f"centrality.{name}"] = _dense(values, n)
+    for table in TABLES:
+        manifest["tables"][table] = _encode_table(table, result.get(table, []), query_index, arrays)
+
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix=".snapshot-", dir=parent)
+    try:
+        manifest["arrays"] = _write_arrays(os.path.join(tmp, "arrays.bin"), arrays)
+        with open(os.path.join(tmp, "manifest.json"), "w") as f:
+            json.dump(manifest, f, default=str)
+        if os.path.exists(path):
+            shutil.rmtree(path)
+        os.replace(tmp, path)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    return path
+
+
+def _dense(values, n):
+    """ {code: value} or an aligned array -> float64 array over n codes """
+    if isinstance(values, np.ndarray):
+        return values.astype(np.float64)
+    out = np.zeros(n)
+    if values:
+        out[np.fromiter(values.keys(), dtype=np.int64)] = np.fromiter(values.values(), dtype=np.float64)
+    return out
+
+
+def _write_arrays(path, arrays):
+    layout = {}
+    offset = 0
+    with open(path, "wb") as f:
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            pad = -offset % ALIGN
+            f.write(b"\0" * pad)
+            offset += pad
+            layout[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+            f.write(array.tobytes())
+            offset += array.nbytes
+    return layout
+
+
+def _encode_table(table, records, query_index, arrays):
+    """ Columns of ``records`` into ``arrays`` -> {field: kind} """
+    keys = dict.fromkeys(key for record in records for key in record)
+    fields = {}
+    for key in keys:
+        column = [record.get(key) for record in records]
+        kind = fields[key] = _kind(key, column)
+        name = f"{table}.{key}"
+        if kind in ("accounts", "list"):
+            lists = [value or [] for value in column]
+            arrays[f"{name}.offsets"] = np.cumsum([0] + [len(v) for v in lists], dtype=np.int64)
+            flat = [v for value in lists for v in value]
+            if kind == "accounts":
+                arrays[name] = query_index.codes(flat).astype(np.int32)
+            else:
+                arrays[name] = np.asarray(flat) if flat else np.zeros(0)
+        elif kind == "account":
+            arrays[name] = query_index.codes(column).astype(np.int32)
+        elif kind in ("int", "number"):
+            arrays[name] = np.array([np.nan if v is None else v for v in column], dtype=np.float64)
+        elif kind == "str":
+            arrays[name] = np.array(["" if v is None else v for v in column], dtype=str)
+        else:
+            arrays[name] = np.array([json.dumps(v, default=str) for v in column], dtype=str)
+    return {"rows": len(records), "fields": fields}
+
+
+def _kind(key, column):
+    """ How a column is stored; anything irregular goes out as JSON """
+    present = [v for v in column if v is not None]
+    if key in ACCOUNT_FIELDS:
+        return "accounts" if present and isinstance(present[0], list) else "account"
+    if present and all(_number(v) for v in present):
+        return "int" if all(isinstance(v, int) for v in present) else "number"
+    if len(present) == len(column) and all(isinstance(v, str) for v in present):
+        return "str"
+    if len(present) == len(column) and all(isinstance(v, list) for v in present):
+        flat = [x for v in present for x in v]
+        if all(isinstance(x, str) for x in flat) or all(_number(x) for x in flat):
+            return "list"
+    return "json"
+
+
+def _number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+# -----------------------------
+# Reading
+# -----------------------------
+class Snapshot:
+    """
+    An opened snapshot:
+
+        tg, node_stats, query_index    over memory-mapped arrays
+        pagerank, betweenness          arrays by account code (None if absent)
+        summary, analysis_id           (the directory name)
+        table(name)                    a stored table back as a list of dicts
+        ring(ring_id)                  one ring or case dict, by id
+    """
+
+    def __init__(self, path):
+        with open(os.path.join(path, "manifest.json")) as f:
+            manifest = json.load(f)
+        if manifest.get("format") != SNAPSHOT_FORMAT:
+            raise SnapshotError(f"{path} is not a snapshot")
+        if manifest.get("version") != SNAPSHOT_VERSION:
+            raise SnapshotError(
+                f"snapshot version {manifest.get('version')} (this build reads {SNAPSHOT_VERSION})"
+            )
+        self.path = path
+        self.manifest = manifest
+        self.summary = manifest["summary"]
+        self.analysis_id = os.path.basename(os.path.normpath(path))
+
+        buf = np.memmap(os.path.join(path, "arrays.bin"), dtype=np.uint8, mode="r")
+        self.arrays = {
+            name: np.ndarray(tuple(spec["shape"]), dtype=np.dtype(spec["dtype"]), buffer=buf, offset=spec["offset"])
+            for name, spec in manifest["arrays"].items()
+        }
+
+        a = self.arrays
+        self.tg = TransactionGraph.from_state(a["accounts"], {k: a[f"graph.{k}"] for k in STATE_ARRAYS})
+        self.query_index = QueryIndex(self.tg, {k: a[f"query.{k}"] for k in QueryIndex.ARRAYS})
+        self.node_stats = None
+        if "node_stats" in manifest:
+            names = manifest["node_stats"]
+            self.node_stats = NodeStats.from_columns(
+                {k: a[f"stats.{k}"] for k in COLUMNS},
+                names["pattern_names"], names["ring_names"], a["stats.ring_codes"], a["stats.ring_of"],
+            )
+        self.pagerank = a.get("centrality.pagerank")
+        self.betweenness = a.get("centrality.betweenness")
+        self._ring_rows = None
+
+    def table(self, name, rows=None):
+        """ Table ``name`` as dicts (account codes decoded); ``rows`` picks some """
+        spec = self.manifest["tables"][name]
+        rows = range(spec["rows"]) if rows is None else rows
+        columns = {key: self._column(name, key, kind) for key, kind in spec["fields"].items()}
+        out = []
+        for row in rows:
+            record = {}
+            for key, value in columns.items():
+                value = value(row)
+                if value is not None:
+                    record[key] = value
+            out.append(record)
+        return out
+
+    def _column(self, table, key, kind):
+        """ -> row -> value for one stored column """
+        name = f"{table}.{key}"
+        values = self.arrays[name]
+        accounts = self.tg.accounts
+        if kind in ("accounts", "list"):
+            offsets = self.arrays[f"{name}.offsets"]
+            if kind == "accounts":
+                return lambda row: accounts[values[offsets[row]:offsets[row + 1]]].tolist()
+            return lambda row: values[offsets[row]:offsets[row + 1]].tolist()
+        if kind == "account":
+            return lambda row: str(accounts[values[row]])
+        if kind in ("int", "number"):
+            cast = int if kind == "int" else float
+            return lambda row: None if np.isnan(values[row]) else cast(values[row])
+        if kind == "str":
+            return lambda row: str(values[row])
+        return lambda row: json.loads(str(values[row]))
+
+    def ring(self, ring_id):
+        """ A stored ring or case (by ring_id / case_id); None if unknown """
+        if self._ring_rows is None:
+            self._ring_rows = {}
+            for table, key in (("fraud_rings", "ring_id"), ("cases", "case_id")):
+                if key in self.manifest["tables"][table]["fields"]:
+                    ids = self.arrays[f"{table}.{key}"].tolist()
+                    self._ring_rows.update((i, (table, row)) for row, i in enumerate(ids))
+        found = self._ring_rows.get(ring_id)
+        if found is None:
+            return None
+        table, row = found
+        return self.table(table, [row])[0]
+
+    def result(self):
+        """ The stored analysis result (without the response's ring-edge graph) """
+        return {
+            **{table: self.table(table) for table in TABLES},
+            "summary": self.summary,
+            "analysis_id": self.analysis_id,
+        }
+
+
+def open_snapshot(path):
+    """ Snapshot at ``path`` (SnapshotError if it is not one this build reads) """
+    return Snapshot(path)
@@ -0,0 +1,147 @@
+"""
+Follow the money: where did what entered an account at time t go within
+the next N hops and H hours?
+
+Tracing is a time-respecting BFS over the AccountIndex (every account's
+transfers sorted by time, so "sent by these accounts after these times"
+is a binary search per account). Each hop only follows transfers made
+after the money reached the sender, and amounts are conserved: an
+account passes on at most what reached it, split over its qualifying
+transfers in proportion to their size.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from app.output_formatter import EDGE_PAGE_LIMIT, edge_records
+from app.transaction_graph import NS_PER_HOUR, to_epoch_ns
+
+TRACE_MAX_HOPS = int(os.environ.get("RIFT_TRACE_MAX_HOPS", "6"))
+TRACE_MAX_HOURS = int(os.environ.get("RIFT_TRACE_MAX_HOURS", str(24 * 90)))
+
+
+def trace_money(index, source, start, hops, hours, amount=None):
+    """
+    Trace from account code ``source``, starting at ``start`` (epoch ns),
+    for up to ``hops`` hops ending within ``hours``. ``amount`` is what
+    entered the source; None follows all of its outgoing transfers.
+
+    -> dict of arrays:
+        rows, flow, hop         traced transfers (positions in the index's
+                                transfer arrays), the traced amount each
+                                carried and the hop it was taken at
+        accounts, reached_hop,  every account reached, the hop and time
+        arrival, received       of first arrival and the traced amount
+                                that reached it
+    Accounts are expanded once, at the hop they are first reached; traced
+    money reaching them again later shows on the transfers only and is not
+    followed further.
+    """
+    deadline = start + int(hours * NS_PER_HOUR)
+    frontier = np.array([source], dtype=np.int64)
+    arrival = np.array([start], dtype=np.int64)
+    available = np.array([np.inf if amount is None else float(amount)])
+    visited = frontier.copy()
+
+    traced = {"rows": [], "flow": [], "hop": []}
+    reached = {"accounts": [], "reached_hop": [], "arrival": [], "received": []}
+
+    for hop in range(1, hops + 1):
+        # the first hop may leave at ``start``; later ones strictly after arrival
+        after = arrival if hop == 1 else arrival + 1
+        rows = index.outgoing(frontier, after, deadline)
+        if not len(rows):
+            break
+        owner = np.searchsorted(frontier, index.senders[rows])
+        amounts = index.amounts[rows].astype(np.float64)
+
+        # amount conservation: pass on at most what arrived, pro rata
+        sent = np.bincount(owner, weights=amounts, minlength=len(frontier))
+        share = np.minimum(1.0, available / np.maximum(sent, 1e-12))
+        flow = amounts * share[owner]
+        traced["rows"].append(rows)
+        traced["flow"].append(flow)
+        traced["hop"].append(np.full(len(rows), hop, dtype=np.int64))
+
+        # next frontier: accounts reached for the first time
+        receivers = index.receivers[rows].astype(np.int64)
+        fresh = ~np.isin(receivers, visited)
+        frontier, where = np.unique(receivers[fresh], return_inverse=True)
+        if not len(frontier):
+            break
+        arrival = np.full(len(frontier), np.iinfo(np.int64).max)
+        np.minimum.at(arrival, where, index.timestamps[rows][fresh])
+        available = np.bincount(where, weights=flow[fresh], minlength=len(frontier))
+        visited = np.union1d(visited, frontier)
+
+        reached["accounts"].append(frontier)
+        reached["reached_hop"].append(np.full(len(frontier), hop, dtype=np.int64))
+        reached["arrival"].append(arrival)
+        reached["received"].append(available)
+
+    out = {}
+    for key, parts in (*traced.items(), *reached.items()):
+        dtype = np.float64 if key in ("flow", "received") else np.int64
+        out[key] = np.concatenate(parts) if parts else np.zeros(0, dtype=dtype)
+    return out
+
+
+def traced_edges(tg, trace):
+    """
+    Traced transfers folded onto the graph's edges -> (edge ids, traced
+    amount per edge, first hop per edge), edges in id order.
+    """
+    edges = np.searchsorted(tg.edge_ptr, trace["rows"], side="right") - 1
+    ids, where = np.unique(edges, return_inverse=True)
+    flow = np.bincount(where, weights=trace["flow"], minlength=len(ids))
+    first_hop = np.full(len(ids), np.iinfo(np.int64).max)
+    np.minimum.at(first_hop, where, trace["hop"])
+    return ids, flow, first_hop
+
+
+def first_arrival(index, account):
+    """ Time of the first transfer into ``account`` (or out of it, if it never receives) """
+    rows = index.incoming(account)
+    if not len(rows):
+        rows = index.outgoing(account)
+    return int(index.timestamps[rows[0]]) if len(rows) else 0
+
+
+def parse_start(start):
+    """ Query timestamp string -> epoch ns (naive = UTC), as for the data """
+    return int(to_epoch_ns(pd.Series([start]))[0])
+
+
+def trace_result(tg, trace, start, limit=EDGE_PAGE_LIMIT):
+    """
+    JSON view of a trace: traced edges in the ``edge_records`` format plus
+    their traced amount and hop (largest flows first within each hop), and
+    every account reached.
+    """
+    ids, flow, first_hop = traced_edges(tg, trace)
+    order = np.lexsort((-flow, first_hop))[:limit]
+    edges = edge_records(tg, ids[order])
+    for record, f, h in zip(edges, flow[order].tolist(), first_hop[order].tolist()):
+        record["traced_amount"] = round(f, 2)
+        record["hop"] = h
+
+    arrivals = pd.to_datetime(trace["arrival"]).astype(str).tolist()
+    accounts = [
+        {"account_id": a, "hop": h, "arrival": t, "received": round(r, 2)}
+        for a, h, t, r in zip(
+            tg.accounts[trace["accounts"]].tolist(),
+            trace["reached_hop"].tolist(),
+            arrivals,
+            trace["received"].tolist(),
+        )
+    ]
+    first = trace["hop"] == 1
+    return {
+        "start": str(pd.Timestamp(start)),
+        "traced_amount": round(float(trace["flow"][first].sum()), 2),
+        "accounts": accounts,
+        "total": len(ids),
+        "truncated": len(ids) > limit,
+        "edges": edges,
+    }
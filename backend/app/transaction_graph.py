@@ -0,0 +1,358 @@
+import gc
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
+
+NS_PER_HOUR = 3600 * 10**9
+
+# every array a graph is made of, besides the account ids
+STATE_ARRAYS = (
+    "indptr", "indices", "edge_ptr", "amounts", "timestamps", "edge_src",
+    "in_indptr", "in_indices", "in_edges", "out_transfers", "in_transfers",
+    "out_amount_mean", "out_amount_std",
+)
+
+
+class TransactionGraph:
+    """
+    Multi-edge transaction graph stored as NumPy CSR arrays.
+
+    Accounts are dense int codes (``accounts[code]`` is the original id).
+    Two levels of offsets keep every transfer:
+
+        indptr[u]:indptr[u+1]        distinct edges out of u (indices = receivers, sorted)
+        edge_ptr[e]:edge_ptr[e+1]    transfers on edge e (amounts / timestamps, time-sorted)
+
+    The reverse CSR (in_indptr / in_indices / in_edges) gives predecessors and
+    points back at the forward edge ids. Timestamps are int64 epoch nanoseconds.
+
+    Per-account transfer counts and outgoing amount mean/std are reduced
+    once here so scoring never walks per-account amount lists.
+    """
+
+    def __init__(self, accounts, indptr, indices, edge_ptr, amounts, timestamps):
+        self.accounts = accounts
+        self.indptr = indptr
+        self.indices = indices
+        self.edge_ptr = edge_ptr
+        self.amounts = amounts
+        self.timestamps = timestamps
+
+        n = len(accounts)
+        m = len(indices)
+        self.edge_src = np.repeat(np.arange(n, dtype=np.int32), np.diff(indptr))
+
+        in_order = np.argsort(indices, kind="stable")
+        self.in_edges = in_order.astype(np.int64)
+        self.in_indices = self.edge_src[in_order]
+        self.in_indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(indices, minlength=n), out=self.in_indptr[1:])
+
+        self._index = None
+        self._m = m
+        self._grouped_stats()
+
+    def _grouped_stats(self):
+        n = len(self.accounts)
+        per_edge = np.diff(self.edge_ptr)
+        # a sender's edges are contiguous, so are its transfers
+        self.out_transfers = np.diff(self.edge_ptr[self.indptr])
+        self.in_transfers = np.bincount(self.indices, weights=per_edge, minlength=n).astype(np.int64)
+
+        src = np.repeat(self.edge_src, per_edge)
+        amounts = self.amounts.astype(np.float64)
+        sent = np.maximum(self.out_transfers, 1)
+        mean = np.bincount(src, weights=amounts, minlength=n) / sent
+        # two-pass variance: same numbers np.std gives on the amount list
+        var = np.bincount(src, weights=(amounts - mean[src]) ** 2, minlength=n) / sent
+        self.out_amount_mean = mean
+        self.out_amount_std = np.sqrt(var)
+
+    # -----------------------------
+    # Construction
+    # -----------------------------
+    @classmethod
+    def from_codes(cls, accounts, send_codes, recv_codes, amounts, timestamps_ns):
+        n = len(accounts)
+        send_codes = np.asarray(send_codes, dtype=np.int64)
+        recv_codes = np.asarray(recv_codes, dtype=np.int64)
+
+        order = np.lexsort((timestamps_ns, recv_codes, send_codes))
+        src = send_codes[order]
+        dst = recv_codes[order]
+
+        pair = src * n + dst
+        new_edge = np.ones(len(pair), dtype=bool)
+        new_edge[1:] = pair[1:] != pair[:-1]
+        edge_starts = np.flatnonzero(new_edge)
+
+        edge_ptr = np.append(edge_starts, len(pair)).astype(np.int64)
+        indices = dst[edge_starts].astype(np.int32)
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src[edge_starts], minlength=n), out=indptr[1:])
+
+        amounts = np.asarray(amounts)
+        if amounts.dtype.kind != "f":
+            amounts = amounts.astype(np.float64)
+
+        return cls(
+            np.asarray(accounts, dtype=object),
+            indptr,
+            indices,
+            edge_ptr,
+            amounts[order],
+            np.asarray(timestamps_ns, dtype=np.int64)[order],
+        )
+
+    @classmethod
+    def from_state(cls, accounts, arrays):
+        """
+        A graph from its STATE_ARRAYS as they are (e.g. memory-mapped from a
+        snapshot), without recomputing the reverse CSR or account columns.
+        """
+        tg = cls.__new__(cls)
+        tg.accounts = accounts
+        for name in STATE_ARRAYS:
+            setattr(tg, name, arrays[name])
+        tg._index = None
+        tg._m = len(tg.indices)
+        return tg
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame):
+        accounts, send_codes, recv_codes = factorize_accounts(
+            df["sender_id"].to_numpy(), df["receiver_id"].to_numpy()
+        )
+        return cls.from_codes(
+            accounts,
+            send_codes,
+            recv_codes,
+            df["amount"].to_numpy(),
+            to_epoch_ns(df["timestamp"]),
+        )
+
+    # -----------------------------
+    # Sizes
+    # -----------------------------
+    def number_of_nodes(self):
+        return len(self.accounts)
+
+    def number_of_edges(self):
+        return self._m
+
+    def number_of_transfers(self):
+        return len(self.amounts)
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in STATE_ARRAYS) + self.accounts.nbytes
+
+    def __getstate__(self):
+        # the label dict is rebuilt lazily; don't pickle it
+        state = self.__dict__.copy()
+        state["_index"] = None
+        return state
+
+    # -----------------------------
+    # Code-level access (O(1) slicing)
+    # -----------------------------
+    def code(self, account):
+        if self._index is None:
+            self._index = {acc: i for i, acc in enumerate(self.accounts.tolist())}
+        return self._index[account]
+
+    def codes(self, accounts):
+        """ Codes for many account ids at once; -1 for unknown ids """
+        return pd.Index(self.accounts).get_indexer(list(accounts))
+
+    def out_edges(self, u):
+        """ Edge ids leaving u; indices[e] is the receiver of edge e """
+        return range(self.indptr[u], self.indptr[u + 1])
+
+    def out_neighbors(self, u):
+        return self.indices[self.indptr[u]:self.indptr[u + 1]]
+
+    def in_neighbors(self, v):
+        return self.in_indices[self.in_indptr[v]:self.in_indptr[v + 1]]
+
+    def edge_id(self, u, v):
+        lo, hi = self.indptr[u], self.indptr[u + 1]
+        pos = lo + np.searchsorted(self.indices[lo:hi], v)
+        if pos < hi and self.indices[pos] == v:
+            return int(pos)
+        return -1
+
+    def edge_transfers(self, e):
+        """ (amounts, timestamps) of every transfer on edge e, time-sorted """
+        lo, hi = self.edge_ptr[e], self.edge_ptr[e + 1]
+        return self.amounts[lo:hi], self.timestamps[lo:hi]
+
+    def adjacency(self, weight=None, dtype=np.int8):
+        """
+        Sparse n x n adjacency sharing indptr/indices. weight=None gives 1 per
+        edge, "amount" the edge's total amount, "transfers" its transfer count.
+        """
+        n = self.number_of_nodes()
+        if weight is None:
+            data = np.ones(self._m, dtype=dtype)
+        elif weight == "amount":
+            data = np.add.reduceat(self.amounts.astype(np.float64), self.edge_ptr[:-1]) \
+                if self._m else np.zeros(0)
+        elif weight == "transfers":
+            data = np.diff(self.edge_ptr).astype(np.float64)
+        else:
+            raise ValueError(f"unknown edge weight {weight!r}")
+        return csr_matrix((data, self.indices, self.indptr), shape=(n, n))
+
+    def strong_components(self):
+        """ (n_components, labels) of the strongly connected components """
+        return connected_components(self.adjacency(), directed=True, connection="strong")
+
+    def reach(self, mask, hops, direction="both"):
+        """
+        Boolean mask of accounts within ``hops`` of ``mask``, following
+        out-edges ("out"), in-edges ("in") or both.
+        """
+        A = self.adjacency(dtype=np.int32)
+        if direction == "out":
+            step_from = A.T.tocsr()     # A.T @ x marks successors of x
+        elif direction == "in":
+            step_from = A               # A @ x marks predecessors of x
+        else:
+            step_from = (A + A.T).tocsr()
+
+        reach = np.asarray(mask, dtype=bool).copy()
+        frontier = reach
+        for _ in range(hops):
+            frontier = ((step_from @ frontier.astype(np.int32)) > 0) & ~reach
+            if not frontier.any():
+                break
+            reach |= frontier
+        return reach
+
+    def edge_totals(self):
+        """ Per edge: total amount (float64, rounded to cents) """
+        if not self._m:
+            return np.zeros(0)
+        return np.round(np.add.reduceat(self.amounts, self.edge_ptr[:-1], dtype=np.float64), 2)
+
+    def edge_latest(self):
+        """ Per edge: timestamp (epoch ns) of the latest transfer """
+        return self.timestamps[self.edge_ptr[1:] - 1]
+
+    def transfer_arrays(self):
+        """ Flat per-transfer (senders, receivers, amounts, timestamps) """
+        counts = np.diff(self.edge_ptr)
+        return (
+            np.repeat(self.edge_src, counts),
+            np.repeat(self.indices, counts),
+            self.amounts,
+            self.timestamps,
+        )
+
+    def out_degrees(self):
+        return np.diff(self.indptr)
+
+    def in_degrees(self):
+        return np.diff(self.in_indptr)
+
+    # -----------------------------
+    # Account-id convenience API
+    # -----------------------------
+    def nodes(self):
+        return self.accounts.tolist()
+
+    def successors(self, account):
+        return self.accounts[self.out_neighbors(self.code(account))].tolist()
+
+    def predecessors(self, account):
+        return self.accounts[self.in_neighbors(self.code(account))].tolist()
+
+    def out_degree(self, account):
+        u = self.code(account)
+        return int(self.indptr[u + 1] - self.indptr[u])
+
+    def in_degree(self, account):
+        v = self.code(account)
+        return int(self.in_indptr[v + 1] - self.in_indptr[v])
+
+    def has_edge(self, u, v):
+        return self.edge_id(self.code(u), self.code(v)) >= 0
+
+    def transfers(self, u, v):
+        e = self.edge_id(self.code(u), self.code(v))
+        if e < 0:
+            return self.amounts[:0], self.timestamps[:0]
+        return self.edge_transfers(e)
+
+    # -----------------------------
+    # NetworkX adapter
+    # -----------------------------
+    def to_networkx(self, nodes=None):
+        """
+        Collapse to a DiGraph for scoring: one edge per pair carrying the
+        total amount, the transfer count and the latest timestamp. Nodes
+        are account codes, like everything else before format_output.
+        ``nodes`` (boolean mask) keeps only the subgraph induced on them.
+        """
+        edges = np.arange(self._m)
+        node_codes = np.arange(self.number_of_nodes())
+        if nodes is not None:
+            edges = edges[nodes[self.edge_src] & nodes[self.indices]]
+            node_codes = np.flatnonzero(nodes)
+
+        counts = np.diff(self.edge_ptr)[edges]
+        totals = self.edge_totals()[edges]
+        latest = pd.to_datetime(self.edge_latest()[edges]).tolist()
+
+        # one int object per node, shared by every edge touching it (as
+        # the id strings were)
+        labels = np.arange(self.number_of_nodes()).astype(object)
+
+        G = nx.DiGraph()
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            G.add_nodes_from(labels[node_codes].tolist())
+            G.add_edges_from(
+                (u, v, {"amount": a, "transfers": c, "timestamp": t})
+                for u, v, a, c, t in zip(
+                    labels[self.edge_src[edges]].tolist(),
+                    labels[self.indices[edges]].tolist(),
+                    totals.tolist(),
+                    counts.tolist(),
+                    latest
+                )
+            )
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+        return G
+
+
+def factorize_accounts(senders, receivers):
+    """
+    Dense int codes for account ids. Sender/receiver are interleaved so codes
+    follow first-appearance order, exactly like row-by-row insertion.
+    """
+    interleaved = np.empty(2 * len(senders), dtype=object)
+    interleaved[0::2] = senders
+    interleaved[1::2] = receivers
+    codes, accounts = pd.factorize(interleaved)
+    return accounts, codes[0::2], codes[1::2]
+
+
+def by_account_id(accounts, codes):
+    """ Codes (any iterable) as a list ordered by their account ids """
+    return sorted(codes, key=accounts.__getitem__)
+
+
+def to_epoch_ns(timestamps):
+    """ datetime-like Series -> int64 epoch nanoseconds (naive = UTC) """
+    ts = pd.to_datetime(timestamps)
+    if getattr(ts.dt, "tz", None) is not None:
+        ts = ts.dt.tz_convert("UTC").dt.tz_localize(None)
+    return ts.to_numpy(dtype="datetime64[ns]").view(np.int64)
@@ -0,0 +1,106 @@
+"""
+Case building: the union-find over account codes vs. merging rings one at
+a time in Python (each ring's member sets folded into a dict of groups),
+on rings that overlap heavily: many short rings drawn from a few
+thousand mule networks, as cycle / smurf / shell detectors report
+the same networks over and over. The Python merge is the reference; both
+must give the same partition of the ring members.
+
+    cd backend
+    python -m benchmarks.bench_cases            # 100k, 1M rings
+    python -m benchmarks.bench_cases 300000
+"""
+import sys
+import time
+
+import numpy as np
+
+from app.case_builder import build_cases
+from app.transaction_graph import NS_PER_HOUR, TransactionGraph
+
+DEFAULT_SIZES = [100_000, 1_000_000]
+RINGS_PER_NETWORK = 20
+NETWORK_ACCOUNTS = 60
+RING_SIZE = (3, 8)
+PATTERNS = ["cycle", "fan_in_fan_out", "layered_shell"]
+
+
+def make_rings(n_rings, seed=11):
+    """ -> (TransactionGraph, rings): rings over clustered accounts, each ring's members paying in turn """
+    rng = np.random.default_rng(seed)
+    n_networks = max(1, n_rings // RINGS_PER_NETWORK)
+    n = n_networks * NETWORK_ACCOUNTS
+    sizes = rng.integers(*RING_SIZE, size=n_rings)
+    # every ring is drawn from one network's accounts, so rings chain into networks
+    network = rng.integers(0, n_networks, size=n_rings)
+    members = np.repeat(network, sizes) * NETWORK_ACCOUNTS + rng.integers(0, NETWORK_ACCOUNTS, int(sizes.sum()))
+
+    first = np.cumsum(sizes) - sizes
+    nxt = np.arange(len(members)) + 1
+    nxt[first + sizes - 1] = first
+    senders, receivers = members, members[nxt]
+    loop = senders != receivers
+    senders, receivers = senders[loop], receivers[loop]
+    amounts = rng.uniform(100, 10_000, len(senders)).astype(np.float32)
+    times = rng.integers(0, 24 * 30, len(senders)) * NS_PER_HOUR
+
+    accounts = np.array([f"ACC_{i:08d}" for i in range(n)], dtype=object)
+    tg = TransactionGraph.from_codes(accounts, senders, receivers, amounts, times)
+    member_lists = np.split(members, first[1:])
+    rings = [
+        {
+            "ring_id": f"RING_{i:07d}",
+            "member_accounts": m.tolist(),
+            "pattern_type": PATTERNS[i % len(PATTERNS)],
+            "risk_score": float(r),
+        }
+        for i, (m, r) in enumerate(zip(member_lists, rng.uniform(50, 100, n_rings).round(2)))
+    ]
+    return tg, rings
+
+
+# -----------------------------
+# Reference: merge rings one at a time
+# -----------------------------
+def merge_rings_python(fraud_rings):
+    group_of = {}
+    groups = {}
+    for i, ring in enumerate(fraud_rings):
+        members = set(ring["member_accounts"])
+        hit = {group_of[m] for m in members if m in group_of}
+        for g in hit:
+            members |= groups.pop(g)
+        groups[i] = members
+        for m in members:
+            group_of[m] = i
+    return list(groups.values())
+
+
+def same_partition(reference, cases):
+    return sorted(min(g) for g in reference) == sorted(min(c["member_accounts"]) for c in cases) and sorted(
+        len(g) for g in reference
+    ) == sorted(len(c["member_accounts"]) for c in cases)
+
+
+def main(sizes):
+    print(f"{'rings':>10} {'accounts':>10} {'python s':>9} {'cases s':>8} {'cases':>8} {'speedup':>8}  same")
+    for n_rings in sizes:
+        tg, rings = make_rings(n_rings)
+
+        t0 = time.perf_counter()
+        reference = merge_rings_python(rings)
+        python_s = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        cases = build_cases(tg, rings)
+        cases_s = time.perf_counter() - t0
+
+        print(
+            f"{n_rings:>10} {tg.number_of_nodes():>10} {python_s:>9.2f} {cases_s:>8.2f} "
+            f"{len(cases):>8} {python_s / cases_s:>7.1f}x  {same_partition(reference, cases)}"
+        )
+
+
+if __name__ == "__main__":
+    sizes = [int(a) for a in sys.argv[1:]] or DEFAULT_SIZES
+    main(sizes)
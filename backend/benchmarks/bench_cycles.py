@@ -0,0 +1,63 @@
+"""
+Time and peak-RSS growth of temporal cycle detection on the CSR graph,
+serial and SCC-partitioned across a process pool.
+
+    cd backend
+    python -m benchmarks.bench_cycles                         # 100k, 1M transfers, serial
+    python -m benchmarks.bench_cycles 1000000 --workers 1,8,32
+"""
+import argparse
+import copy
+import resource
+import time
+
+import numpy as np
+
+from app.detectors.cycle_detector import detect_cycles
+from app.graph_builder import build_transaction_graph
+from benchmarks.bench_graph_builder import make_transactions
+
+DEFAULT_SIZES = [100_000, 1_000_000]
+
+
+def cycle_tags(stats):
+    return {
+        code: (stats.patterns_of(code), stats.ring_ids_of(code))
+        for code in np.flatnonzero(stats.patterns).tolist()
+    }
+
+
+def main(sizes, worker_counts):
+    print(
+        f"{'transfers':>10} {'edges':>9} {'workers':>8} {'cycles s':>9} "
+        f"{'speedup':>8} {'+peak RSS MB':>13} {'rings':>6}  same"
+    )
+    for n_rows in sizes:
+        df = make_transactions(n_rows)
+        tg, node_stats = build_transaction_graph(df)
+
+        baseline = None
+        for workers in worker_counts:
+            stats = copy.deepcopy(node_stats)
+            rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            t0 = time.perf_counter()
+            rings = detect_cycles(tg, df, stats, workers=workers)
+            elapsed = time.perf_counter() - t0
+            rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+            if baseline is None:
+                baseline = (elapsed, rings, cycle_tags(stats))
+
+            print(
+                f"{n_rows:>10} {tg.number_of_edges():>9} {workers:>8} {elapsed:>9.2f} "
+                f"{baseline[0] / elapsed:>7.1f}x {(rss_after - rss_before) / 1024:>13.1f} "
+                f"{len(rings):>6}  {rings == baseline[1] and cycle_tags(stats) == baseline[2]}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("sizes", nargs="*", type=int, default=DEFAULT_SIZES)
+    parser.add_argument("--workers", default="1", help="comma-separated pool sizes")
+    args = parser.parse_args()
+    main(args.sizes, [int(w) for w in args.workers.split(",")])
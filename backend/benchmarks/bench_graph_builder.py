@@ -0,0 +1,94 @@
+"""
+Compare the columnar build_graph against the old df.iterrows() builder.
+
+    cd backend
+    python -m benchmarks.bench_graph_builder            # 10k, 100k, 1M rows
+    python -m benchmarks.bench_graph_builder 10000 50000
+"""
+import sys
+import time
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+
+from app.graph_builder import build_graph
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+
+
+def make_transactions(n_rows, n_accounts=None, seed=42):
+    rng = np.random.default_rng(seed)
+    n_accounts = n_accounts or max(100, n_rows // 10)
+    senders = rng.integers(0, n_accounts, n_rows)
+    receivers = (senders + rng.integers(1, n_accounts, n_rows)) % n_accounts
+    start = np.datetime64("2026-01-01T00:00:00")
+    offsets = np.sort(rng.integers(0, 30 * 24 * 3600, n_rows)).astype("timedelta64[s]")
+
+    return pd.DataFrame({
+        "transaction_id": [f"TX_{i:08d}" for i in range(n_rows)],
+        "sender_id": [f"ACC_{i:06d}" for i in senders],
+        "receiver_id": [f"ACC_{i:06d}" for i in receivers],
+        "amount": np.round(rng.lognormal(7, 1, n_rows), 2),
+        "timestamp": pd.Series(start + offsets).dt.strftime("%Y-%m-%d %H:%M:%S"),
+    })
+
+
+def build_graph_iterrows(df):
+    """ The pre-vectorization builder, kept here as the reference """
+    df["timestamp"] = pd.to_datetime(df["timestamp"])
+    G = nx.DiGraph()
+    node_stats = {}
+
+    for _, row in df.iterrows():
+        sender = row["sender_id"]
+        receiver = row["receiver_id"]
+
+        G.add_edge(sender, receiver, amount=row["amount"], timestamp=row["timestamp"])
+
+        for node in [sender, receiver]:
+            if node not in node_stats:
+                node_stats[node] = {
+                    "transactions": 0,
+                    "patterns": set(),
+                    "ring_ids": set(),
+                    "amounts": []
+                }
+
+        node_stats[sender]["transactions"] += 1
+        node_stats[receiver]["transactions"] += 1
+        node_stats[sender]["amounts"].append(row["amount"])
+
+    return G, node_stats
+
+
+def same_result(a, b):
+    G1, s1 = a
+    G2, s2 = b
+    return (
+        list(G1.nodes()) == list(G2.nodes())
+        and list(G1.edges(data=True)) == list(G2.edges(data=True))
+        and s1 == s2
+    )
+
+
+def timed(fn, df):
+    t0 = time.perf_counter()
+    out = fn(df.copy())
+    return time.perf_counter() - t0, out
+
+
+def main(sizes):
+    print(f"{'rows':>10} {'iterrows s':>12} {'columnar s':>12} {'speedup':>9}  match")
+    for n_rows in sizes:
+        df = make_transactions(n_rows)
+        t_old, old = timed(build_graph_iterrows, df)
+        t_new, new = timed(build_graph, df)
+        print(
+            f"{n_rows:>10} {t_old:>12.2f} {t_new:>12.2f} "
+            f"{t_old / t_new:>8.1f}x  {same_result(old, new)}"
+        )
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or DEFAULT_SIZES)
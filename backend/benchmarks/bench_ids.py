@@ -0,0 +1,222 @@
+"""
+Int32 account codes vs. raw id strings in what the detectors and scoring
+share: node_stats, ring members and their tags, score alignment, ring
+edge selection and the NetworkX graph betweenness runs on. The string
+versions are the pre-interning code, kept here as the reference; both run
+on the same parsed graph and detector rings (with planted patterns).
+
+    cd backend
+    python -m benchmarks.bench_ids            # 100k, 1M rows
+    python -m benchmarks.bench_ids 250000
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+
+from app.centrality import RING_HOPS, pivot_betweenness
+from app.detectors import run_detectors
+from app.detectors.cycle_detector import tag_cycle_members
+from app.graph_builder import compute_node_stats
+from app.ingest import read_transactions_csv
+from app.output_formatter import ring_edge_ids
+from app.scoring import aligned, pattern_masks
+from benchmarks.synthetic import write_dataset
+
+DEFAULT_SIZES = [100_000, 1_000_000]
+PIVOTS = 8
+
+
+# -----------------------------
+# String-keyed reference
+# -----------------------------
+def node_stats_by_id(accounts, send_codes, recv_codes, amounts):
+    n_nodes = len(accounts)
+    tx_counts = (
+        np.bincount(send_codes, minlength=n_nodes)
+        + np.bincount(recv_codes, minlength=n_nodes)
+    )
+    order = np.argsort(send_codes, kind="stable")
+    bounds = np.searchsorted(send_codes[order], np.arange(n_nodes + 1))
+    sorted_amounts = np.asarray(amounts)[order].tolist()
+
+    node_stats = {}
+    for i, acc in enumerate(accounts.tolist()):
+        node_stats[acc] = {
+            "transactions": int(tx_counts[i]),
+            "patterns": set(),
+            "ring_ids": set(),
+            "amounts": sorted_amounts[bounds[i]:bounds[i + 1]]
+        }
+    return node_stats
+
+
+def tag_cycle_members_by_id(node_stats, members, ring_id):
+    for acc in members:
+        node_stats[acc]["patterns"].add(f"cycle_length_{len(members)}")
+        node_stats[acc]["ring_ids"].add(ring_id)
+
+
+def pattern_masks_by_id(accounts, node_stats, fraud_rings):
+    from app.scoring import pattern_flags
+
+    members = list({m for ring in fraud_rings for m in ring["member_accounts"]})
+    masks = np.zeros(len(accounts), dtype=np.uint8)
+    flags = [pattern_flags(node_stats[m]["patterns"]) for m in members]
+    pos = pd.Index(accounts).get_indexer(members)
+    masks[pos] = flags
+    return masks
+
+
+def aligned_by_id(values, accounts):
+    out = np.zeros(len(accounts))
+    pos = pd.Index(accounts).get_indexer(list(values))
+    out[pos] = np.fromiter(values.values(), dtype=np.float64, count=len(values))
+    return out
+
+
+def ring_edge_ids_by_id(tg, fraud_rings):
+    members = tg.codes({m for ring in fraud_rings for m in ring["member_accounts"]})
+    mask = np.zeros(tg.number_of_nodes(), dtype=bool)
+    mask[members[members >= 0]] = True
+    return np.flatnonzero(mask[tg.edge_src] & mask[tg.indices])
+
+
+def to_networkx_by_id(tg, nodes):
+    edges = np.flatnonzero(nodes[tg.edge_src] & nodes[tg.indices])
+    G = nx.DiGraph()
+    G.add_nodes_from(tg.accounts[np.flatnonzero(nodes)].tolist())
+    G.add_edges_from(
+        (u, v, {"amount": a, "transfers": c, "timestamp": t})
+        for u, v, a, c, t in zip(
+            tg.accounts[tg.edge_src[edges]].tolist(),
+            tg.accounts[tg.indices[edges]].tolist(),
+            tg.edge_totals()[edges].tolist(),
+            np.diff(tg.edge_ptr)[edges].tolist(),
+            pd.to_datetime(tg.edge_latest()[edges]).tolist(),
+        )
+    )
+    return G
+
+
+# -----------------------------
+# The two variants, step by step
+# -----------------------------
+STEPS = ("node_stats", "tags", "scores", "ring_edges", "graph", "betweenness")
+
+
+def downstream(tg, columns, rings, by_id, clock):
+    """
+    node_stats -> ring tags -> pattern masks and centrality alignment ->
+    ring edges -> betweenness graph and a few pivots; ``clock(step)`` is
+    called after each step.
+    """
+    accounts = tg.accounts
+    if by_id:
+        # ring members as the detectors used to emit them
+        rings = [
+            {**r, "member_accounts": accounts[r["member_accounts"]].tolist()} for r in rings
+        ]
+        node_stats = node_stats_by_id(accounts, *columns)
+    else:
+        node_stats = compute_node_stats(accounts, *columns)
+    clock("node_stats")
+
+    tag = tag_cycle_members_by_id if by_id else tag_cycle_members
+    for ring in rings:
+        if ring["pattern_type"] == "cycle":
+            tag(node_stats, ring["member_accounts"], ring["ring_id"])
+    clock("tags")
+
+    # a betweenness-like dict over every account
+    keys = accounts.tolist() if by_id else range(len(accounts))
+    centrality = dict(zip(keys, np.ones(len(accounts)).tolist()))
+    if by_id:
+        masks = pattern_masks_by_id(accounts, node_stats, rings)
+        score = aligned_by_id(centrality, accounts)
+    else:
+        masks = pattern_masks(len(accounts), node_stats, rings)
+        score = aligned(centrality, len(accounts))
+    clock("scores")
+
+    edges = ring_edge_ids_by_id(tg, rings) if by_id else ring_edge_ids(tg, rings)
+    clock("ring_edges")
+
+    mask = np.zeros(tg.number_of_nodes(), dtype=bool)
+    if by_id:
+        members = tg.codes({m for r in rings for m in r["member_accounts"]})
+        mask[members[members >= 0]] = True
+    else:
+        mask[[m for r in rings for m in r["member_accounts"]]] = True
+    nodes = tg.reach(mask, RING_HOPS, "both")
+    H = to_networkx_by_id(tg, nodes) if by_id else tg.to_networkx(nodes=nodes)
+    clock("graph")
+
+    pivot_betweenness(H, list(H)[:PIVOTS], time.monotonic() + 3600)
+    clock("betweenness")
+    return masks, score, edges
+
+
+def timed_steps(fn):
+    times = {}
+    last = [time.perf_counter()]
+
+    def clock(step):
+        now = time.perf_counter()
+        times[step] = now - last[0]
+        last[0] = now
+
+    out = fn(clock)
+    return times, out
+
+
+def peak_mb(fn):
+    """ Peak traced allocation (run separately: tracing slows everything down) """
+    tracemalloc.start()
+    fn(lambda step: None)
+    peak = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+    return peak
+
+
+def main(sizes):
+    header = " ".join(f"{step:>11}" for step in STEPS)
+    print(f"{'rows':>10} {'accounts':>9} {'rings':>6} {'variant':>8} {header} {'total s':>8} {'peak MB':>8}")
+    for n_rows in sizes:
+        with tempfile.NamedTemporaryFile(suffix=".csv", delete=False) as f:
+            path = f.name
+        try:
+            write_dataset(path, n_rows)
+            tg, _ = read_transactions_csv(path)
+        finally:
+            os.remove(path)
+            os.remove(os.path.splitext(path)[0] + ".truth.json")
+
+        senders, receivers, amounts, _ = tg.transfer_arrays()
+        columns = (senders, receivers, amounts)
+        rings = run_detectors(tg, compute_node_stats(tg.accounts, *columns))
+
+        results = {}
+        for name, by_id in (("strings", True), ("codes", False)):
+            def run(clock):
+                return downstream(tg, columns, rings, by_id, clock)
+
+            times, results[name] = timed_steps(run)
+            peak = peak_mb(run)
+            steps = " ".join(f"{times[step]:>11.3f}" for step in STEPS)
+            print(
+                f"{n_rows:>10} {tg.number_of_nodes():>9} {len(rings):>6} {name:>8} "
+                f"{steps} {sum(times.values()):>8.2f} {peak:>8.1f}"
+            )
+        same = all(np.array_equal(a, b) for a, b in zip(results["strings"], results["codes"]))
+        print(f"{'':>10} same result: {same}")
+
+
+if __name__ == "__main__":
+    sizes = [int(a) for a in sys.argv[1:]] or DEFAULT_SIZES
+    main(sizes)
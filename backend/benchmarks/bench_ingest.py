@@ -0,0 +1,69 @@
+"""
+Peak memory and time of CSV ingestion: whole-file read_csv + to_datetime
+vs. the chunked, typed streaming reader. Each variant runs in a fresh
+process so ru_maxrss is its own peak.
+
+    cd backend
+    python -m benchmarks.bench_ingest            # 1M rows
+    python -m benchmarks.bench_ingest 3000000
+"""
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.bench_graph_builder import make_transactions
+
+DEFAULT_SIZES = [1_000_000]
+
+VARIANTS = {
+    "read_csv": (
+        "import pandas as pd\n"
+        "from app.graph_builder import build_transaction_graph\n"
+        "df = pd.read_csv(PATH)\n"
+        "df['timestamp'] = pd.to_datetime(df['timestamp'])\n"
+        "tg, node_stats = build_transaction_graph(df)\n"
+    ),
+    "streaming": (
+        "from app.ingest import read_transactions_csv\n"
+        "tg, node_stats = read_transactions_csv(PATH)\n"
+    ),
+}
+
+RUNNER = (
+    "import resource, time\n"
+    "PATH = {path!r}\n"
+    "t0 = time.perf_counter()\n"
+    "{body}"
+    "elapsed = time.perf_counter() - t0\n"
+    "print(elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)\n"
+)
+
+
+def run_variant(body, path):
+    out = subprocess.run(
+        [sys.executable, "-c", RUNNER.format(path=path, body=body)],
+        capture_output=True, text=True, check=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    elapsed, rss_kb = out.stdout.split()
+    return float(elapsed), int(rss_kb) / 1024
+
+
+def main(sizes):
+    print(f"{'rows':>10} {'file MB':>8} {'variant':>10} {'seconds':>8} {'peak RSS MB':>12}")
+    for n_rows in sizes:
+        with tempfile.NamedTemporaryFile(suffix=".csv", delete=False) as f:
+            path = f.name
+        try:
+            make_transactions(n_rows).to_csv(path, index=False)
+            size_mb = os.path.getsize(path) / 2**20
+            for name, body in VARIANTS.items():
+                elapsed, rss = run_variant(body, path)
+                print(f"{n_rows:>10} {size_mb:>8.1f} {name:>10} {elapsed:>8.2f} {rss:>12.1f}")
+        finally:
+            os.unlink(path)
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or DEFAULT_SIZES)
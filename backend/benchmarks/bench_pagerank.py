@@ -0,0 +1,72 @@
+"""
+Sparse power-iteration PageRank vs. nx.pagerank, cold and warm-started.
+
+The warm run re-ranks the graph after appending 1% new transfers, seeded
+with the cold run's vector (the hourly re-analysis case).
+
+    cd backend
+    python -m benchmarks.bench_pagerank            # ~100k, ~1M edges
+    python -m benchmarks.bench_pagerank 50000
+"""
+import sys
+import time
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+
+from app.centrality import pagerank_csr
+from app.transaction_graph import TransactionGraph
+from benchmarks.bench_graph_builder import make_transactions
+
+DEFAULT_SIZES = [100_000, 1_000_000]
+DELTA = 0.01
+
+
+def main(sizes):
+    print(
+        f"{'edges':>9} {'nx s':>8} {'nx it':>6} {'csr s':>7} {'csr it':>7} "
+        f"{'speedup':>8} {'max diff':>9} {'warm s':>7} {'warm it':>8} {'cold it':>8}"
+    )
+    for n_rows in sizes:
+        df = make_transactions(n_rows, seed=1)
+        df["timestamp"] = pd.to_datetime(df["timestamp"])
+        tg = TransactionGraph.from_dataframe(df)
+        G = tg.to_networkx()
+
+        t0 = time.perf_counter()
+        ref = nx.pagerank(G, max_iter=100)
+        t_nx = time.perf_counter() - t0
+        nx_iters = _nx_iterations(G)
+        del G
+
+        x, info = pagerank_csr(tg)
+        diff = np.abs(np.array([ref[a] for a in tg.accounts.tolist()]) - x).max()
+
+        # same accounts plus some new ones, 1% more transfers
+        extra = make_transactions(int(n_rows * DELTA), n_accounts=n_rows // 9, seed=2)
+        extra["timestamp"] = pd.to_datetime(extra["timestamp"])
+        tg2 = TransactionGraph.from_dataframe(pd.concat([df, extra], ignore_index=True))
+        _, cold = pagerank_csr(tg2)
+        _, warm = pagerank_csr(tg2, nstart=(tg.accounts, x))
+
+        print(
+            f"{tg.number_of_edges():>9} {t_nx:>8.2f} {nx_iters:>6} {info['seconds']:>7.3f} "
+            f"{info['iterations']:>7} {t_nx / info['seconds']:>7.0f}x {diff:>9.1e} "
+            f"{warm['seconds']:>7.3f} {warm['iterations']:>8} {cold['iterations']:>8}"
+        )
+
+
+def _nx_iterations(G):
+    """ nx.pagerank doesn't report iterations; find the smallest max_iter that works """
+    for it in range(1, 101):
+        try:
+            nx.pagerank(G, max_iter=it)
+            return it
+        except nx.PowerIterationFailedConvergence:
+            pass
+    return None
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or DEFAULT_SIZES)
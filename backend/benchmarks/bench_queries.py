@@ -0,0 +1,109 @@
+"""
+Latency of the account-level graph queries behind /graphs/{id}/neighborhood,
+/between and /rings/{id}, answered from the QueryIndex, with p50 / p99 over
+random accounts of a synthetic dataset (about 1M edges at the default
+size), records included. The old neighborhood query (a reachability mask
+over the whole graph, then a pass over every edge) is kept as the
+reference: the edges must match.
+
+    cd backend
+    python -m benchmarks.bench_queries            # 1.2M rows
+    python -m benchmarks.bench_queries 300000
+"""
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from app.ingest import read_transactions_csv
+from app.output_formatter import edge_records
+from app.query_index import QueryIndex
+from benchmarks.synthetic import write_dataset
+
+DEFAULT_SIZES = [1_200_000]
+QUERIES = 1000
+REFERENCE_QUERIES = 50
+SET_SIZE = 50
+LIMIT = 2000
+
+
+def neighborhood_rescan(G, code, hops):
+    """ The old neighborhood: sparse-matrix reach over all accounts, then a mask over every edge """
+    mask = np.zeros(G.number_of_nodes(), dtype=bool)
+    mask[code] = True
+    mask = G.reach(mask, hops, "both")
+    return np.flatnonzero(mask[G.edge_src] & mask[G.indices])
+
+
+def latencies(fn, args):
+    times = []
+    for a in args:
+        t0 = time.perf_counter()
+        fn(a)
+        times.append(time.perf_counter() - t0)
+    return np.percentile(np.array(times) * 1000, [50, 99])
+
+
+def main(sizes):
+    print(f"{'rows':>10} {'edges':>10} {'index s':>8} {'index MB':>9}  {'query':<22} {'p50 ms':>7} {'p99 ms':>7}")
+    for n_rows in sizes:
+        with tempfile.NamedTemporaryFile(suffix=".csv", delete=False) as f:
+            path = f.name
+        try:
+            write_dataset(path, n_rows)
+            tg, _ = read_transactions_csv(path)
+        finally:
+            os.remove(path)
+            os.remove(os.path.splitext(path)[0] + ".truth.json")
+
+        t0 = time.perf_counter()
+        index = QueryIndex.from_graph(tg)
+        build_s = time.perf_counter() - t0
+
+        rng = np.random.default_rng(5)
+        accounts = tg.accounts[rng.integers(0, tg.number_of_nodes(), QUERIES)].tolist()
+        sets = [tg.accounts[rng.integers(0, tg.number_of_nodes(), SET_SIZE)].tolist() for _ in range(QUERIES)]
+        # ring-like sets: an account and its counterparties
+        rings = [
+            tg.accounts[index.nbr[index.nbr_ptr[c]:index.nbr_ptr[c + 1]][:SET_SIZE].tolist() + [c]].tolist()
+            for c in index.codes(accounts).tolist()
+        ]
+
+        def ego(hops):
+            def run(account):
+                _, _, edges = index.ego(index.codes([account])[0], hops)
+                return index.edge_records(edges[:LIMIT])
+            return run
+
+        def between(members):
+            rows, edges = index.transfers_among(index.codes(members))
+            return index.transfer_records(rows[:LIMIT], edges)
+
+        def ring(members):
+            return index.edge_records(index.edges_among(index.codes(members))[:LIMIT])
+
+        def rescan(account):
+            return edge_records(tg, neighborhood_rescan(tg, tg.codes([account])[0], 1)[:LIMIT])
+
+        same = all(
+            np.array_equal(np.sort(index.ego(c, h)[2]), neighborhood_rescan(tg, c, h))
+            for c in index.codes(accounts[:REFERENCE_QUERIES]).tolist() for h in (1, 2)
+        )
+        rows = [
+            ("neighborhood hops=1", ego(1), accounts),
+            ("neighborhood hops=2", ego(2), accounts),
+            ("between (transfers)", between, sets),
+            ("ring edges", ring, rings),
+            ("old neighborhood hops=1", rescan, accounts[:REFERENCE_QUERIES]),
+        ]
+        print(f"{n_rows:>10} {tg.number_of_edges():>10} {build_s:>8.2f} {index.nbytes() / 2**20:>9.1f}  same: {same}")
+        for name, fn, args in rows:
+            p50, p99 = latencies(fn, args)
+            print(f"{'':>41}  {name:<22} {p50:>7.2f} {p99:>7.2f}")
+
+
+if __name__ == "__main__":
+    sizes = [int(a) for a in sys.argv[1:]] or DEFAULT_SIZES
+    main(sizes)
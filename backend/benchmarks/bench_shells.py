@@ -0,0 +1,181 @@
+"""
+Maximal shell-chain decomposition vs. the old per-start successor walk, on
+graphs made mostly of one-in / one-out accounts: layering chains of
+random length (some with a hop that loses too much money), fed by and
+cashing out to busy accounts, some of them cashing out into the middle of
+another chain instead (a merge). The walk is kept here as the reference:
+every chain it reports must lie inside one of the decomposition's chains,
+unless it enters a merge through a feeder the decomposition cut (each
+merge keeps its largest feeder; see shell_paths).
+
+    cd backend
+    python -m benchmarks.bench_shells            # 1M, 3M chain accounts
+    python -m benchmarks.bench_shells 500000
+"""
+import sys
+import time
+
+import numpy as np
+
+from app.detectors.shell_detector import MAX_SHELL_TX, MIN_AMOUNT_RATIO, MIN_CHAIN_LEN, find_shell_chains
+from app.transaction_graph import NS_PER_HOUR, TransactionGraph
+
+DEFAULT_SIZES = [1_000_000, 3_000_000]
+MAX_LENGTH = 16
+BUSY_ACCOUNTS = 1_000
+MERGE_SHARE = 0.1           # chains whose last account pays into another chain
+
+
+def make_chains(n_accounts, seed=7):
+    """ -> TransactionGraph of chains over ~n_accounts accounts plus a few busy ones """
+    rng = np.random.default_rng(seed)
+    lengths = rng.integers(2, MAX_LENGTH + 1, size=n_accounts // ((MAX_LENGTH + 2) // 2))
+    lengths = lengths[np.cumsum(lengths) <= n_accounts]
+    n_chain = int(lengths.sum())
+    n = n_chain + BUSY_ACCOUNTS
+
+    first = np.cumsum(lengths) - lengths
+    pos = np.arange(n_chain) - np.repeat(first, lengths)
+    last = pos == np.repeat(lengths - 1, lengths)
+
+    # hops inside each chain lose a little, now and then a lot
+    keep = rng.uniform(0.93, 1.0, n_chain)
+    keep[rng.random(n_chain) < 0.05] = 0.5
+    keep[first] = 1.0
+    start_amount = rng.uniform(1_000, 10_000, len(lengths))
+    kept = np.log(keep).cumsum()
+    amounts = np.repeat(start_amount, lengths) * np.exp(kept - np.repeat(kept[first], lengths))
+    start_time = rng.integers(0, 24 * 30, len(lengths)) * NS_PER_HOUR
+    times = np.repeat(start_time, lengths) + pos * rng.integers(1, 6, n_chain) * NS_PER_HOUR
+
+    hop = np.flatnonzero(~last)
+    busy = n_chain + rng.integers(0, BUSY_ACCOUNTS, size=2 * len(lengths))
+    # merges: some chains cash out into a later account of another chain
+    ends = busy[len(lengths):]
+    merging = rng.random(len(lengths)) < MERGE_SHARE
+    into = rng.integers(0, n_chain, size=len(lengths))
+    merging &= (pos[into] > 0) & (np.repeat(np.arange(len(lengths)), lengths)[into] != np.arange(len(lengths)))
+    ends[merging] = into[merging]
+    senders = np.concatenate([hop, busy[:len(lengths)], np.flatnonzero(last)])
+    receivers = np.concatenate([hop + 1, first, ends])
+    amounts = np.concatenate([amounts[hop + 1], start_amount, amounts[last] * 0.9])
+    times = np.concatenate([times[hop + 1], start_time - NS_PER_HOUR, times[last] + NS_PER_HOUR])
+
+    accounts = np.array([f"ACC_{i:08d}" for i in range(n)], dtype=object)
+    return TransactionGraph.from_codes(accounts, senders, receivers, amounts.astype(np.float32), times)
+
+
+# -----------------------------
+# Reference: one walk per starting account
+# -----------------------------
+def find_shell_chains_walk(G, tx):
+    out_deg, in_deg = G.out_degrees(), G.in_degrees()
+    chains = []
+    for node in range(G.number_of_nodes()):
+        if tx[node] > MAX_SHELL_TX:
+            continue
+        if out_deg[node] != 1 or in_deg[node] < 1:
+            continue
+        chain = _follow_chain(G, tx, node)
+        if chain:
+            chains.append((node, chain))
+    return chains
+
+
+def _follow_chain(G, tx, node):
+    chain = [node]
+    curr = node
+    seen = {node}
+
+    while True:
+        succ = G.out_neighbors(curr)
+        if len(succ) != 1:
+            return None
+        next_n = int(succ[0])
+        if next_n in seen:
+            return None
+        if tx[next_n] > MAX_SHELL_TX:
+            return None
+
+        chain.append(next_n)
+        seen.add(next_n)
+        curr = next_n
+
+        if len(chain) >= MIN_CHAIN_LEN:
+            amounts = []
+            for i in range(len(chain)-1):
+                e = G.edge_id(chain[i], chain[i+1])
+                if e < 0:
+                    break
+                amounts.append(float(G.edge_transfers(e)[0].sum()))
+            if len(amounts) == len(chain)-1 and min(amounts) > 0:
+                ratio = min(amounts) / max(amounts)
+                if ratio < MIN_AMOUNT_RATIO:
+                    return None
+
+            return chain
+
+
+def kept_feeders(G, tx):
+    """ merge target -> the one shell link the path goes on from: largest, then earliest, then lowest code """
+    feeders = {}
+    for u in range(G.number_of_nodes()):
+        succ = G.out_neighbors(u)
+        if tx[u] > MAX_SHELL_TX or len(succ) != 1:
+            continue
+        v = int(succ[0])
+        if v != u and tx[v] <= MAX_SHELL_TX:
+            amounts, times = G.edge_transfers(G.edge_id(u, v))
+            feeders.setdefault(v, []).append((-round(float(amounts.sum()), 2), int(times[-1]), u))
+    return {v: min(f)[2] for v, f in feeders.items() if len(f) > 1}
+
+
+def covered(walks, chains, kept):
+    """
+    -> (covered, cut): every walked chain that does not enter a merge
+    through a cut feeder lies inside one decomposed chain; ``cut`` counts
+    those that do.
+    """
+    # overlapping layered stretches of one path share accounts
+    where = {}
+    for i, chain in enumerate(chains):
+        for pos, m in enumerate(chain["members"]):
+            where.setdefault(m, []).append((i, pos))
+    cut = 0
+    for _, walk in walks:
+        if any(kept.get(v, u) != u for u, v in zip(walk, walk[1:])):
+            cut += 1
+            continue
+        if not any(chains[i]["members"][pos:pos + len(walk)] == walk for i, pos in where.get(walk[0], ())):
+            return False, cut
+    return True, cut
+
+
+def main(sizes):
+    print(
+        f"{'accounts':>10} {'edges':>10} {'walk s':>8} {'walks':>8} "
+        f"{'decompose s':>12} {'chains':>8} {'speedup':>8} {'merges':>7} {'cut':>6}  covered"
+    )
+    for n_accounts in sizes:
+        G = make_chains(n_accounts)
+        tx = G.out_transfers + G.in_transfers
+
+        t0 = time.perf_counter()
+        walks = find_shell_chains_walk(G, tx)
+        walk_s = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        chains = find_shell_chains(G, tx, degrees=(G.out_degrees(), G.in_degrees()))
+        decompose_s = time.perf_counter() - t0
+
+        kept = kept_feeders(G, tx)
+        ok, cut = covered(walks, chains, kept)
+        print(
+            f"{G.number_of_nodes():>10} {G.number_of_edges():>10} {walk_s:>8.2f} {len(walks):>8} "
+            f"{decompose_s:>12.2f} {len(chains):>8} {walk_s / decompose_s:>7.1f}x {len(kept):>7} {cut:>6}  {ok}"
+        )
+
+
+if __name__ == "__main__":
+    sizes = [int(a) for a in sys.argv[1:]] or DEFAULT_SIZES
+    main(sizes)
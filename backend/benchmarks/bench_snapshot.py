@@ -0,0 +1,106 @@
+"""
+Cold start of a worker that has to serve a stored analysis: re-reading
+the CSV and rebuilding the graph and its QueryIndex (the minimum without a
+snapshot; the analysis itself is reported alongside) vs. opening the
+analysis' snapshot. The snapshot is opened in fresh processes, as by
+another uvicorn worker or after a restart, each timing the open plus
+a first neighborhood query, and reporting how much of its memory is the
+shared file mapping (RssFile) rather than private (RssAnon). The answers
+to the query must match.
+
+    cd backend
+    python -m benchmarks.bench_snapshot            # 1.2M rows
+    python -m benchmarks.bench_snapshot 300000
+"""
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from app.ingest import read_transactions_csv
+from app.pipeline import run_analysis
+from app.query_index import QueryIndex
+from benchmarks.synthetic import write_dataset
+
+DEFAULT_SIZES = [1_200_000]
+WORKERS = 3
+HOPS = 2
+
+# run in each fresh process: open, one query, memory split
+WORKER = """
+import json, sys, time
+t0 = time.perf_counter()
+from app.snapshot import open_snapshot
+t1 = time.perf_counter()
+snapshot = open_snapshot(sys.argv[1])
+t2 = time.perf_counter()
+index = snapshot.query_index
+_, _, edges = index.ego(index.codes([sys.argv[2]])[0], int(sys.argv[3]))
+records = index.edge_records(edges)
+t3 = time.perf_counter()
+status = dict(line.split(":", 1) for line in open("/proc/self/status"))
+print(json.dumps({
+    "import_ms": (t1 - t0) * 1000, "open_ms": (t2 - t1) * 1000, "query_ms": (t3 - t2) * 1000,
+    "edges": sorted(edges.tolist()), "records": len(records),
+    "rss_file_mb": int(status.get("RssFile", "0 kB").split()[0]) / 1024,
+    "rss_anon_mb": int(status.get("RssAnon", "0 kB").split()[0]) / 1024,
+}))
+"""
+
+
+def open_in_worker(path, account, hops):
+    out = subprocess.run(
+        [sys.executable, "-c", WORKER, path, account, str(hops)],
+        capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.dirname(__file__)),
+    )
+    return json.loads(out.stdout)
+
+
+def main(sizes):
+    print(
+        f"{'rows':>10} {'edges':>10} {'analyze s':>10} {'reload s':>9} {'snap MB':>8}  "
+        f"{'worker':<7} {'import ms':>10} {'open ms':>8} {'query ms':>9} {'file MB':>8} {'anon MB':>8}  same"
+    )
+    for n_rows in sizes:
+        work = tempfile.mkdtemp()
+        try:
+            path = os.path.join(work, "transactions.csv")
+            snapshot = os.path.join(work, "snapshot")
+            write_dataset(path, n_rows)
+
+            t0 = time.perf_counter()
+            run_analysis(path, use_cache=False, snapshot=snapshot)
+            analyze_s = time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            tg, _ = read_transactions_csv(path)
+            index = QueryIndex.from_graph(tg)
+            reload_s = time.perf_counter() - t0
+
+            account = str(tg.accounts[np.random.default_rng(5).integers(0, tg.number_of_nodes())])
+            expected = np.sort(index.ego(index.codes([account])[0], HOPS)[2]).tolist()
+            size_mb = sum(
+                os.path.getsize(os.path.join(snapshot, f)) for f in os.listdir(snapshot)
+            ) / 2**20
+
+            print(
+                f"{n_rows:>10} {tg.number_of_edges():>10} {analyze_s:>10.2f} {reload_s:>9.2f} {size_mb:>8.1f}"
+            )
+            for worker in range(WORKERS):
+                r = open_in_worker(snapshot, account, HOPS)
+                print(
+                    f"{'':>52}{worker:<7} {r['import_ms']:>10.1f} {r['open_ms']:>8.2f} {r['query_ms']:>9.2f} "
+                    f"{r['rss_file_mb']:>8.1f} {r['rss_anon_mb']:>8.1f}  {r['edges'] == expected}"
+                )
+        finally:
+            shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sizes = [int(a) for a in sys.argv[1:]] or DEFAULT_SIZES
+    main(sizes)
@@ -0,0 +1,140 @@
+"""
+Follow-the-money queries: the AccountIndex-backed trace vs. rescanning the
+transactions DataFrame at every hop, on the synthetic datasets. Both
+follow the same rules (time-respecting hops, pro-rata amount
+conservation); the rescan is the reference, and every traced edge and
+amount must match.
+
+    cd backend
+    python -m benchmarks.bench_trace            # 100k, 1M rows
+    python -m benchmarks.bench_trace 250000
+"""
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.account_index import AccountIndex
+from app.ingest import read_transactions_csv
+from app.tracing import first_arrival, trace_money, traced_edges
+from app.transaction_graph import NS_PER_HOUR
+from benchmarks.synthetic import write_dataset
+
+DEFAULT_SIZES = [100_000, 1_000_000]
+QUERIES = 200
+REFERENCE_QUERIES = 20
+HOPS = 5
+HOURS = 24 * 7
+
+
+def trace_rescan(df, source, start, hops, hours):
+    """ The same trace over a transactions DataFrame, filtered anew each hop """
+    deadline = start + hours * NS_PER_HOUR
+    frontier = pd.DataFrame({"arrival": [start], "available": [np.inf]}, index=[source])
+    visited = {source}
+    flows = {}
+
+    for hop in range(1, hops + 1):
+        rows = df[df["sender_id"].isin(frontier.index) & (df["ts"] <= deadline)]
+        after = rows["sender_id"].map(frontier["arrival"]) + (0 if hop == 1 else 1)
+        rows = rows[rows["ts"] >= after]
+        if rows.empty:
+            break
+        sent = rows.groupby("sender_id")["amount"].sum()
+        share = np.minimum(1.0, frontier["available"] / sent.reindex(frontier.index))
+        flow = rows["amount"] * rows["sender_id"].map(share)
+        for pair, (total, first) in (
+            pd.DataFrame({"flow": flow, "hop": hop})
+            .groupby([rows["sender_id"], rows["receiver_id"]])
+            .agg(total=("flow", "sum"), first=("hop", "min"))
+            .iterrows()
+        ):
+            seen = flows.get(pair, (0.0, hop))
+            flows[pair] = (seen[0] + total, min(seen[1], first))
+
+        fresh = ~rows["receiver_id"].isin(visited)
+        if not fresh.any():
+            break
+        frontier = pd.DataFrame({
+            "arrival": rows["ts"][fresh].groupby(rows["receiver_id"][fresh]).min(),
+            "available": flow[fresh].groupby(rows["receiver_id"][fresh]).sum(),
+        })
+        visited.update(frontier.index)
+    return flows
+
+
+def as_pairs(tg, trace):
+    ids, flow, first_hop = traced_edges(tg, trace)
+    return {
+        (u, v): (f, h)
+        for u, v, f, h in zip(
+            tg.accounts[tg.edge_src[ids]].tolist(),
+            tg.accounts[tg.indices[ids]].tolist(),
+            flow.tolist(),
+            first_hop.tolist(),
+        )
+    }
+
+
+def same(a, b):
+    return a.keys() == b.keys() and all(
+        np.isclose(a[k][0], b[k][0], rtol=1e-6) and a[k][1] == b[k][1] for k in a
+    )
+
+
+def main(sizes):
+    print(
+        f"{'rows':>10} {'index s':>8} {'index MB':>9} {'trace ms':>9} {'rescan ms':>10} "
+        f"{'speedup':>8} {'edges/q':>8}  same"
+    )
+    for n_rows in sizes:
+        with tempfile.NamedTemporaryFile(suffix=".csv", delete=False) as f:
+            path = f.name
+        try:
+            write_dataset(path, n_rows)
+            tg, _ = read_transactions_csv(path)
+        finally:
+            os.remove(path)
+            os.remove(os.path.splitext(path)[0] + ".truth.json")
+
+        t0 = time.perf_counter()
+        index = AccountIndex.from_graph(tg)
+        build_s = time.perf_counter() - t0
+
+        senders, receivers, amounts, timestamps = tg.transfer_arrays()
+        df = pd.DataFrame({
+            "sender_id": tg.accounts[senders],
+            "receiver_id": tg.accounts[receivers],
+            "amount": amounts.astype(np.float64),
+            "ts": timestamps,
+        })
+
+        rng = np.random.default_rng(3)
+        sources = rng.choice(np.flatnonzero(tg.in_transfers > 0), QUERIES, replace=False)
+        starts = [first_arrival(index, s) for s in sources.tolist()]
+
+        t0 = time.perf_counter()
+        traces = [trace_money(index, s, t, HOPS, HOURS) for s, t in zip(sources.tolist(), starts)]
+        trace_ms = (time.perf_counter() - t0) / QUERIES * 1000
+
+        t0 = time.perf_counter()
+        reference = [
+            trace_rescan(df, tg.accounts[s], t, HOPS, HOURS)
+            for s, t in zip(sources[:REFERENCE_QUERIES].tolist(), starts)
+        ]
+        rescan_ms = (time.perf_counter() - t0) / REFERENCE_QUERIES * 1000
+
+        ok = all(same(as_pairs(tg, t), r) for t, r in zip(traces, reference))
+        edges = np.mean([len(traced_edges(tg, t)[0]) for t in traces])
+        print(
+            f"{n_rows:>10} {build_s:>8.2f} {index.nbytes() / 2**20:>9.1f} {trace_ms:>9.2f} "
+            f"{rescan_ms:>10.1f} {rescan_ms / trace_ms:>7.0f}x {edges:>8.1f}  {ok}"
+        )
+
+
+if __name__ == "__main__":
+    sizes = [int(a) for a in sys.argv[1:]] or DEFAULT_SIZES
+    main(sizes)
@@ -0,0 +1,53 @@
+"""
+Memory footprint of the CSR TransactionGraph vs. the dict-of-dicts DiGraph.
+
+    cd backend
+    python -m benchmarks.bench_transaction_graph            # 100k, 1M rows
+    python -m benchmarks.bench_transaction_graph 50000
+"""
+import sys
+import time
+import tracemalloc
+
+import pandas as pd
+
+from app.graph_builder import build_graph
+from app.transaction_graph import TransactionGraph
+from benchmarks.bench_graph_builder import make_transactions
+
+DEFAULT_SIZES = [100_000, 1_000_000]
+
+
+def measure(fn, df):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    out = fn(df)
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return out, elapsed, retained, peak
+
+
+def main(sizes):
+    print(
+        f"{'rows':>10} {'DiGraph MB':>11} {'CSR MB':>8} {'ratio':>7} "
+        f"{'DiGraph s':>10} {'CSR s':>7} {'edges':>9} {'transfers':>10}"
+    )
+    for n_rows in sizes:
+        df = make_transactions(n_rows)
+        df["timestamp"] = pd.to_datetime(df["timestamp"])
+
+        G, t_nx, mem_nx, _ = measure(lambda d: build_graph(d.copy())[0], df)
+        del G
+        tg, t_csr, mem_csr, _ = measure(TransactionGraph.from_dataframe, df)
+
+        print(
+            f"{n_rows:>10} {mem_nx / 2**20:>11.1f} {mem_csr / 2**20:>8.1f} "
+            f"{mem_nx / mem_csr:>6.1f}x {t_nx:>10.2f} {t_csr:>7.2f} "
+            f"{tg.number_of_edges():>9} {tg.number_of_transfers():>10}"
+        )
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or DEFAULT_SIZES)
@@ -0,0 +1,235 @@
+"""
+End-to-end benchmark on synthetic data with planted rings: time, memory
+and throughput of every pipeline stage, plus precision / recall of each
+detector against the ground truth. Results are saved as JSON; pass an
+earlier file as --baseline to see what got slower or less accurate.
+
+    cd backend
+    python -m benchmarks.suite                           # 10k, 100k, 1M rows
+    python -m benchmarks.suite 10000000 --data-dir /data/synthetic
+    python -m benchmarks.suite --baseline benchmarks/results/suite-20260101T000000Z.json
+
+Each size runs in a fresh process so peak RSS is per size. Set RIFT_*
+variables (e.g. RIFT_BETWEENNESS) as for the API; the cache is bypassed.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from benchmarks.synthetic import write_dataset
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+MATCH_JACCARD = 0.5         # a planted ring counts as found at this overlap
+PATTERNS = ("cycle", "fan_in_fan_out", "layered_shell")
+
+
+# -----------------------------
+# Accuracy
+# -----------------------------
+def _ratio(num, den):
+    return round(num / den, 4) if den else None
+
+
+def _jaccard(a, b):
+    return len(a & b) / len(a | b)
+
+
+def evaluate(result, truth):
+    """
+    Account-level precision / recall per pattern and for the flagged
+    accounts overall, and how many planted rings were recovered.
+    """
+    detected = result["fraud_rings"]
+    planted = truth["rings"]
+    accuracy = {}
+
+    for pattern in PATTERNS:
+        found = [set(r["member_accounts"]) for r in detected if r["pattern_type"] == pattern]
+        wanted = [set(r["members"]) for r in planted if r["pattern_type"] == pattern]
+        found_acc = set().union(*found)
+        wanted_acc = set().union(*wanted)
+        hits = len(found_acc & wanted_acc)
+        recovered = sum(
+            1 for w in wanted if any(_jaccard(w, f) >= MATCH_JACCARD for f in found)
+        )
+        accuracy[pattern] = {
+            "planted_rings": len(wanted),
+            "detected_rings": len(found),
+            "recovered_rings": recovered,
+            "precision": _ratio(hits, len(found_acc)),
+            "recall": _ratio(hits, len(wanted_acc)),
+        }
+
+    flagged = {a["account_id"] for a in result["suspicious_accounts"]}
+    mules = {m for r in planted for m in r["members"]}
+    hits = len(flagged & mules)
+    accuracy["flagged"] = {
+        "accounts": len(flagged),
+        "precision": _ratio(hits, len(flagged)),
+        "recall": _ratio(hits, len(mules)),
+    }
+    return accuracy
+
+
+# -----------------------------
+# One size (fresh process)
+# -----------------------------
+def _peak_rss_mb():
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def run_size(path, truth):
+    from app.pipeline import run_analysis
+
+    rss_before = _peak_rss_mb()
+    t0 = time.perf_counter()
+    result = run_analysis(path, use_cache=False)
+    elapsed = time.perf_counter() - t0
+
+    rows = truth["rows"]
+    stages = result["summary"]["stages"]
+    for entry in stages:
+        entry["rows_per_s"] = round(rows / entry["wall_s"]) if entry["wall_s"] else None
+
+    return {
+        "rows": rows,
+        "accounts": result["summary"]["total_accounts_analyzed"],
+        "analysis_s": round(elapsed, 3),
+        "rows_per_s": round(rows / elapsed),
+        "peak_rss_mb": _peak_rss_mb(),
+        "baseline_rss_mb": rss_before,
+        "stages": stages,
+        "centrality": result["summary"]["centrality"],
+        "accuracy": evaluate(result, truth),
+    }
+
+
+# -----------------------------
+# Reporting
+# -----------------------------
+def environment():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(__file__),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "settings": {k: v for k, v in sorted(os.environ.items()) if k.startswith("RIFT_")},
+    }
+
+
+def print_run(run):
+    print(
+        f"\n{run['rows']:,} rows, {run['accounts']:,} accounts: "
+        f"{run['analysis_s']:.2f}s ({run['rows_per_s']:,} rows/s), "
+        f"peak RSS {run['peak_rss_mb']:.0f} MB"
+    )
+    print(f"  {'stage':<14} {'wall s':>8} {'cpu s':>8} {'+RSS MB':>8}  counts")
+    for s in run["stages"]:
+        name = ("  " if "parent" in s else "") + s["stage"]
+        counts = ", ".join(f"{k}={v:,}" for k, v in s["counts"].items())
+        rss = "" if s["rss_delta_mb"] is None else f"{s['rss_delta_mb']:.1f}"
+        print(f"  {name:<14} {s['wall_s']:>8.3f} {s['cpu_s']:>8.3f} {rss:>8}  {counts}")
+
+    print(f"  {'pattern':<15} {'planted':>7} {'found':>6} {'recovered':>9} {'precision':>9} {'recall':>7}")
+    for pattern in PATTERNS:
+        a = run["accuracy"][pattern]
+        print(
+            f"  {pattern:<15} {a['planted_rings']:>7} {a['detected_rings']:>6} "
+            f"{a['recovered_rings']:>9} {_fmt(a['precision']):>9} {_fmt(a['recall']):>7}"
+        )
+    a = run["accuracy"]["flagged"]
+    print(f"  {'flagged':<15} {a['accounts']:>7} {'':>6} {'':>9} {_fmt(a['precision']):>9} {_fmt(a['recall']):>7}")
+
+
+def _fmt(value):
+    return "-" if value is None else f"{value:.3f}"
+
+
+def compare(runs, baseline):
+    """ Stage time ratios and accuracy changes against an earlier results file """
+    before = {r["rows"]: r for r in baseline["runs"]}
+    print(f"\nvs. baseline {baseline['environment'].get('commit')} ({baseline['created_at']})")
+    for run in runs:
+        old = before.get(run["rows"])
+        if old is None:
+            continue
+        old_stages = {s["stage"]: s for s in old["stages"]}
+        changes = []
+        for s in run["stages"]:
+            o = old_stages.get(s["stage"])
+            if o and o["wall_s"] > 0:
+                changes.append(f"{s['stage']} {s['wall_s'] / o['wall_s']:.2f}x")
+        print(f"  {run['rows']:,} rows: total {run['analysis_s'] / old['analysis_s']:.2f}x; " + ", ".join(changes))
+        for pattern in PATTERNS + ("flagged",):
+            a, o = run["accuracy"][pattern], old["accuracy"][pattern]
+            for metric in ("precision", "recall"):
+                if a[metric] != o[metric]:
+                    print(f"    {pattern} {metric}: {_fmt(o[metric])} -> {_fmt(a[metric])}")
+
+
+def main(sizes, seed=42, data_dir=None, out=None, baseline=None):
+    data_dir = data_dir or tempfile.mkdtemp(prefix="rift-bench-")
+    os.makedirs(data_dir, exist_ok=True)
+
+    runs = []
+    ctx = multiprocessing.get_context("spawn")
+    for n_rows in sizes:
+        path = os.path.join(data_dir, f"synthetic_{n_rows}_{seed}.csv")
+        t0 = time.perf_counter()
+        truth = write_dataset(path, n_rows, seed)
+        generate_s = time.perf_counter() - t0
+
+        with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+            run = pool.submit(run_size, path, truth).result()
+        run["generate_s"] = round(generate_s, 3)
+        run["dataset"] = path
+        runs.append(run)
+        print_run(run)
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "seed": seed,
+        "environment": environment(),
+        "runs": runs,
+    }
+    if out is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        out = os.path.join(RESULTS_DIR, f"suite-{time.strftime('%Y%m%dT%H%M%SZ', time.gmtime())}.json")
+    with open(out, "w") as f:
+        json.dump(report, f, indent=1)
+    print(f"\nresults -> {out}")
+
+    if baseline:
+        with open(baseline) as f:
+            compare(runs, json.load(f))
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("sizes", nargs="*", type=int, default=DEFAULT_SIZES)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--data-dir", help="keep the generated CSVs here (default: a temp dir)")
+    parser.add_argument("--out", help="results JSON (default: benchmarks/results/suite-<time>.json)")
+    parser.add_argument("--baseline", help="earlier results JSON to compare against")
+    args = parser.parse_args()
+    main(args.sizes, args.seed, args.data_dir, args.out, args.baseline)
@@ -0,0 +1,158 @@
+"""
+Synthetic transaction CSVs with planted, known mule networks.
+
+Background traffic has power-law account activity (a few very busy
+accounts, a long tail of quiet ones) spread over DAYS days. On top of it
+the generator plants rings the detectors are meant to find, on fresh
+accounts wired into the background by an entry and an exit transfer:
+
+    cycle            3-5 accounts passing a large amount around within hours
+    fan_in_fan_out   FAN senders pay a hub, which pays FAN receivers
+    layered_shell    SHELL_LEN low-activity pass-through accounts in a row
+
+The ground truth is every planted ring's pattern and members.
+
+    cd backend
+    python -m benchmarks.synthetic 1000000 /tmp/synthetic_1m.csv
+    # -> /tmp/synthetic_1m.csv and /tmp/synthetic_1m.truth.json
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+DAYS = 30                   # under the smurf detector's lifespan cut-off
+ACTIVITY_ALPHA = 2.5        # Pareto tail of per-account activity
+ROWS_PER_ACCOUNT = 10
+CHUNK_ROWS = 1_000_000
+FAN = 12
+SHELL_LEN = 5
+START = np.datetime64("2026-01-01T00:00:00", "s")
+
+
+def planted_counts(n_rows):
+    """ Default number of planted (cycles, hubs, shell chains) for a size """
+    return max(5, n_rows // 20_000), max(3, n_rows // 50_000), max(5, n_rows // 20_000)
+
+
+def account_labels(n_rows):
+    n_accounts = max(100, n_rows // ROWS_PER_ACCOUNT)
+    return np.array([f"ACC_{i:07d}" for i in range(n_accounts)], dtype=object)
+
+
+def background_chunks(n_rows, labels, seed=42, chunk_rows=CHUNK_ROWS):
+    """ Power-law background traffic as DataFrames of at most chunk_rows rows """
+    rng = np.random.default_rng(seed)
+    n_accounts = len(labels)
+
+    # independent sending / receiving activity, both heavy-tailed
+    p_out = rng.pareto(ACTIVITY_ALPHA, n_accounts) + 1
+    p_in = rng.pareto(ACTIVITY_ALPHA, n_accounts) + 1
+    p_out /= p_out.sum()
+    p_in /= p_in.sum()
+
+    for lo in range(0, n_rows, chunk_rows):
+        n = min(chunk_rows, n_rows - lo)
+        senders = rng.choice(n_accounts, n, p=p_out)
+        receivers = rng.choice(n_accounts, n, p=p_in)
+        receivers = np.where(receivers == senders, (receivers + 1) % n_accounts, receivers)
+        seconds = rng.integers(0, DAYS * 86_400, n)
+        yield pd.DataFrame({
+            "transaction_id": [f"TX_{i:09d}" for i in range(lo, lo + n)],
+            "sender_id": labels[senders],
+            "receiver_id": labels[receivers],
+            "amount": np.round(rng.lognormal(7, 1, n), 2),
+            "timestamp": START + seconds.astype("timedelta64[s]"),
+        })
+
+
+def planted_rings(labels, n_cycles, n_hubs, n_shells, seed=42):
+    """ -> (DataFrame of planted transfers, [{"pattern_type", "members"}]) """
+    rng = np.random.default_rng(seed + 1)
+    rows = []
+    truth = []
+
+    def moment():
+        # leave room after the start for the whole pattern to play out
+        return START + np.timedelta64(int(rng.integers(0, (DAYS - 3) * 86_400)), "s")
+
+    def hours(h):
+        return np.timedelta64(int(h * 3600), "s")
+
+    def outsider():
+        return labels[rng.integers(len(labels))]
+
+    for c in range(n_cycles):
+        k = 3 + c % 3
+        members = [f"CYC_{c:05d}_{j}" for j in range(k)]
+        t = moment()
+        amount = float(rng.uniform(5_000, 20_000))
+        rows.append((outsider(), members[0], round(amount * 1.01, 2), t - hours(2)))
+        for j in range(k):
+            t = t + hours(rng.uniform(1, 6))
+            rows.append((members[j], members[(j + 1) % k], round(amount, 2), t))
+            amount *= float(rng.uniform(0.97, 0.99))
+        rows.append((members[0], outsider(), round(amount, 2), t + hours(24)))
+        truth.append({"pattern_type": "cycle", "members": members})
+
+    for h in range(n_hubs):
+        hub = f"HUB_{h:05d}"
+        senders = [f"SMURF_{h:05d}_{j:02d}" for j in range(FAN)]
+        receivers = [f"MULE_{h:05d}_{j:02d}" for j in range(FAN)]
+        t = moment()
+        for j, s in enumerate(senders):
+            rows.append((s, hub, round(float(rng.uniform(900, 990)), 2), t + hours(j)))
+        for j, r in enumerate(receivers):
+            rows.append((hub, r, round(float(rng.uniform(850, 950)), 2), t + hours(FAN + 2 + j)))
+        truth.append({"pattern_type": "fan_in_fan_out", "members": [hub] + senders + receivers})
+
+    for s in range(n_shells):
+        members = [f"SHELL_{s:05d}_{j}" for j in range(SHELL_LEN)]
+        t = moment()
+        amount = float(rng.uniform(2_000, 8_000))
+        rows.append((outsider(), members[0], round(amount, 2), t))
+        for j in range(SHELL_LEN - 1):
+            amount *= float(rng.uniform(0.97, 0.995))
+            rows.append((members[j], members[j + 1], round(amount, 2), t + hours(j + 1)))
+        rows.append((members[-1], outsider(), round(amount * 0.99, 2), t + hours(SHELL_LEN)))
+        truth.append({"pattern_type": "layered_shell", "members": members})
+
+    df = pd.DataFrame(rows, columns=["sender_id", "receiver_id", "amount", "timestamp"])
+    df["timestamp"] = df["timestamp"].astype("datetime64[s]")
+    df.insert(0, "transaction_id", [f"TX_P{i:08d}" for i in range(len(df))])
+    return df, truth
+
+
+def write_dataset(path, n_rows, seed=42, counts=None):
+    """
+    Write n_rows of background plus the planted rings to ``path`` (CSV),
+    chunk by chunk, and the ground truth next to it. Returns the truth.
+    """
+    n_cycles, n_hubs, n_shells = counts or planted_counts(n_rows)
+    labels = account_labels(n_rows)
+    for i, chunk in enumerate(background_chunks(n_rows, labels, seed)):
+        chunk.to_csv(path, mode="a" if i else "w", header=not i, index=False)
+
+    planted, rings = planted_rings(labels, n_cycles, n_hubs, n_shells, seed)
+    planted.to_csv(path, mode="a", header=False, index=False)
+
+    truth = {"rows": n_rows + len(planted), "seed": seed, "rings": rings}
+    with open(truth_path(path), "w") as f:
+        json.dump(truth, f)
+    return truth
+
+
+def truth_path(path):
+    return os.path.splitext(path)[0] + ".truth.json"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("rows", type=int)
+    parser.add_argument("path")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    truth = write_dataset(args.path, args.rows, args.seed)
+    print(f"{truth['rows']} rows, {len(truth['rings'])} planted rings -> {args.path}")
@@ -0,0 +1,44 @@
+import io
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+client = TestClient(app)
+
+CSV = (
+    "transaction_id,sender_id,receiver_id,amount,timestamp\n"
+    "T1,A,B,1000.0,2026-01-01 10:00:00\n"
+    "T2,B,C,950.0,2026-01-01 12:00:00\n"
+    "T3,C,A,900.0,2026-01-01 14:00:00\n"
+)
+
+
+def upload(text):
+    return {"file": ("transactions.csv", io.BytesIO(text.encode()), "text/csv")}
+
+
+def test_analyze():
+    response = client.post("/analyze", files=upload(CSV))
+    assert response.status_code == 200
+    assert response.json()["summary"]["total_accounts_analyzed"] == 3
+
+
+def test_analyze_missing_columns_is_400():
+    text = "sender_id,receiver_id,timestamp\nA,B,2026-01-01 10:00:00\n"
+    response = client.post("/analyze", files=upload(text))
+    assert response.status_code == 400
+    assert "amount" in response.json()["detail"]
+
+
+def test_stream_batch_missing_columns_is_400():
+    text = "sender_id,amount,timestamp\nA,10.0,2026-01-01 10:00:00\n"
+    response = client.post("/streams/bad-upload/batches", files=upload(text))
+    assert response.status_code == 400
+    assert "receiver_id" in response.json()["detail"]
+
+
+def test_analyze_missing_timestamp_is_400():
+    response = client.post("/analyze", files=upload(CSV + "T4,Q,W,5.0,\n"))
+    assert response.status_code == 400
+    assert response.json()["detail"] == "1 rows have a missing/unparseable timestamp"
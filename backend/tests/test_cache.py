@@ -0,0 +1,46 @@
+import os
+import stat
+
+import pytest
+
+from app.cache import AnalysisCache, private_dir
+
+
+def test_creates_a_private_directory(tmp_path):
+    directory = tmp_path / "cache"
+    cache = AnalysisCache(directory=str(directory))
+    assert cache.directory == str(directory)
+    assert stat.S_IMODE(os.stat(directory).st_mode) & 0o077 == 0
+
+
+def test_shared_directory_is_refused(tmp_path):
+    directory = tmp_path / "shared"
+    directory.mkdir()
+    directory.chmod(0o777)
+    with pytest.raises(PermissionError):
+        private_dir(str(directory))
+    with pytest.warns(UserWarning, match="disk tier off"):
+        cache = AnalysisCache(directory=str(directory))
+    assert cache.directory is None
+    cache.put("k", {"a": 1})
+    assert cache.get("k") == {"a": 1}
+
+
+@pytest.mark.skipif(os.getuid() != 0, reason="needs root to hand the directory to another user")
+def test_directory_of_another_user_is_refused(tmp_path):
+    directory = tmp_path / "theirs"
+    directory.mkdir(mode=0o700)
+    os.chown(directory, 12345, 12345)
+    with pytest.raises(PermissionError):
+        private_dir(str(directory))
+
+
+def test_corrupt_entry_is_a_miss_and_removed(tmp_path):
+    cache = AnalysisCache(directory=str(tmp_path / "cache"))
+    cache.put("good", [1, 2, 3])
+    path = cache._path("bad")
+    with open(path, "wb") as f:
+        f.write(b"not a pickle")
+    assert cache.get("bad") is None
+    assert not os.path.exists(path)
+    assert cache.get("good") == [1, 2, 3]
@@ -0,0 +1,54 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.incremental import IncrementalAnalyzer
+from app.pipeline import run_analysis
+from benchmarks.synthetic import write_dataset
+
+ROWS = 5000
+BATCHES = 5
+
+
+def rings(result):
+    return sorted((r["pattern_type"], tuple(sorted(r["member_accounts"]))) for r in result["fraud_rings"])
+
+
+def flagged(result):
+    return sorted(a["account_id"] for a in result["suspicious_accounts"])
+
+
+def csv(df):
+    return io.StringIO(df.to_csv(index=False))
+
+
+@pytest.fixture(scope="module")
+def transactions(tmp_path_factory):
+    path = tmp_path_factory.mktemp("incremental") / "transactions.csv"
+    write_dataset(str(path), ROWS)
+    df = pd.read_csv(path)
+    # in time order, as a stream delivers them (the dataset spans 30 days)
+    return df.iloc[np.argsort(pd.to_datetime(df["timestamp"]).to_numpy(), kind="stable")]
+
+
+@pytest.mark.parametrize("window_days", [7, 365])
+def test_batches_match_a_full_run_on_the_window(transactions, window_days):
+    analyzer = IncrementalAnalyzer(window_days=window_days)
+    times = pd.to_datetime(transactions["timestamp"]).to_numpy()
+    window = np.timedelta64(int(window_days * 24 * 3600), "s")
+    expired = 0
+
+    for rows in np.array_split(np.arange(len(transactions)), BATCHES):
+        result = analyzer.apply(csv(transactions.iloc[rows]))
+        expired += result["summary"]["transfers_expired"]
+
+        seen = times[:rows[-1] + 1]
+        retained = transactions.iloc[:rows[-1] + 1][seen >= seen.max() - window]
+        full = run_analysis(csv(retained), use_cache=False)
+        assert rings(result) == rings(full)
+        assert flagged(result) == flagged(full)
+        assert result["summary"]["transfers_in_window"] == len(retained)
+
+    assert (expired > 0) == (window_days < 30)
@@ -0,0 +1,86 @@
+import io
+import os
+import stat
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app.main as main
+from app import instrumentation
+from app.instrumentation import profiled, prune_profiles
+
+CSV = (
+    "transaction_id,sender_id,receiver_id,amount,timestamp\n"
+    "T1,A,B,1000.0,2026-01-01 10:00:00\n"
+    "T2,B,C,950.0,2026-01-01 12:00:00\n"
+    "T3,C,A,900.0,2026-01-01 14:00:00\n"
+)
+
+
+def write_dumps(directory, names):
+    directory.mkdir(mode=0o700)
+    # newest first, an hour apart
+    for hours, name in enumerate(names):
+        path = directory / name
+        path.write_bytes(b"")
+        stamp = time.time() - 3600 * hours
+        os.utime(path, (stamp, stamp))
+    return directory
+
+
+def test_prune_keeps_the_newest(tmp_path):
+    directory = write_dumps(tmp_path / "profiles", ["c.prof", "b.html", "a.prof"])
+    assert prune_profiles(str(directory), keep=2, max_age_h=0) == ["a.prof"]
+    assert sorted(os.listdir(directory)) == ["b.html", "c.prof"]
+
+
+def test_prune_by_age(tmp_path):
+    directory = write_dumps(tmp_path / "profiles", ["c.prof", "b.prof", "a.prof"])
+    (directory / "notes.txt").write_text("not a dump")
+    # a.prof is two hours old, b.prof one, c.prof new
+    assert prune_profiles(str(directory), keep=0, max_age_h=1.5) == ["a.prof"]
+    assert sorted(os.listdir(directory)) == ["b.prof", "c.prof", "notes.txt"]
+
+
+def test_profiled_writes_privately_and_prunes(tmp_path, monkeypatch):
+    directory = tmp_path / "profiles"
+    monkeypatch.setattr(instrumentation, "PROFILE_DIR", str(directory))
+    monkeypatch.setattr(instrumentation, "PROFILE_KEEP", 2)
+
+    names = []
+    for _ in range(3):
+        with profiled() as report:
+            sum(range(1000))
+        names.append(report["file"])
+        time.sleep(0.01)
+
+    assert stat.S_IMODE(os.stat(directory).st_mode) & 0o077 == 0
+    assert sorted(os.listdir(directory)) == sorted(names[1:])
+
+
+def test_shared_directory_is_not_written(tmp_path, monkeypatch):
+    directory = tmp_path / "shared"
+    directory.mkdir()
+    directory.chmod(0o777)
+    monkeypatch.setattr(instrumentation, "PROFILE_DIR", str(directory))
+
+    with pytest.warns(UserWarning, match="profile not written"):
+        with profiled() as report:
+            sum(range(1000))
+    assert report["file"] is None
+    assert report["top"]
+    assert os.listdir(directory) == []
+
+
+def test_profile_sees_the_detectors(tmp_path, monkeypatch):
+    # detectors normally run on a thread pool the profiler can't see
+    monkeypatch.setattr(instrumentation, "PROFILE_DIR", str(tmp_path / "profiles"))
+    # on three rows parsing dominates; list everything that ran
+    monkeypatch.setattr(instrumentation, "PROFILE_TOP", 10_000)
+    client = TestClient(main.app)
+    files = {"file": ("transactions.csv", io.BytesIO(CSV.encode()), "text/csv")}
+    response = client.post("/analyze?profile=cprofile", files=files)
+    assert response.status_code == 200
+    top = [t["function"] for t in response.json()["summary"]["profile"]["top"]]
+    assert any(f.endswith("(cycle_plugin)") for f in top), top
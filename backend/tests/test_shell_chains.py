@@ -0,0 +1,42 @@
+import numpy as np
+
+from app.detectors.shell_detector import find_shell_chains
+from app.transaction_graph import NS_PER_HOUR, TransactionGraph
+from benchmarks.bench_shells import covered, find_shell_chains_walk, kept_feeders, make_chains
+
+
+def graph(transfers):
+    """ TransactionGraph of (sender, receiver, amount) transfers, an hour apart """
+    accounts = sorted({a for s, r, _ in transfers for a in (s, r)})
+    code = {a: i for i, a in enumerate(accounts)}
+    return TransactionGraph.from_codes(
+        np.array(accounts, dtype=object),
+        np.array([code[s] for s, _, _ in transfers]),
+        np.array([code[r] for _, r, _ in transfers]),
+        np.array([a for _, _, a in transfers], dtype=np.float32),
+        np.arange(len(transfers)) * NS_PER_HOUR,
+    )
+
+
+def chains(G):
+    tx = G.out_transfers + G.in_transfers
+    return [G.accounts[c["members"]].tolist() for c in find_shell_chains(G, tx)]
+
+
+def test_merge_keeps_largest_feeder():
+    # H -> A -> B -> C -> D -> Y layers the money; F2 also pays B, less
+    G = graph([
+        ("Z", "H", 1000.0), ("H", "A", 1000.0), ("A", "B", 990.0), ("B", "C", 980.0),
+        ("C", "D", 970.0), ("D", "Y", 960.0),
+        ("W", "F1", 500.0), ("F1", "F2", 500.0), ("F2", "B", 400.0),
+    ])
+    assert chains(G) == [["H", "A", "B", "C", "D", "Y"]]
+
+
+def test_covers_the_walk_through_merges():
+    G = make_chains(20_000)
+    tx = G.out_transfers + G.in_transfers
+    kept = kept_feeders(G, tx)
+    assert kept, "the generated graph has merges"
+    ok, _ = covered(find_shell_chains_walk(G, tx), find_shell_chains(G, tx), kept)
+    assert ok
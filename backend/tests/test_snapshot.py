@@ -0,0 +1,68 @@
+import io
+import os
+import time
+
+from fastapi.testclient import TestClient
+
+import app.main as main
+from app import snapshot as snapshots
+from app.pipeline import run_analysis
+from app.snapshot import open_snapshot, prune_snapshots
+
+CSV = (
+    "transaction_id,sender_id,receiver_id,amount,timestamp\n"
+    "T1,A,B,1000.0,2026-01-01 10:00:00\n"
+    "T2,B,C,950.0,2026-01-01 12:00:00\n"
+    "T3,C,A,900.0,2026-01-01 14:00:00\n"
+)
+
+
+def write_snapshots(tmp_path, names):
+    source = tmp_path / "transactions.csv"
+    source.write_text(CSV)
+    directory = tmp_path / "snapshots"
+    # newest first, an hour apart
+    for hours, name in enumerate(names):
+        path = str(directory / name)
+        run_analysis(str(source), use_cache=False, snapshot=path)
+        stamp = time.time() - 3600 * hours
+        os.utime(os.path.join(path, "manifest.json"), (stamp, stamp))
+    return directory
+
+
+def test_snapshot_round_trip(tmp_path):
+    directory = write_snapshots(tmp_path, ["a1"])
+    snapshot = open_snapshot(str(directory / "a1"))
+    assert snapshot.analysis_id == "a1"
+    assert sorted(snapshot.tg.accounts.tolist()) == ["A", "B", "C"]
+    assert snapshot.summary["total_accounts_analyzed"] == 3
+
+
+def test_prune_keeps_the_newest(tmp_path):
+    directory = write_snapshots(tmp_path, ["s3", "s2", "s1"])
+    assert sorted(prune_snapshots(str(directory), keep=2, max_age_h=0)) == ["s1"]
+    assert sorted(os.listdir(directory)) == ["s2", "s3"]
+
+
+def test_prune_by_age(tmp_path):
+    directory = write_snapshots(tmp_path, ["s3", "s2", "s1"])
+    # s1 is two hours old, s2 one, s3 new
+    assert sorted(prune_snapshots(str(directory), keep=0, max_age_h=1.5)) == ["s1"]
+    assert sorted(os.listdir(directory)) == ["s2", "s3"]
+
+
+def test_analyze_prunes_old_snapshots(tmp_path, monkeypatch):
+    directory = str(tmp_path / "snapshots")
+    monkeypatch.setattr(snapshots, "SNAPSHOT_DIR", directory)
+    monkeypatch.setattr(snapshots, "SNAPSHOT_KEEP", 2)
+    monkeypatch.setattr(main.graph_store, "snapshot_dir", directory)
+    client = TestClient(main.app)
+
+    ids = []
+    for _ in range(3):
+        files = {"file": ("transactions.csv", io.BytesIO(CSV.encode()), "text/csv")}
+        ids.append(client.post("/analyze", files=files).json()["analysis_id"])
+        time.sleep(0.01)
+
+    assert sorted(os.listdir(directory)) == sorted(ids[1:])
+    assert client.get(f"/graphs/{ids[-1]}/edges").status_code == 200
@@ -1,9 +1,88 @@
 import axios from "axios";
 
+const API_URL = "http://localhost:8000";
+
 export const analyzeCSV = async (file: File) => {
   const formData = new FormData();
   formData.append("file", file);
 
-  const res = await axios.post("http://localhost:8000/analyze", formData);
+  const res = await axios.post(`${API_URL}/analyze`, formData);
+  return res.data;
+};
+
+/* The /analyze response only carries edges between ring members; the
+   rest of the graph is fetched on demand by analysis_id. */
+
+export const fetchEdgePage = async (
+  analysisId: string,
+  offset = 0,
+  limit = 1000
+) => {
+  const res = await axios.get(`${API_URL}/graphs/${analysisId}/edges`, {
+    params: { offset, limit },
+  });
+  return res.data;
+};
+
+export const fetchNeighborhood = async (
+  analysisId: string,
+  account: string,
+  hops = 1,
+  offset = 0,
+  limit = 2000
+) => {
+  const res = await axios.get(`${API_URL}/graphs/${analysisId}/neighborhood`, {
+    params: { account, hops, offset, limit },
+  });
+  return res.data;
+};
+
+/* Transactions among a set of accounts: every transfer (oldest first), or
+   view "edges" for one total per sender / receiver pair. Paged. */
+
+export const fetchBetween = async (
+  analysisId: string,
+  accounts: string[],
+  view: "transfers" | "edges" = "transfers",
+  offset = 0,
+  limit = 1000
+) => {
+  const params = new URLSearchParams({ view, offset: `${offset}`, limit: `${limit}` });
+  accounts.forEach((a) => params.append("accounts", a));
+  const res = await axios.get(`${API_URL}/graphs/${analysisId}/between`, { params });
+  return res.data;
+};
+
+/* A fraud ring or case by id, with the edges among its members. */
+
+export const fetchRing = async (
+  analysisId: string,
+  ringId: string,
+  offset = 0,
+  limit = 2000
+) => {
+  const res = await axios.get(`${API_URL}/graphs/${analysisId}/rings/${ringId}`, {
+    params: { offset, limit },
+  });
   return res.data;
 };
+
+/* Follow the money out of an account: time-respecting hops, amounts
+   conserved. Edges come in the same format as the neighborhood's, plus
+   traced_amount and hop. */
+
+export const traceMoney = async (
+  analysisId: string,
+  account: string,
+  options: { start?: string; hops?: number; hours?: number; amount?: number } = {}
+) => {
+  const res = await axios.get(`${API_URL}/graphs/${analysisId}/trace`, {
+    params: { account, ...options },
+  });
+  return res.data;
+};
+
+export const fetchRingEdges = async (analysisId: string, members: string[]) => {
+  const page = await fetchBetween(analysisId, members, "edges", 0, 10000);
+  return page.edges;
+};
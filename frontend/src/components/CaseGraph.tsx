@@ -1,17 +1,33 @@
 import cytoscape from "cytoscape";
-import { useEffect, useRef } from "react";
+import { useEffect, useRef, useState } from "react";
+import { fetchRingEdges } from "../api";
 
-export default function CaseGraph({ caseData }: any) {
+export default function CaseGraph({ caseData, analysisId }: any) {
 
   const container = useRef<HTMLDivElement>(null);
 
+  // without inline transactions, fetch the edges between the case's members
+  const [transactions, setTransactions] = useState<any[]>(caseData.transactions ?? []);
+
+  useEffect(() => {
+    if (caseData.transactions) {
+      setTransactions(caseData.transactions);
+    } else if (analysisId && caseData.member_accounts) {
+      fetchRingEdges(analysisId, caseData.member_accounts).then((edges) =>
+        setTransactions(
+          edges.map((e: any) => ({ sender_id: e.source, receiver_id: e.target }))
+        )
+      );
+    }
+  }, [caseData, analysisId]);
+
   useEffect(() => {
 
     const elements: any[] = [];
 
     const nodeSet = new Set<string>();
 
-    caseData.transactions.forEach((t: any) => {
+    transactions.forEach((t: any) => {
       nodeSet.add(t.sender_id);
       nodeSet.add(t.receiver_id);
     });
@@ -20,7 +36,7 @@ export default function CaseGraph({ caseData }: any) {
       elements.push({ data: { id } });
     });
 
-    caseData.transactions.forEach((t: any, index: number) => {
+    transactions.forEach((t: any, index: number) => {
       elements.push({
         data: {
           id: `edge-${index}`,
@@ -57,7 +73,7 @@ export default function CaseGraph({ caseData }: any) {
 
     return () => cy.destroy();
 
-  }, [caseData]);
+  }, [transactions]);
 
   return <div ref={container} style={{ height: 400 }} />;
 }
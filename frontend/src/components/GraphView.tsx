@@ -1,5 +1,6 @@
 import cytoscape from "cytoscape";
 import { useEffect, useRef, useState } from "react";
+import { fetchEdgePage, fetchNeighborhood } from "../api";
 
 /* ================================
    TYPES
@@ -22,16 +23,25 @@ interface FraudRing {
 interface GraphEdge {
   source: string;
   target: string;
+  amount?: number;
+  timestamp?: string;
 }
 
 interface GraphData {
+  analysis_id?: string;
   suspicious_accounts: SuspiciousAccount[];
   fraud_rings: FraudRing[];
   graph: {
+    scope?: string;
+    total_edges?: number;
     edges: GraphEdge[];
   };
 }
 
+const PAGE_SIZE = 1000;
+
+const edgeKey = (e: GraphEdge) => `${e.source}->${e.target}`;
+
 /* ================================
    COMPONENT
 ================================ */
@@ -45,6 +55,30 @@ export default function GraphView({ data }: { data: GraphData }) {
   const [selectedNode, setSelectedNode] =
     useState<SuspiciousAccount | null>(null);
 
+  // edges fetched on demand (neighbourhoods, pages of the full graph)
+  const [extraEdges, setExtraEdges] = useState<GraphEdge[]>([]);
+  const [nextOffset, setNextOffset] = useState(0);
+
+  useEffect(() => {
+    setExtraEdges([]);
+    setNextOffset(0);
+  }, [data]);
+
+  const mergeEdges = (edges: GraphEdge[]) => {
+    setExtraEdges((prev) => {
+      const seen = new Set(prev.map(edgeKey));
+      data.graph.edges.forEach((e) => seen.add(edgeKey(e)));
+      return prev.concat(edges.filter((e) => !seen.has(edgeKey(e))));
+    });
+  };
+
+  const loadMoreEdges = async () => {
+    if (!data.analysis_id) return;
+    const page = await fetchEdgePage(data.analysis_id, nextOffset, PAGE_SIZE);
+    mergeEdges(page.edges);
+    setNextOffset(nextOffset + page.edges.length);
+  };
+
   useEffect(() => {
     if (!data || !containerRef.current) return;
 
@@ -52,7 +86,8 @@ export default function GraphView({ data }: { data: GraphData }) {
       data.suspicious_accounts.map((a) => [a.account_id, a])
     );
 
-    let edgesToRender = data.graph.edges;
+    const allEdges = data.graph.edges.concat(extraEdges);
+    let edgesToRender = allEdges;
 
     // ===============================
     // RING FILTER
@@ -62,7 +97,7 @@ export default function GraphView({ data }: { data: GraphData }) {
         (r) => r.ring_id === selectedRing
       );
       if (ring) {
-        edgesToRender = data.graph.edges.filter(
+        edgesToRender = allEdges.filter(
           (e) =>
             ring.member_accounts.includes(e.source) &&
             ring.member_accounts.includes(e.target)
@@ -190,6 +225,13 @@ export default function GraphView({ data }: { data: GraphData }) {
       setSelectedNode(suspicious || null);
     });
 
+    // Double click → pull in the account's neighbourhood
+    cy.on("dbltap", "node", async (evt) => {
+      if (!data.analysis_id) return;
+      const hood = await fetchNeighborhood(data.analysis_id, evt.target.id());
+      mergeEdges(hood.edges);
+    });
+
     // Click background → clear selection
     cy.on("tap", (evt) => {
       if (evt.target === cy) {
@@ -200,7 +242,7 @@ export default function GraphView({ data }: { data: GraphData }) {
     return () => {
       cy.destroy();
     };
-  }, [data, selectedRing]);
+  }, [data, selectedRing, extraEdges]);
 
   return (
     <>
@@ -250,6 +292,24 @@ export default function GraphView({ data }: { data: GraphData }) {
           Global View
         </button>
 
+        {data.analysis_id &&
+          nextOffset < (data.graph.total_edges ?? 0) && (
+            <button
+              onClick={loadMoreEdges}
+              style={{
+                marginRight: 10,
+                padding: "6px 14px",
+                background: "#374151",
+                color: "white",
+                borderRadius: 8,
+                border: "none",
+                cursor: "pointer",
+              }}
+            >
+              Load {PAGE_SIZE} more edges ({nextOffset}/{data.graph.total_edges})
+            </button>
+          )}
+
         {data.fraud_rings.map((r) => (
           <button
             key={r.ring_id}